@@ -85,4 +85,12 @@ export const api = {
 
   // Receipts
   getReceipts:         ()         => get('/api/receipts/list'),
+
+  // Several GET routes in one round trip: { key: path } → { key: body },
+  // with null for every entry that did not answer 200
+  batch:               async (requests) => {
+    const { results } = await post('/api/batch', { requests })
+    return Object.fromEntries(Object.entries(results).map(
+      ([key, r]) => [key, r.status === 200 ? r.body : null]))
+  },
 }
\ No newline at end of file
@@ -0,0 +1,32 @@
+import { useEffect, useRef } from 'react'
+import { io } from 'socket.io-client'
+
+/**
+ * Subscribes to a Socket.IO namespace pushed by the backend
+ * (src/services/live_push.py: '/sensors' or '/air-quality').
+ *
+ * handlers: { readings, hourly, reconnect } — pages load their REST snapshot
+ * on mount and again on `reconnect`, so nothing pushed while they were
+ * offline is missed.
+ */
+export function useLiveFeed(namespace, handlers, query = {}) {
+  const handlersRef = useRef(handlers)
+  handlersRef.current = handlers
+  const queryKey = JSON.stringify(query)
+
+  useEffect(() => {
+    const socket = io(namespace, { query: JSON.parse(queryKey) })
+    for (const event of ['readings', 'hourly']) {
+      socket.on(event, (data) => handlersRef.current[event]?.(data))
+    }
+    socket.io.on('reconnect', () => handlersRef.current.reconnect?.())
+    return () => socket.disconnect()
+  }, [namespace, queryKey])
+}
+
+/** Replaces (or adds) the entries of `rows` whose `key` matches, keeping `rows` sorted by it. */
+export function upsertBy(rows, entries, key) {
+  const merged = new Map(rows.map((r) => [r[key], r]))
+  for (const entry of entries) merged.set(entry[key], { ...merged.get(entry[key]), ...entry })
+  return [...merged.values()].sort((a, b) => parseInt(a[key]) - parseInt(b[key]))
+}
@@ -6,6 +6,7 @@ import {
 } from 'recharts'
 import Toast from '../components/Toast'
 import { useToast } from '../hooks/useToast'
+import { useLiveFeed, upsertBy } from '../hooks/useLiveFeed'
 
 const TT = {
   contentStyle: {
@@ -433,69 +434,84 @@ export default function AirQualityPage() {
   const [loadingHist, setLoadingHist] = useState(false)
 
   // ── Load today's data ──────────────────────────────────
-  useEffect(() => {
-    const load = async () => {
-      setLoading(true)
-      try {
-        const [aqi, gas] = await Promise.all([
-          fetchJson('/api/air_quality_today'),
-          fetchJson('/api/gas_concentration_today'),
-        ])
-
-        let aqiArr = []
-        if (aqi && Array.isArray(aqi)) {
-          aqiArr = aqi.map(e => ({ hour: `${e.hour}:00`, aqi: parseFloat(e.aqi) }))
-        } else if (aqi && typeof aqi === 'object') {
-          aqiArr = Object.keys(aqi)
-            .map(Number)
-            .filter(h => !isNaN(h))
-            .sort((a, b) => a - b)
-            .map(h => ({ hour: `${h}:00`, aqi: parseFloat(aqi[h]) || 0 }))
-        }
-        setAqiData(aqiArr)
-
-        if (aqiArr.length) {
-          const values = aqiArr.map(d => d.aqi)
-          setLatestAQI(aqiArr[aqiArr.length - 1].aqi)
-          setPeakAQI(Math.max(...values))
-          setMinAQI(Math.min(...values))
-        } else {
-          setLatestAQI(null)
-          setPeakAQI(null)
-          setMinAQI(null)
-        }
-
-        if (gas && typeof gas === 'object' && !Array.isArray(gas)) {
-          const gasArr = Object.keys(gas)
-            .map(Number)
-            .filter(h => !isNaN(h))
-            .sort((a, b) => a - b)
-            .map(h => ({
-              hour:     `${h}:00`,
-              smoke:    parseFloat(gas[h]?.avg_smoke    || 0).toFixed(2),
-              lpg:      parseFloat(gas[h]?.avg_lpg      || 0).toFixed(2),
-              methane:  parseFloat(gas[h]?.avg_methane  || 0).toFixed(2),
-              hydrogen: parseFloat(gas[h]?.avg_hydrogen || 0).toFixed(2),
-            }))
-          const hasRealData = gasArr.some(r =>
-            parseFloat(r.smoke) > 0 || parseFloat(r.lpg) > 0 ||
-            parseFloat(r.methane) > 0 || parseFloat(r.hydrogen) > 0
-          )
-          setGasData(hasRealData ? gasArr : [])
-        } else {
-          setGasData([])
-        }
-      } catch {
-        showToast('Error loading data', 'error')
-      } finally {
-        setLoading(false)
+  const loadToday = async () => {
+    setLoading(true)
+    try {
+      const [aqi, gas] = await Promise.all([
+        fetchJson('/api/air_quality_today'),
+        fetchJson('/api/gas_concentration_today'),
+      ])
+
+      let aqiArr = []
+      if (aqi && Array.isArray(aqi)) {
+        aqiArr = aqi.map(e => ({ hour: `${e.hour}:00`, aqi: parseFloat(e.aqi) }))
+      } else if (aqi && typeof aqi === 'object') {
+        aqiArr = Object.keys(aqi)
+          .map(Number)
+          .filter(h => !isNaN(h))
+          .sort((a, b) => a - b)
+          .map(h => ({ hour: `${h}:00`, aqi: parseFloat(aqi[h]) || 0 }))
+      }
+      setAqiData(aqiArr)
+
+      if (gas && typeof gas === 'object' && !Array.isArray(gas)) {
+        const gasArr = Object.keys(gas)
+          .map(Number)
+          .filter(h => !isNaN(h))
+          .sort((a, b) => a - b)
+          .map(h => ({
+            hour:     `${h}:00`,
+            smoke:    parseFloat(gas[h]?.avg_smoke    || 0).toFixed(2),
+            lpg:      parseFloat(gas[h]?.avg_lpg      || 0).toFixed(2),
+            methane:  parseFloat(gas[h]?.avg_methane  || 0).toFixed(2),
+            hydrogen: parseFloat(gas[h]?.avg_hydrogen || 0).toFixed(2),
+          }))
+        const hasRealData = gasArr.some(r =>
+          parseFloat(r.smoke) > 0 || parseFloat(r.lpg) > 0 ||
+          parseFloat(r.methane) > 0 || parseFloat(r.hydrogen) > 0
+        )
+        setGasData(hasRealData ? gasArr : [])
+      } else {
+        setGasData([])
       }
+    } catch {
+      showToast('Error loading data', 'error')
+    } finally {
+      setLoading(false)
     }
+  }
 
-    load()
-    const id = setInterval(load, 5 * 60 * 1000)
-    return () => clearInterval(id)
-  }, [])
+  useEffect(() => { loadToday() }, [])
+
+  // New records update today's hourly averages as the server pushes them
+  useLiveFeed('/air-quality', {
+    reconnect: () => loadToday(),
+    hourly:    ({ hourly }) => {
+      const today = hourly.filter(e => new Date(e.hour).toDateString() === new Date().toDateString())
+      if (!today.length) return
+      setAqiData(prev => upsertBy(prev, today.map(e => ({ hour: `${e.hour_of_day}:00`, aqi: e.avg_air_quality_index })), 'hour'))
+      setGasData(prev => upsertBy(prev, today.map(e => ({
+        hour:     `${e.hour_of_day}:00`,
+        smoke:    e.avg_smoke.toFixed(2),
+        lpg:      e.avg_lpg.toFixed(2),
+        methane:  e.avg_methane.toFixed(2),
+        hydrogen: e.avg_hydrogen.toFixed(2),
+      })), 'hour'))
+    },
+  })
+
+  useEffect(() => {
+    if (aqiData.length) {
+      const values = aqiData.map(d => d.aqi)
+      setLatestAQI(aqiData[aqiData.length - 1].aqi)
+      setPeakAQI(Math.max(...values))
+      setMinAQI(Math.min(...values))
+    } else {
+      setLatestAQI(null)
+      setPeakAQI(null)
+      setMinAQI(null)
+    }
+  }, [aqiData])
 
   // ── Load historical data ───────────────────────────────
   useEffect(() => { loadHistory() }, [histYear, histMonth])
@@ -690,36 +690,48 @@ export default function HomePage() {
 
   const loadAll = useCallback(async (silent = false) => {
     if (!silent) setRefreshing(true)
-    await Promise.allSettled([
-      api.getSensors().then((d: any) => {
-        setTemp(parseFloat(d.temperature.current).toFixed(1))
-        setHum(parseFloat(d.humidity.current).toFixed(0))
-        const tMM = d.temperature.minMaxLast24Hours
-        const hMM = d.humidity.minMaxLast24Hours
-        setTempMM(`${parseFloat(tMM[0]).toFixed(1)} / ${parseFloat(tMM[1]).toFixed(1)}`)
-        setHumMM(`${parseFloat(hMM[0]).toFixed(0)} / ${parseFloat(hMM[1]).toFixed(0)}`)
-      }).catch(() => {}),
-
-      fetch('/api_raspberry_pi_stats').then(r => r.json()).then((d: any) => {
-        setCpu(parseFloat(d.cpuUsage || 0).toFixed(1))
-        setRaspiTemp(parseFloat(d.temperature || 0).toFixed(1))
-      }).catch(() => {}),
-
-      api.getAlarm().then(([s]: [string]) => setAlarm(s === 'true')).catch(() => {}),
-
-      Promise.all([api.getBoilerStatus(), api.getThermostatFull()])
-        .then(([b, t]: [any, any]) => { setBoilerOn(b.is_on); setThermostat(t.thermostat_enabled) })
-        .catch(() => {}),
-
-
-      // ── Alba e tramonto ───────────────────────────────
-      fetch('/api/sunmoon')
-        .then(r => r.json())
-        .then((d: any) => {
-          setSunrise(d.sunrise ?? null)
-          setSunset(d.sunset  ?? null)
-        }).catch(() => {}),
-    ])
+    // One request for every widget of the page (see /api/batch)
+    const r: Record<string, any> = await api.batch({
+      sensors:    '/api_sensors',
+      raspi:      '/api_raspberry_pi_stats',
+      alarm:      '/security/alarm',
+      boiler:     '/api/boiler/status',
+      thermostat: '/api/thermostat/status/full',
+      sunmoon:    '/api/sunmoon',
+    }).catch(() => ({}))
+
+    // Each widget is applied on its own: one malformed body does not stop the others
+    const apply = (body: any, update: (d: any) => void) => {
+      if (!body) return
+      try { update(body) } catch {}
+    }
+
+    apply(r.sensors, d => {
+      setTemp(parseFloat(d.temperature.current).toFixed(1))
+      setHum(parseFloat(d.humidity.current).toFixed(0))
+      const tMM = d.temperature.minMaxLast24Hours
+      const hMM = d.humidity.minMaxLast24Hours
+      setTempMM(`${parseFloat(tMM[0]).toFixed(1)} / ${parseFloat(tMM[1]).toFixed(1)}`)
+      setHumMM(`${parseFloat(hMM[0]).toFixed(0)} / ${parseFloat(hMM[1]).toFixed(0)}`)
+    })
+
+    apply(r.raspi, d => {
+      setCpu(parseFloat(d.cpuUsage || 0).toFixed(1))
+      setRaspiTemp(parseFloat(d.temperature || 0).toFixed(1))
+    })
+
+    apply(r.alarm, d => setAlarm(d[0] === 'true'))
+
+    apply(r.boiler && r.thermostat, () => {
+      setBoilerOn(r.boiler.is_on)
+      setThermostat(r.thermostat.thermostat_enabled)
+    })
+
+    // ── Alba e tramonto ───────────────────────────────
+    apply(r.sunmoon, d => {
+      setSunrise(d.sunrise ?? null)
+      setSunset(d.sunset  ?? null)
+    })
     setLastUpdate(new Date())
     resetCountdown()
     if (!silent) setRefreshing(false)
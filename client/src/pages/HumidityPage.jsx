@@ -6,6 +6,7 @@ import {
 import { Droplets, TrendingUp, CalendarDays, LineChart as LineChartIcon, RefreshCw, Search } from 'lucide-react'
 import Toast from '../components/Toast'
 import { useToast } from '../hooks/useToast'
+import { useLiveFeed, upsertBy } from '../hooks/useLiveFeed'
 import { api } from '../api'
 
 const MONTHS = ['January','February','March','April','May','June','July','August','September','October','November','December']
@@ -73,13 +74,21 @@ export default function HumidityPage() {
       setHumMM(`${parseFloat(mm[0]).toFixed(0)} – ${parseFloat(mm[1]).toFixed(0)}`)
     }).catch(()=>{})
     loadCharts(month, year, false, null, null)
-
-    const id = setInterval(()=>{
-      api.getSensors().then(d=>setCurrentHum(parseFloat(d.humidity.current).toFixed(0))).catch(()=>{})
-    }, 30000)
-    return ()=>clearInterval(id)
   }, [])
 
+  // New readings and today's hourly averages are pushed by the server
+  useLiveFeed('/sensors', {
+    reconnect: () => api.getSensors().then(d=>setCurrentHum(parseFloat(d.humidity.current).toFixed(0))).catch(()=>{}),
+    readings:  ({ readings }) => {
+      const last = readings.filter(r=>r.humidity!=null).pop()
+      if (last) setCurrentHum(parseFloat(last.humidity).toFixed(0))
+    },
+    hourly:    ({ hourly }) => {
+      const today = hourly.filter(e=>e.avg_humidity!=null && new Date(e.hour).toDateString()===new Date().toDateString())
+      setTodayData(prev=>upsertBy(prev, today.map(e=>({hour:`${e.hour_of_day}:00`,hum:e.avg_humidity})), 'hour'))
+    },
+  })
+
   const loadCharts = useCallback(async (m,y,cmp,cm,cy) => {
     setLoadingCharts(true)
     try {
@@ -10,6 +10,7 @@ import {
 } from 'lucide-react'
 import Toast from '../components/Toast'
 import { useToast } from '../hooks/useToast'
+import { useLiveFeed, upsertBy } from '../hooks/useLiveFeed'
 import { api } from '../api'
 
 // ── Constants ──────────────────────────────────────────────
@@ -583,11 +584,23 @@ export default function TemperaturePage() {
       loadCharts(month, year, false, null, null)
     }
     init()
-    const t1 = setInterval(loadSensor, 10000)
     const t2 = setInterval(loadThermostatFull, 20000)
-    return () => { clearInterval(t1); clearInterval(t2) }
+    return () => clearInterval(t2)
   }, [])
 
+  // New readings and today's hourly averages are pushed by the server
+  useLiveFeed('/sensors', {
+    reconnect: () => loadSensor(),
+    readings:  ({ readings }) => {
+      const last = readings[readings.length - 1]
+      if (last) setCurrentTemp(parseFloat(last.temperature_c))
+    },
+    hourly:    ({ hourly }) => {
+      const today = hourly.filter((e) => new Date(e.hour).toDateString() === new Date().toDateString())
+      setTodayData((prev) => upsertBy(prev, today.map((e) => ({ hour: `${e.hour_of_day}:00`, temp: e.avg_temperature })), 'hour'))
+    },
+  })
+
   const loadBoiler         = () => api.getBoilerStatus().then((d) => setIsOn(d.is_on)).catch(() => {})
   const loadThermostatFull = () => api.getThermostatFull().then((d) => {
     setThermostat(d.thermostat_enabled || false)
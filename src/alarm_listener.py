@@ -0,0 +1,91 @@
+import json
+import logging
+import select
+import time
+
+import psycopg2
+
+from config.settings import ALARM_STATUS_CHANNEL
+
+
+def is_armed(status):
+    """Interpreta lo stato salvato in alarms_status (booleano o stringa 'true')."""
+    return str(status).lower() == "true"
+
+
+class AlarmStateListener:
+    """Tiene in memoria lo stato dell'allarme aggiornandolo via LISTEN/NOTIFY.
+
+    ``security_routes.alarm_status`` pubblica ogni cambio di stato sul canale
+    ``ALARM_STATUS_CHANNEL`` nella stessa transazione che lo salva. Il listener
+    usa una connessione dedicata (fuori dal pool, perché LISTEN vale per la
+    sessione) e legge lo stato dal database solo alla connessione e a ogni
+    riconnessione, per non perdere cambi avvenuti mentre era scollegato.
+    """
+
+    def __init__(self, db_config, reconnect_delay=5, poll_timeout=30):
+        self.db_config = db_config
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+        self.armed = False
+        self.connected = False
+        self.running = True
+        self.notifications = 0
+        self.reloads = 0
+        self.logger = logging.getLogger("alarm_listener")
+
+    def _set(self, status, source):
+        armed = is_armed(status)
+        if armed != self.armed:
+            self.logger.info(f"🔔 Allarme {'inserito' if armed else 'disinserito'} ({source})")
+        self.armed = armed
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            **self.db_config,
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+        )
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            # Prima LISTEN, poi lettura: un cambio tra le due arriva comunque come notifica
+            cur.execute(f"LISTEN {ALARM_STATUS_CHANNEL}")
+            cur.execute("SELECT status FROM alarms_status ORDER BY timestamp DESC LIMIT 1")
+            row = cur.fetchone()
+        self.reloads += 1
+        self._set(row[0] if row else False, "lettura iniziale")
+        self.connected = True
+        return conn
+
+    def _handle(self, notify):
+        self.notifications += 1
+        try:
+            status = json.loads(notify.payload)['status']
+        except (ValueError, KeyError, TypeError):
+            status = notify.payload
+        self._set(status, "notifica")
+
+    def run(self):
+        """Loop del listener: attende notifiche e si riconnette se la connessione cade."""
+        while self.running:
+            conn = None
+            try:
+                conn = self._connect()
+                while self.running:
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0))
+            except psycopg2.Error as e:
+                self.logger.error(f"Connessione LISTEN persa: {e}, nuovo tentativo tra {self.reconnect_delay}s")
+                time.sleep(self.reconnect_delay)
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+
+    def stop(self):
+        self.running = False
@@ -9,6 +9,10 @@ from .expenses_routes import expense_bp
 from .receipt_routes import receipt_bp
 from .ping_routes import ping_bp
 from .network_devices_routes import network_devices_bp
+from .ingest_routes import ingest_bp
+from .series_routes import series_bp
+from .batch_routes import batch_bp
+from .export_routes import export_bp
 
 def register_blueprints(app):
     """Registra tutti i blueprint delle API nell'app Flask"""
@@ -23,6 +27,10 @@ def register_blueprints(app):
     app.register_blueprint(system_bp)
     app.register_blueprint(expense_bp)
     app.register_blueprint(receipt_bp)
+    app.register_blueprint(ingest_bp)
+    app.register_blueprint(series_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(export_bp)
     
     # Log dei blueprint registrati
     import logging
@@ -8,6 +8,7 @@ from datetime import datetime, date, timedelta
 from services.activity_service import ActivityService
 from client.GoogleCalendarClient import GoogleCalendarClient
 from client.PostgresClient import PostgresHandler
+from utils.time_windows import iso_week_window
 import traceback
 import os
 
@@ -129,6 +130,11 @@ def get_weekly_stats():
             year = today.year
             week = today.isocalendar()[1]
 
+        try:
+            iso_week_window(year, week)
+        except ValueError:
+            return jsonify({"success": False, "error": f"{year} has no ISO week {week}"}), 400
+
         service = get_activity_service()
         stats_list = service.get_weekly_stats(year, week)
 
@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify, render_template, request
 from datetime import datetime, timedelta
 from models.database import handle_db_error, get_db_connection
-from services.air_quality_service import AirQualityService
+from services.air_quality_service import AirQualityService, get_air_quality_write_buffer
 from client.PostgresClient import PostgresHandler
-from config.settings import get_config
+from config.settings import get_config, AIR_QUALITY_WAIT_TIMEOUT
+from utils.time_windows import day_window
+from utils.downsample import parse_max_points, lttb_rows
+from utils.conditional import conditional
+from models.daily_summary import parse_heatmap_stat
 import psycopg2.extras
 import logging
 
@@ -29,14 +33,23 @@ def api_air_quality():
         - Supports query parameters:
             - limit (max records, default 1000, capped at 5000)
             - hours (time range in hours, default 24, capped at 168)
+            - max_points (LTTB-downsample the rows, driven by the AQI)
     
     POST:
-        - Inserts a new air quality record into the database.
+        - Validates the record and queues it in the write-behind buffer,
+          which inserts queued records in batches.
         - Expects JSON payload with measurement values.
+        - Answers 202 right away; with ``?wait=true`` it waits until the
+          record is committed and answers 201 (504 if it takes longer than
+          AIR_QUALITY_WAIT_TIMEOUT, the record stays queued).
     """
     if request.method == 'GET':
         limit = min(int(request.args.get('limit', 1000)), 5000)
         hours_back = min(int(request.args.get('hours', 24)), 168)
+        try:
+            max_points = parse_max_points(request.args.get('max_points'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         conn = get_db_connection(config['DB_CONFIG'])
         cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
@@ -59,6 +72,10 @@ def api_air_quality():
                     'count': 0
                 }), 404
             
+            if max_points is not None and len(rows) > max_points:
+                # LTTB needs ascending time; the response stays newest first
+                rows = lttb_rows(rows[::-1], max_points, 'timestamp', 'air_quality_index')[::-1]
+
             out = []
             for r in rows:
                 d = dict(r)
@@ -75,7 +92,8 @@ def api_air_quality():
                 'data': out,
                 'count': len(out),
                 'hours_requested': hours_back,
-                'limit_applied': limit
+                'limit_applied': limit,
+                'max_points': max_points
             }), 200
         finally:
             cur.close()
@@ -87,19 +105,34 @@ def api_air_quality():
         
         payload = request.get_json()
         try:
-            insert_res = air_quality_service.insert_record(payload)
-            return jsonify({
-                'message': 'Data saved',
-                'id': insert_res['id'],
-                'timestamp': insert_res['timestamp'],
-                'data': payload
-            }), 201
-        except ValueError as e:
+            row = air_quality_service.validate_record(payload)
+        except (ValueError, TypeError) as e:
             return jsonify({'error': 'Validation failed', 'message': str(e)}), 400
 
+        write_buffer = get_air_quality_write_buffer(air_quality_service)
+        timestamp = row[-1].isoformat()
+
+        if request.args.get('wait', '').lower() not in ('1', 'true', 'yes'):
+            write_buffer.offer(row)
+            return jsonify({'message': 'Data queued', 'timestamp': timestamp, 'data': payload}), 202
+
+        status = write_buffer.submit(row, AIR_QUALITY_WAIT_TIMEOUT)
+        if status == 'written':
+            return jsonify({'message': 'Data saved', 'timestamp': timestamp, 'data': payload}), 201
+        if status is None:
+            return jsonify({'error': 'Write timed out', 'message': 'Record is still queued'}), 504
+        return jsonify({'error': 'Write failed', 'message': f'Record {status}'}), 503
+
+
+@air_quality_bp.route('/api/air_quality/write_stats', methods=['GET'])
+def api_air_quality_write_stats():
+    """API for the counters of the air quality write-behind buffer (flushes, batch latency, queue)."""
+    return jsonify(get_air_quality_write_buffer(air_quality_service).stats()), 200
+
 
 @air_quality_bp.route('/api/last_air_quality_today', methods=['GET'])
 @handle_db_error
+@conditional(air_quality_service.today_version)
 def api_last_air_quality_today():
     """Returns the latest air quality reading recorded today."""
     conn = get_db_connection(config['DB_CONFIG'])
@@ -108,10 +141,10 @@ def api_last_air_quality_today():
         q = """
             SELECT smoke, lpg, methane, hydrogen, air_quality_index, air_quality_description, timestamp
             FROM air_quality
-            WHERE DATE(timestamp) = CURRENT_DATE
+            WHERE timestamp >= %s AND timestamp < %s
             ORDER BY timestamp DESC LIMIT 1;
         """
-        cur.execute(q)
+        cur.execute(q, day_window())
         r = cur.fetchone()
         
         if not r:
@@ -133,6 +166,7 @@ def api_last_air_quality_today():
 
 @air_quality_bp.route('/api/air_quality_today', methods=['GET'])
 @handle_db_error
+@conditional(air_quality_service.today_version)
 def api_air_quality_today_simplified():
     """Returns a simplified view of today's hourly air quality index (average values)."""
     data = air_quality_service.get_daily_aggregated()
@@ -145,6 +179,7 @@ def api_air_quality_today_simplified():
 
 @air_quality_bp.route('/api/gas_concentration_today', methods=['GET'])
 @handle_db_error
+@conditional(air_quality_service.today_version)
 def api_gas_concentration_today():
     """
     Returns today's hourly gas concentration data.
@@ -177,51 +212,31 @@ def api_gas_concentration_today():
 @air_quality_bp.route('/api/air_quality_monthly/<int:month>/<int:year>', methods=['GET'])
 @handle_db_error
 def api_air_quality_monthly(month, year):
-    """Returns daily average AQI for a given month/year."""
-    conn = get_db_connection(config['DB_CONFIG'])
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-    try:
-        q = """
-            SELECT
-                EXTRACT(DAY FROM timestamp)::int AS day,
-                ROUND(AVG(air_quality_index)::numeric, 2) AS avg_aqi
-            FROM air_quality
-            WHERE EXTRACT(MONTH FROM timestamp) = %s
-              AND EXTRACT(YEAR FROM timestamp) = %s
-            GROUP BY EXTRACT(DAY FROM timestamp)
-            ORDER BY day;
-        """
-        cur.execute(q, (month, year))
-        rows = cur.fetchall()
-        if not rows:
-            return jsonify({'error': 'No data'}), 404
-        return jsonify({str(int(r['day'])): float(r['avg_aqi']) for r in rows}), 200
-    finally:
-        cur.close()
-        conn.close()
+    """Returns daily average AQI for a given month/year (cached, see utils.query_cache)."""
+    if month < 1 or month > 12:
+        return jsonify({'error': 'Invalid month.'}), 400
+    data = air_quality_service.get_monthly_daily_avg(month, year)
+    if not data:
+        return jsonify({'error': 'No data'}), 404
+    return jsonify(data), 200
 
 
 @air_quality_bp.route('/api/air_quality_yearly/<int:year>', methods=['GET'])
 @handle_db_error
 def api_air_quality_yearly(year):
-    """Returns monthly average AQI for a given year."""
-    conn = get_db_connection(config['DB_CONFIG'])
-    cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+    """Returns monthly average AQI for a given year (cached, see utils.query_cache)."""
+    data = air_quality_service.get_yearly_monthly_avg(year)
+    if not data:
+        return jsonify({'error': 'No data'}), 404
+    return jsonify(data), 200
+
+
+@air_quality_bp.route('/api/air_quality_heatmap/<int:year>', methods=['GET'])
+@handle_db_error
+def api_air_quality_heatmap(year):
+    """Returns the daily AQI of a year as {month: {day: value}} (``?stat=avg|min|max|count``)."""
     try:
-        q = """
-            SELECT
-                EXTRACT(MONTH FROM timestamp)::int AS month,
-                ROUND(AVG(air_quality_index)::numeric, 2) AS avg_aqi
-            FROM air_quality
-            WHERE EXTRACT(YEAR FROM timestamp) = %s
-            GROUP BY EXTRACT(MONTH FROM timestamp)
-            ORDER BY month;
-        """
-        cur.execute(q, (year,))
-        rows = cur.fetchall()
-        if not rows:
-            return jsonify({'error': 'No data'}), 404
-        return jsonify({str(int(r['month'])): float(r['avg_aqi']) for r in rows}), 200
-    finally:
-        cur.close()
-        conn.close()
\ No newline at end of file
+        stat = parse_heatmap_stat(request.args.get('stat'))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify(air_quality_service.get_year_heatmap(year, stat)), 200
@@ -0,0 +1,115 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+from flask import Blueprint, current_app, jsonify, request
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import RequestRedirect, RoutingException
+
+from config.settings import BATCH_MAX_REQUESTS, BATCH_MAX_WORKERS, BATCH_TIMEOUT
+
+batch_bp = Blueprint('batch', __name__)
+logger = logging.getLogger(__name__)
+
+# Shared by every batch request: bounds the database connections a burst of
+# dashboard loads can take at once
+executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="api-batch")
+
+# Endpoints that cannot be batched: the batch itself and the React/static file fallbacks
+EXCLUDED_ENDPOINTS = {'batch.api_batch', 'serve_react', 'static'}
+
+# Request headers passed on to the sub-requests
+FORWARDED_HEADERS = ('Authorization', 'Cookie', 'Accept-Language')
+
+
+def _entries(payload):
+    """``{"requests": {key: path}}`` or ``{"requests": [path, ...]}`` as a list of (key, path)."""
+    requests = payload.get('requests') if isinstance(payload, dict) else None
+    if isinstance(requests, dict):
+        return list(requests.items())
+    if isinstance(requests, list):
+        return [(path, path) for path in requests]
+    raise ValueError('Body must be {"requests": {key: path}} or {"requests": [path, ...]}.')
+
+
+def _run(app, path, headers):
+    """Dispatch one GET through the app in its own request context; returns the entry of the result map."""
+    started = time.perf_counter()
+    with app.test_request_context(path, method='GET', headers=headers):
+        response = app.full_dispatch_request()
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    if response.is_json:
+        body = response.get_json(silent=True)
+    else:
+        body = response.get_data(as_text=True)
+    return {'status': response.status_code, 'body': body, 'elapsed_ms': elapsed_ms}
+
+
+@batch_bp.route('/api/batch', methods=['POST'])
+def api_batch():
+    """Run several internal GET routes concurrently and return their results keyed by name.
+
+    Body: ``{"requests": {"sensors": "/api_sensors", "boiler": "/api/boiler/status"}}``
+    (or a list of paths, used as their own keys). Each entry of the answer
+    carries its own ``status``, ``body`` and ``elapsed_ms``, so one failing
+    route does not fail the batch. Sub-requests see the caller's
+    Authorization/Cookie headers and run on a shared thread pool.
+    """
+    try:
+        entries = _entries(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not entries:
+        return jsonify({'error': 'No requests.'}), 400
+    if len(entries) > BATCH_MAX_REQUESTS:
+        return jsonify({'error': f'At most {BATCH_MAX_REQUESTS} requests per batch.'}), 400
+
+    app = current_app._get_current_object()
+    adapter = app.url_map.bind('')
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    started = time.perf_counter()
+
+    results, futures = {}, {}
+    for key, path in entries:
+        if not isinstance(path, str) or not path.startswith('/'):
+            results[str(key)] = {'status': 400, 'body': {'error': 'Path must start with /'}}
+            continue
+        try:
+            try:
+                endpoint, _ = adapter.match(urlsplit(path).path, method='GET')
+            except RequestRedirect as e:
+                # e.g. a missing strict trailing slash: run the canonical URL, as a browser would
+                query = urlsplit(path).query
+                path = urlsplit(e.new_url).path + (f"?{query}" if query else "")
+                endpoint, _ = adapter.match(urlsplit(path).path, method='GET')
+        except NotFound:
+            endpoint = None
+        except MethodNotAllowed:
+            results[str(key)] = {'status': 405, 'body': {'error': 'Only GET routes can be batched'}}
+            continue
+        except RoutingException as e:
+            results[str(key)] = {'status': 400, 'body': {'error': 'Cannot route path', 'message': str(e)}}
+            continue
+        if endpoint is None or endpoint in EXCLUDED_ENDPOINTS:
+            results[str(key)] = {'status': 404, 'body': {'error': 'Unknown route'}}
+            continue
+        futures[executor.submit(_run, app, path, headers)] = str(key)
+
+    done, not_done = wait(futures, timeout=BATCH_TIMEOUT)
+    for future in done:
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            logger.error(f"Batch entry {key} failed: {e}")
+            results[key] = {'status': 500, 'body': {'error': 'Internal server error', 'message': str(e)}}
+    for future in not_done:
+        future.cancel()
+        results[futures[future]] = {'status': 504, 'body': {'error': 'Timed out'}}
+
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+    }), 200
@@ -0,0 +1,53 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from config.settings import get_config
+from models.database import handle_db_error
+from services.export_service import TableExport, parse_chunk_size
+from utils.time_windows import parse_time
+
+export_bp = Blueprint('export', __name__)
+config = get_config()
+
+
+@export_bp.route('/api/export/<table>', methods=['GET'])
+@handle_db_error
+def api_export(table):
+    """Stream a historical table as a download (chunked transfer, constant memory).
+
+    Tables: ``sensor_readings``, ``air_quality``, ``thermostat_log``,
+    ``device_metrics``. Query parameters: ``format`` (csv, ndjson or
+    parquet; csv by default), ``from``/``to`` (ISO 8601 or epoch seconds,
+    half-open; the whole table when omitted), ``sensor_id`` or ``device``,
+    and ``chunk_size`` (rows per fetch, and per Parquet row group).
+    """
+    try:
+        start = parse_time(request.args['from']) if request.args.get('from') else None
+        end = parse_time(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use ISO8601 or epoch seconds.'}), 400
+
+    try:
+        export = TableExport(
+            config['DB_CONFIG'],
+            table,
+            fmt=request.args.get('format', 'csv'),
+            start=start,
+            end=end,
+            key=request.args.get('sensor_id') or request.args.get('device') or None,
+            chunk_size=parse_chunk_size(request.args.get('chunk_size')),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    export.open()
+    response = Response(
+        stream_with_context(export.chunks()),
+        mimetype=export.mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="{export.filename}"',
+            # Let reverse proxies pass the chunks on as they come
+            'X-Accel-Buffering': 'no',
+        },
+    )
+    response.call_on_close(export.close)
+    return response
@@ -0,0 +1,53 @@
+import gzip
+import logging
+
+from flask import Blueprint, jsonify, request
+
+from config.settings import get_config
+from models.database import handle_db_error
+from services.ingest_service import IngestService
+from utils.line_protocol import PRECISIONS
+
+ingest_bp = Blueprint('ingest', __name__)
+config = get_config()
+ingest_service = IngestService(config['DB_CONFIG'])
+logger = logging.getLogger(__name__)
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/json')
+
+
+@ingest_bp.route('/api/ingest', methods=['POST'])
+@handle_db_error
+def api_ingest():
+    """Batched ingest of points from many devices, as line protocol or NDJSON.
+
+    The format comes from ``?format=line|ndjson`` or else from the
+    Content-Type; ``?precision=ns|us|ms|s`` sets the unit of epoch
+    timestamps (ns by default, as in Influx). Gzip bodies are accepted. The
+    body is parsed as a stream and written in a single transaction.
+    """
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'ndjson' if request.mimetype in NDJSON_TYPES else 'line'
+    if fmt not in ('line', 'ndjson'):
+        return jsonify({'error': 'Invalid format. Use line or ndjson.'}), 400
+
+    precision = request.args.get('precision', 'ns')
+    if precision not in PRECISIONS:
+        return jsonify({'error': f'Invalid precision. Use one of {", ".join(PRECISIONS)}.'}), 400
+
+    stream = request.stream
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        stream = gzip.GzipFile(fileobj=stream)
+
+    try:
+        result = ingest_service.ingest(stream, fmt, precision)
+    except (OSError, EOFError) as e:
+        # Corrupted gzip body
+        return jsonify({'error': f'Unreadable body: {e}'}), 400
+
+    if not result['points']:
+        return jsonify({'success': False, 'error': 'No valid points', **result}), 400
+
+    logger.info(f"Ingested {result['points']} points ({result['rows_written']} rows, {result['rejected']} rejected)")
+    return jsonify({'success': True, **result}), 201
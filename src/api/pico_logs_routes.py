@@ -92,35 +92,39 @@ def receive_pico_logs_batch():
         if not isinstance(logs, list):
             return jsonify({'error': 'Logs must be an array'}), 400
         
-        stored_count = 0
+        required_fields = ['level', 'message', 'device_id', 'timestamp']
+        entries = []
+        positions = []
         errors = []
-        
+
         for i, log_data in enumerate(logs):
-            try:
-                # Validate required fields
-                required_fields = ['level', 'message', 'device_id', 'timestamp']
-                for field in required_fields:
-                    if field not in log_data:
-                        errors.append(f'Log {i}: Missing field {field}')
-                        continue
-                
-                # Store the log
-                pico_log_service.store_log(
-                    level=log_data['level'],
-                    message=log_data['message'],
-                    device_id=log_data['device_id'],
-                    timestamp=log_data['timestamp'],
-                    sensor_data=log_data.get('sensor_data', {})
-                )
-                stored_count += 1
-                
-            except Exception as e:
-                errors.append(f'Log {i}: {str(e)}')
-        
+            if not isinstance(log_data, dict):
+                errors.append(f'Log {i}: Not an object')
+                continue
+            missing = [field for field in required_fields if field not in log_data]
+            if missing:
+                errors.append(f'Log {i}: Missing field {", ".join(missing)}')
+                continue
+            log_entry = pico_log_service.process_pico_log(log_data)
+            if not log_entry:
+                errors.append(f'Log {i}: Invalid log data')
+                continue
+            entries.append(log_entry)
+            positions.append(i)
+
+        # One multi-row INSERT and one Socket.IO event for the whole batch
+        stored, rejected = pico_log_service.save_logs_batch(entries)
+        errors.extend(f'Log {positions[j]}: {message}' for j, message in rejected)
+
+        if stored:
+            pico_log_service.socketio.emit(
+                'new_logs', {'logs': stored}, namespace='/pico-logs'
+            )
+
         return jsonify({
             'success': True,
-            'message': f'Batch processed: {stored_count} logs stored',
-            'stored_count': stored_count,
+            'message': f'Batch processed: {len(stored)} logs stored',
+            'stored_count': len(stored),
             'total_logs': len(logs),
             'errors': errors if errors else None
         }), 201
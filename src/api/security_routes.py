@@ -1,8 +1,9 @@
 from flask import Blueprint, jsonify, request, render_template
+import json
 import psycopg2
 import psycopg2.extras
-from models.database import handle_db_error
-from config.settings import get_config
+from models.database import handle_db_error, get_db_connection
+from config.settings import get_config, ALARM_STATUS_CHANNEL
 
 # Blueprint for security system endpoints
 security_bp = Blueprint('security', __name__)
@@ -37,8 +38,8 @@ def alarm_status():
     conn = None
     cur = None
     try:
-        # Connect to the PostgreSQL database
-        conn = psycopg2.connect(**config['DB_CONFIG'])
+        # Lease a connection from the shared pool
+        conn = get_db_connection(config['DB_CONFIG'])
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
         if request.method == 'GET':
@@ -61,6 +62,8 @@ def alarm_status():
             status = data['status']
             cur.execute("DELETE FROM alarms_status;")  # Keep only the latest entry
             cur.execute("INSERT INTO alarms_status (status) VALUES (%s);", (status,))
+            # Delivered to listeners (the sensor reader) only when the transaction commits
+            cur.execute("SELECT pg_notify(%s, %s);", (ALARM_STATUS_CHANNEL, json.dumps({'status': status})))
             conn.commit()
             return jsonify({'message': "Status updated"}), 201
     
@@ -4,6 +4,10 @@ from models.database import handle_db_error
 from services.sensor_service import SensorService
 from config.settings import get_config
 from client.PostgresClient import PostgresHandler
+from ingest_pipeline import get_pipeline_stats
+from utils.downsample import parse_max_points
+from utils.conditional import conditional
+from models.daily_summary import parse_heatmap_stat
 import requests
 
 sensor_bp = Blueprint('sensor', __name__)
@@ -11,12 +15,22 @@ config = get_config()
 sensor_service = SensorService(config['DB_CONFIG'])
 
 
+def _sensor_id():
+    """Optional ``?sensor_id=`` filter; without it the data of every sensor is aggregated."""
+    return request.args.get('sensor_id') or None
+
+
+def _readings_version():
+    return sensor_service.readings_version(_sensor_id())
+
+
 @sensor_bp.route('/api_sensors')
 @handle_db_error
+@conditional(_readings_version)
 def api_sensors():
     """API to get sensor data with statistics."""
-    data = sensor_service.get_hourly_today()
-    last_entry = sensor_service.get_latest()
+    data = sensor_service.get_hourly_today(_sensor_id())
+    last_entry = sensor_service.get_latest(_sensor_id())
 
     if not data:
         return jsonify({'error': 'No data available.'}), 404
@@ -56,30 +70,55 @@ def api_sensors():
 
 @sensor_bp.route('/api/today_temperature', methods=['GET'])
 @handle_db_error
+@conditional(_readings_version)
 def api_today_temperature():
     """API for today's hourly temperature."""
-    return jsonify(sensor_service.get_today_hourly_temperature())
+    return jsonify(sensor_service.get_today_hourly_temperature(_sensor_id()))
 
 
 @sensor_bp.route('/api/today_humidity', methods=['GET'])
 @handle_db_error
+@conditional(_readings_version)
 def api_today_humidity():
     """API for today's hourly humidity."""
-    return jsonify(sensor_service.get_today_hourly_humidity())
+    return jsonify(sensor_service.get_today_hourly_humidity(_sensor_id()))
+
+
+def _heatmap_args():
+    """``?year=`` (current year by default) and ``?stat=`` of the heatmap endpoints; raises ValueError."""
+    year = request.args.get('year', type=int) or datetime.now().year
+    if year < 1900 or year > datetime.now().year:
+        raise ValueError('Invalid year.')
+    return year, parse_heatmap_stat(request.args.get('stat'))
 
 
 @sensor_bp.route('/api/monthly_temperature')
 @handle_db_error
 def api_monthly_temperature():
-    """API for monthly temperature data."""
-    return jsonify(sensor_service.get_monthly_temperature_data())
+    """API for the daily temperature of a year as {month: {day: value}} (``?year=``, ``?stat=avg|min|max|count``)."""
+    try:
+        year, stat = _heatmap_args()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify(sensor_service.get_monthly_temperature_data(year, _sensor_id(), stat))
+
+
+@sensor_bp.route('/api/monthly_humidity')
+@handle_db_error
+def api_monthly_humidity():
+    """API for the daily humidity of a year as {month: {day: value}} (``?year=``, ``?stat=avg|min|max|count``)."""
+    try:
+        year, stat = _heatmap_args()
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
+    return jsonify(sensor_service.get_monthly_humidity_data(year, _sensor_id(), stat))
 
 
 @sensor_bp.route('/api/monthly_average_temperature')
 @handle_db_error
 def api_monthly_avg_temp_default():
     """API for monthly average temperature (current year)."""
-    return jsonify(sensor_service.get_monthly_average_temperature())
+    return jsonify(sensor_service.get_monthly_average_temperature(sensor_id=_sensor_id()))
 
 
 @sensor_bp.route('/api/monthly_average_temperature/<int:year>', methods=['GET'])
@@ -88,7 +127,7 @@ def api_monthly_avg_temp_by_year(year):
     """API for monthly average temperature for a specific year."""
     if year < 1900 or year > datetime.now().year:
         return jsonify({'error': 'Invalid year.'}), 400
-    return jsonify(sensor_service.get_monthly_average_temperature(year))
+    return jsonify(sensor_service.get_monthly_average_temperature(year, _sensor_id()))
 
 
 @sensor_bp.route('/api/daily_temperature/<int:month>/', methods=['GET'])
@@ -97,7 +136,7 @@ def api_daily_temp(month):
     """API for daily temperature of a specific month."""
     if month < 1 or month > 12:
         return jsonify({'error': 'Invalid month.'}), 400
-    data = sensor_service.get_daily_for_month(month)
+    data = sensor_service.get_daily_for_month(month, sensor_id=_sensor_id())
     if not data:
         return jsonify({'error': 'No data for the month.'}), 404
     return jsonify(data)
@@ -111,7 +150,7 @@ def api_daily_temp_by_month_year(month, year):
         return jsonify({'error': 'Invalid month.'}), 400
     if year < 1900 or year > datetime.now().year:
         return jsonify({'error': 'Invalid year.'}), 400
-    data = sensor_service.get_daily_for_month(month, year)
+    data = sensor_service.get_daily_for_month(month, year, _sensor_id())
     if not data:
         return jsonify({'error': 'No data.'}), 404
     return jsonify(data)
@@ -120,14 +159,18 @@ def api_daily_temp_by_month_year(month, year):
 @sensor_bp.route('/api/temperature_average/<start_datetime>/<end_datetime>', methods=['GET'])
 @handle_db_error
 def api_temperature_average(start_datetime, end_datetime):
-    """API for average temperature in a date range."""
+    """API for average temperature in a date range (``?max_points=`` downsamples with LTTB)."""
     try:
         s = datetime.fromisoformat(start_datetime)
         e = datetime.fromisoformat(end_datetime)
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use ISO8601.'}), 400
+    try:
+        max_points = parse_max_points(request.args.get('max_points'))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
 
-    data = sensor_service.get_average_temperatures(s, e)
+    data = sensor_service.get_average_temperatures(s, e, _sensor_id(), max_points)
     if data is None:
         return jsonify({'error': 'Fetching error.'}), 500
     return jsonify(data), 200
@@ -136,26 +179,48 @@ def api_temperature_average(start_datetime, end_datetime):
 @sensor_bp.route('/api/humidity_average/<start_datetime>/<end_datetime>', methods=['GET'])
 @handle_db_error
 def api_humidity_average(start_datetime, end_datetime):
-    """API for average humidity in a date range."""
+    """API for average humidity in a date range (``?max_points=`` downsamples with LTTB)."""
     try:
         s = datetime.fromisoformat(start_datetime)
         e = datetime.fromisoformat(end_datetime)
     except ValueError:
         return jsonify({'error': 'Invalid date format. Use ISO8601.'}), 400
+    try:
+        max_points = parse_max_points(request.args.get('max_points'))
+    except ValueError as err:
+        return jsonify({'error': str(err)}), 400
 
-    data = sensor_service.get_average_humidity(s, e)
+    data = sensor_service.get_average_humidity(s, e, _sensor_id(), max_points)
     if data is None:
         return jsonify({'error': 'Fetching error.'}), 500
     return jsonify(data), 200
 
 
+@sensor_bp.route('/api/sensor_ids', methods=['GET'])
+@handle_db_error
+def api_sensor_ids():
+    """API listing the sensors that have stored readings."""
+    return jsonify(sensor_service.get_sensor_ids())
+
+
+@sensor_bp.route('/api/sensor/ingest_stats', methods=['GET'])
+def api_sensor_ingest_stats():
+    """API for the serial ingest pipeline counters published by the sensor reader."""
+    try:
+        stats = get_pipeline_stats('sensor_readings')
+    except Exception as e:
+        return jsonify({'error': f'Stats unavailable: {e}'}), 503
+    if stats is None:
+        return jsonify({'error': 'No stats published yet.'}), 404
+    return jsonify(stats), 200
+
+
 @sensor_bp.route('/last_temp', methods=['GET'])
+@conditional(_readings_version)
 def last_temp():
     """API for the last recorded temperature."""
     try:
-        from client.PostgresClient import PostgresHandler
-        db = PostgresHandler(config['DB_CONFIG'])
-        return db.last_temp_db()
+        return sensor_service.last_temp(_sensor_id())
     except Exception as e:
         import logging
         logger = logging.getLogger(__name__)
@@ -171,7 +236,7 @@ def api_daily_humidity_by_month_year(month, year):
         return jsonify({'error': 'Invalid month.'}), 400
     if year < 1900 or year > datetime.now().year:
         return jsonify({'error': 'Invalid year.'}), 400
-    data = sensor_service.get_daily_humidity_for_month(month, year)
+    data = sensor_service.get_daily_humidity_for_month(month, year, _sensor_id())
     if not data:
         return jsonify({'error': 'No data.'}), 404
     return jsonify(data)
@@ -183,7 +248,7 @@ def api_monthly_avg_humidity_by_year(year):
     """API for monthly average humidity for a specific year."""
     if year < 1900 or year > datetime.now().year:
         return jsonify({'error': 'Invalid year.'}), 400
-    return jsonify(sensor_service.get_monthly_average_humidity(year))
+    return jsonify(sensor_service.get_monthly_average_humidity(year, _sensor_id()))
 
 
 @sensor_bp.route('/api/target_temperature', methods=['POST'])
@@ -497,6 +562,7 @@ def api_shelly_schedule_delete():
 
 @sensor_bp.route('/api/thermostat/status/full', methods=['GET'])
 @handle_db_error
+@conditional(sensor_service.thermostat_version)
 def api_thermostat_status_full():
     """API per ottenere lo stato completo del termostato."""
     status = sensor_service.get_thermostat_status_full()
@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+from flask import Blueprint, jsonify, request
+
+from config.settings import get_config
+from models.database import handle_db_error
+from services.series_service import SeriesService, parse_bucket
+from utils.downsample import parse_max_points
+from utils.time_windows import parse_time
+
+series_bp = Blueprint('series', __name__)
+config = get_config()
+series_service = SeriesService(config['DB_CONFIG'])
+
+DEFAULT_RANGE = timedelta(hours=24)
+
+
+@series_bp.route('/api/series', methods=['GET'])
+@handle_db_error
+def api_series():
+    """Bucketed series of one metric as columnar arrays.
+
+    Query parameters: ``metric`` (required), ``from``/``to`` (ISO 8601 or
+    epoch seconds; last 24 hours by default), ``bucket`` (``30s``, ``15m``,
+    ``1h``, ``1d``, ``1w``, ``raw`` or ``auto``), ``agg``
+    (avg/min/max/count), ``sensor_id`` or ``device`` to restrict the series
+    to one source, ``time`` (iso/s/ms) for the format of ``t`` and
+    ``max_points`` to LTTB-downsample the result.
+    """
+    metric = request.args.get('metric')
+    if not metric:
+        return jsonify({'error': 'Missing metric.', 'metrics': series_service.metrics()}), 400
+
+    try:
+        end = parse_time(request.args['to']) if request.args.get('to') else datetime.now()
+        start = parse_time(request.args['from']) if request.args.get('from') else end - DEFAULT_RANGE
+    except ValueError:
+        return jsonify({'error': 'Invalid date format. Use ISO8601 or epoch seconds.'}), 400
+
+    try:
+        data = series_service.get_series(
+            metric,
+            start,
+            end,
+            bucket=parse_bucket(request.args.get('bucket')),
+            agg=request.args.get('agg', 'avg'),
+            key=request.args.get('sensor_id') or request.args.get('device') or None,
+            time_format=request.args.get('time', 'iso'),
+            max_points=parse_max_points(request.args.get('max_points')),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(data), 200
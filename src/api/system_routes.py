@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify, request, render_template, send_from_directory
 import os
 import subprocess
-import psutil
 import logging
 from models.database import handle_db_error
+from models.pool import get_pool_stats
+from models.prepared import get_prepared_stats
+from utils.query_cache import query_cache
+from utils.conditional import conditional, conditional_stats
+from services.system_stats import get_system_stats_sampler
 from services.ssh_service import SSHService
 from send_email import EmailSender, send_backup_email
 from config.settings import get_config
@@ -28,36 +32,36 @@ def favicon():
     return send_from_directory('static', 'favicon.ico')
 
 
+def _raspi_stats_version():
+    generation, sampled_at, _ = get_system_stats_sampler().latest()
+    return generation, sampled_at
+
+
 @system_bp.route('/api_raspberry_pi_stats')
 @handle_db_error
+@conditional(_raspi_stats_version)
 def api_raspi_stats():
-    """API to get Raspberry Pi system statistics."""
-    try:
-        # CPU temperature
-        try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp_str = f.read().strip()
-                temperature = float(temp_str) / 1000.0
-        except FileNotFoundError:
-            temperature = None
-
-        # System stats
-        cpu_usage = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
-
-        stats = {
-            'temperature': temperature,
-            'cpuUsage': cpu_usage,
-            'memoryUsed': f'{memory.used / (1024**3):.2f} GB',
-            'memoryTotal': f'{memory.total / (1024**3):.2f} GB',
-            'diskUsed': f'{disk.used / (1024**3):.2f} GB',
-            'diskTotal': f'{disk.total / (1024**3):.2f} GB',
-            'diskFree': f'{disk.free / (1024**3):.2f} GB'
-        }
-        return jsonify(stats)
-    except FileNotFoundError:
-        return jsonify({'error': 'Temperature file not found.'}), 404
+    """API to get Raspberry Pi system statistics (latest background sample)."""
+    _, _, stats = get_system_stats_sampler().latest()
+    return jsonify(stats)
+
+
+@system_bp.route('/api/db/pool_stats', methods=['GET'])
+def api_db_pool_stats():
+    """API to inspect the shared PostgreSQL connection pools and prepared statements."""
+    return jsonify({'pools': get_pool_stats(), 'prepared_statements': get_prepared_stats()})
+
+
+@system_bp.route('/api/cache/stats', methods=['GET'])
+def api_cache_stats():
+    """API to inspect the historical aggregates cache (hits per level, invalidations)."""
+    return jsonify(query_cache.stats())
+
+
+@system_bp.route('/api/http/conditional_stats', methods=['GET'])
+def api_conditional_stats():
+    """API for the conditional GET counters (responses and 304s per endpoint)."""
+    return jsonify(conditional_stats.stats())
 
 
 @system_bp.route('/api_run_backup', methods=['POST'])
@@ -11,6 +11,7 @@ Refactored Flask application with a modular structure to handle:
 - Backup and SSH commands
 - Expense management
 - Raspberry Pi Pico W logs via WebSocket
+- Live sensor and air quality push via WebSocket
 - Service Worker for offline functionality
 """
 
@@ -21,12 +22,14 @@ import os
 import logging
 
 # Local project imports (refactored structure)
-from config.settings import get_config, setup_logging
+from config.settings import get_config, setup_logging, LIVE_PUSH_ENABLED
 from utils.json_encoder import CustomJSONEncoder
 from api import register_blueprints
+from models.migrations import migrate
 
 # Import the new Pico logs service and blueprint
 from services.pico_log_service import PicoLogService
+from services.live_push import LivePushService
 from api.pico_logs_routes import init_pico_logs_service, pico_logs_bp
 from api.activity_routes import activity_bp
 from api.ping_routes import ping_bp
@@ -98,6 +101,12 @@ def create_app():
             app.logger.warning(f"Favicon not found: {str(e)}")
             return '', 404
 
+    # Apply pending schema migrations once, before any service touches the database
+    try:
+        migrate(config['DB_CONFIG'])
+    except Exception as e:
+        logger.error(f"Schema migration failed: {str(e)}")
+
     # Initialize Pico logs service
     try:
         pico_log_service = PicoLogService(config['DB_CONFIG'], socketio)
@@ -107,6 +116,14 @@ def create_app():
         logger.error(f"Failed to initialize Pico logs service: {str(e)}")
         # Continue without the service — not critical for basic functionality
 
+    # Push new sensor and air quality data to the dashboards (/sensors, /air-quality)
+    if LIVE_PUSH_ENABLED:
+        try:
+            LivePushService(config['DB_CONFIG'], socketio).start()
+            logger.info("Live push WebSocket service started")
+        except Exception as e:
+            logger.error(f"Failed to start live push service: {str(e)}")
+
     # Register all API blueprints
     register_blueprints(app)
 
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark dei filtri temporali delle query di analytics.
+
+Per ogni query confronta il vecchio filtro (EXTRACT / DATE(...)) con la
+finestra semiaperta [start, end) di utils.time_windows usando EXPLAIN:
+verifica che la nuova versione usi un index/bitmap scan (o il pruning delle
+partizioni) e ne misura il tempo con EXPLAIN ANALYZE.
+
+Uso (dalla cartella src, con le variabili DB_* impostate):
+    python benchmarks/explain_time_windows.py [--year 2025] [--month 1] [--week 2]
+
+Esce con codice 1 se una query riscritta non può usare alcun indice.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+# Aggiungi la directory src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import get_config
+from models.pool import get_pool
+from utils.time_windows import day_window, month_window, year_window, iso_week_window
+
+INDEX_NODES = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan', 'Bitmap Heap Scan'}
+
+
+def build_cases(year, month, week):
+    """Coppie (nome, tabella, query_vecchia, parametri_vecchi, query_nuova, parametri_nuovi)."""
+    return [
+        (
+            'sensor daily_for_month', 'sensor_readings_hourly',
+            "SELECT EXTRACT(DAY FROM hour) AS day, SUM(temperature_sum) / SUM(reading_count) "
+            "FROM sensor_readings_hourly WHERE EXTRACT(MONTH FROM hour) = %s AND EXTRACT(YEAR FROM hour) = %s "
+            "GROUP BY day",
+            (month, year),
+            "SELECT EXTRACT(DAY FROM hour) AS day, SUM(temperature_sum) / SUM(reading_count) "
+            "FROM sensor_readings_hourly WHERE hour >= %s AND hour < %s GROUP BY day",
+            month_window(year, month),
+        ),
+        (
+            'sensor monthly_average', 'sensor_readings_hourly',
+            "SELECT EXTRACT(MONTH FROM hour) AS month, SUM(temperature_sum) / SUM(reading_count) "
+            "FROM sensor_readings_hourly WHERE EXTRACT(YEAR FROM hour) = %s GROUP BY month",
+            (year,),
+            "SELECT EXTRACT(MONTH FROM hour) AS month, SUM(temperature_sum) / SUM(reading_count) "
+            "FROM sensor_readings_hourly WHERE hour >= %s AND hour < %s GROUP BY month",
+            year_window(year),
+        ),
+        (
+            'sensor hourly_today', 'sensor_readings_hourly',
+            "SELECT hour, avg_temperature_c FROM sensor_readings_hourly WHERE DATE(hour) = CURRENT_DATE",
+            (),
+            "SELECT hour, avg_temperature_c FROM sensor_readings_hourly WHERE hour >= %s AND hour < %s",
+            day_window(),
+        ),
+        (
+            'sensor raw day', 'sensor_readings',
+            "SELECT AVG(temperature_c) FROM sensor_readings WHERE DATE(timestamp) = CURRENT_DATE",
+            (),
+            "SELECT AVG(temperature_c) FROM sensor_readings WHERE timestamp >= %s AND timestamp < %s",
+            day_window(),
+        ),
+        (
+            'air_quality monthly_daily_avg', 'air_quality',
+            "SELECT EXTRACT(DAY FROM timestamp)::int AS day, AVG(air_quality_index) FROM air_quality "
+            "WHERE EXTRACT(MONTH FROM timestamp) = %s AND EXTRACT(YEAR FROM timestamp) = %s GROUP BY day",
+            (month, year),
+            "SELECT EXTRACT(DAY FROM timestamp)::int AS day, AVG(air_quality_index) FROM air_quality "
+            "WHERE timestamp >= %s AND timestamp < %s GROUP BY day",
+            month_window(year, month),
+        ),
+        (
+            'air_quality today', 'air_quality',
+            "SELECT * FROM air_quality WHERE DATE(timestamp) = CURRENT_DATE ORDER BY timestamp DESC LIMIT 1",
+            (),
+            "SELECT * FROM air_quality WHERE timestamp >= %s AND timestamp < %s ORDER BY timestamp DESC LIMIT 1",
+            day_window(),
+        ),
+        (
+            'activity weekly_stats', 'activity_daily_stats',
+            "SELECT category_id, SUM(total_minutes) FROM activity_daily_stats "
+            "WHERE EXTRACT(YEAR FROM date) = %s AND EXTRACT(WEEK FROM date) = %s GROUP BY category_id",
+            (year, week),
+            "SELECT category_id, SUM(total_minutes) FROM activity_daily_stats "
+            "WHERE date >= %s::date AND date < %s::date GROUP BY category_id",
+            iso_week_window(year, week),
+        ),
+        (
+            'activity monthly_stats', 'activity_daily_stats',
+            "SELECT category_id, SUM(total_minutes) FROM activity_daily_stats "
+            "WHERE EXTRACT(YEAR FROM date) = %s AND EXTRACT(MONTH FROM date) = %s GROUP BY category_id",
+            (year, month),
+            "SELECT category_id, SUM(total_minutes) FROM activity_daily_stats "
+            "WHERE date >= %s::date AND date < %s::date GROUP BY category_id",
+            month_window(year, month),
+        ),
+    ]
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get('Plans', []):
+        yield from walk(child)
+
+
+def explain(cur, query, params, analyze=False):
+    options = "ANALYZE, FORMAT JSON" if analyze else "FORMAT JSON"
+    cur.execute(f"EXPLAIN ({options}) {query}", params)
+    result = cur.fetchone()[0]
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def scan_summary(root):
+    """Restituisce (tipi di nodo di scan, numero di relazioni scansionate)."""
+    scans = [n for n in walk(root['Plan']) if 'Scan' in n['Node Type']]
+    return sorted({n['Node Type'] for n in scans}), len({n.get('Relation Name') for n in scans if n.get('Relation Name')})
+
+
+def uses_index(cur, query, params):
+    """True se la query può usare un indice: lo verifica con i seq scan disabilitati.
+
+    Su tabelle piccole il planner preferisce comunque il seq scan, quindi si
+    controlla che esista un piano indicizzato invece di chiedere che sia scelto.
+    """
+    cur.execute("SET LOCAL enable_seqscan = off")
+    try:
+        node_types, _ = scan_summary(explain(cur, query, params))
+    finally:
+        cur.execute("SET LOCAL enable_seqscan = on")
+    return bool(INDEX_NODES.intersection(node_types)), node_types
+
+
+def main():
+    now = datetime.now()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--year', type=int, default=now.year)
+    parser.add_argument('--month', type=int, default=now.month)
+    parser.add_argument('--week', type=int, default=now.isocalendar()[1])
+    args = parser.parse_args()
+
+    pool = get_pool(get_config()['DB_CONFIG'])
+    failures = 0
+
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            print(f"{'query':32} {'old ms':>9} {'new ms':>9} {'rel old':>7} {'rel new':>7}  index")
+            for name, table, old_q, old_p, new_q, new_p in build_cases(args.year, args.month, args.week):
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+                if not cur.fetchone()[0]:
+                    print(f"{name:32} tabella {table} assente, saltata")
+                    continue
+
+                old = explain(cur, old_q, old_p, analyze=True)
+                new = explain(cur, new_q, new_p, analyze=True)
+                _, old_rel = scan_summary(old)
+                _, new_rel = scan_summary(new)
+                indexed, node_types = uses_index(cur, new_q, new_p)
+                if not indexed:
+                    failures += 1
+
+                print(
+                    f"{name:32} {old['Execution Time']:9.2f} {new['Execution Time']:9.2f} "
+                    f"{old_rel:7d} {new_rel:7d}  {'OK' if indexed else 'NO'} {', '.join(node_types)}"
+                )
+        conn.rollback()
+
+    if failures:
+        print(f"\n✗ {failures} query senza piano indicizzato")
+        sys.exit(1)
+    print("\n✓ Tutte le query riscritte possono usare un indice")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark della compressione all'ingest (compression.IngestCompressor).
+
+Fa passare una traccia registrata di letture nel compressore con diverse
+tolleranze, in modalità deadband e SDT, e riporta per ognuna il rapporto di
+compressione e l'errore di ricostruzione rispetto alla traccia originale:
+per la deadband il valore salvato viene tenuto fino al successivo (come lo
+vedrebbe chi legge la tabella), per SDT si interpola linearmente tra i punti
+salvati.
+
+La traccia è un CSV ``timestamp,temperature,humidity`` (timestamp ISO o epoch),
+ad esempio registrato dalla seriale con la compressione a 0, oppure viene letta
+da sensor_readings:
+    python benchmarks/ingest_compression.py --csv traccia.csv
+    python benchmarks/ingest_compression.py --db --days 7   (con le variabili DB_*)
+"""
+
+import argparse
+import bisect
+import csv
+import math
+import os
+import sys
+from datetime import datetime, timedelta
+
+# Aggiungi la directory src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compression import IngestCompressor
+
+METRICS = ('temperature', 'humidity')
+
+# (tolleranza temperatura, tolleranza umidità)
+TOLERANCES = [(0.0, 0.0), (0.1, 0.5), (0.2, 1.0), (0.3, 1.5), (0.5, 2.0)]
+
+
+def parse_time(value):
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def load_csv(path):
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        rows = []
+        for record in reader:
+            if not record or record[0].strip().lower() == 'timestamp':
+                continue
+            rows.append((parse_time(record[0].strip()), float(record[1]), float(record[2])))
+    return sorted(rows)
+
+
+def load_db(days):
+    from config.settings import get_config
+    from models.pool import get_pool
+
+    pool = get_pool(get_config()['DB_CONFIG'])
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT timestamp, temperature_c, humidity FROM sensor_readings "
+                "WHERE timestamp >= %s ORDER BY timestamp",
+                (datetime.now() - timedelta(days=days),),
+            )
+            return [(ts.timestamp(), float(t), float(h)) for ts, t, h in cur.fetchall()]
+
+
+def compress(trace, mode, tolerances, heartbeat):
+    compressor = IngestCompressor(METRICS, dict(zip(METRICS, tolerances)), mode=mode, heartbeat=heartbeat)
+    archived = []
+    for t, temperature, humidity in trace:
+        row = compressor.offer(t, {'temperature': temperature, 'humidity': humidity},
+                               payload=(t, temperature, humidity))
+        if row is not None:
+            archived.append(row)
+    if compressor.held is not None:
+        # L'ultimo campione in attesa verrebbe salvato al prossimo heartbeat
+        archived.append(compressor.held[2])
+    return archived, compressor.stats()
+
+
+def reconstruct(archived, times, t, index, linear):
+    """Valore della metrica ``index`` al tempo ``t`` ricostruito dai punti salvati."""
+    pos = bisect.bisect_right(times, t) - 1
+    if pos < 0:
+        return archived[0][index]
+    left = archived[pos]
+    if not linear or pos + 1 >= len(archived) or left[0] == t:
+        return left[index]
+    right = archived[pos + 1]
+    fraction = (t - left[0]) / (right[0] - left[0])
+    return left[index] + fraction * (right[index] - left[index])
+
+
+def errors(trace, archived, linear):
+    """(errore massimo, RMS) per metrica."""
+    times = [row[0] for row in archived]
+    result = {}
+    for index, metric in enumerate(METRICS, start=1):
+        diffs = [abs(sample[index] - reconstruct(archived, times, sample[0], index, linear)) for sample in trace]
+        result[metric] = (max(diffs), math.sqrt(sum(d * d for d in diffs) / len(diffs)))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='traccia CSV timestamp,temperature,humidity')
+    source.add_argument('--db', action='store_true', help='legge la traccia da sensor_readings')
+    parser.add_argument('--days', type=int, default=7, help='giorni da leggere con --db')
+    parser.add_argument('--heartbeat', type=float, default=900, help='secondi massimi tra due righe salvate')
+    args = parser.parse_args()
+
+    trace = load_csv(args.csv) if args.csv else load_db(args.days)
+    if len(trace) < 2:
+        print("Traccia vuota o troppo corta")
+        return 1
+
+    hours = (trace[-1][0] - trace[0][0]) / 3600
+    print(f"Traccia: {len(trace)} campioni su {hours:.1f} ore, heartbeat {args.heartbeat:.0f}s\n")
+    print(f"{'modo':<9} {'tol T':>6} {'tol H':>6} {'righe':>7} {'rapporto':>9} "
+          f"{'T max':>7} {'T rms':>7} {'H max':>7} {'H rms':>7}")
+
+    for mode in ('deadband', 'sdt'):
+        for tolerances in TOLERANCES:
+            archived, _ = compress(trace, mode, tolerances, args.heartbeat)
+            err = errors(trace, archived, linear=(mode == 'sdt'))
+            print(
+                f"{mode:<9} {tolerances[0]:>6.2f} {tolerances[1]:>6.2f} {len(archived):>7} "
+                f"{len(trace) / len(archived):>8.1f}x "
+                f"{err['temperature'][0]:>7.3f} {err['temperature'][1]:>7.3f} "
+                f"{err['humidity'][0]:>7.3f} {err['humidity'][1]:>7.3f}"
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
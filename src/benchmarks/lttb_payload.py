@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark del downsampling LTTB (utils.downsample) sugli endpoint di intervallo.
+
+Modalità locale (default): genera un anno di medie orarie sintetiche
+(andamento stagionale + giornaliero + rumore), costruisce la risposta come
+fa ``SensorService.get_average_temperatures`` con e senza ``max_points`` e
+riporta punti, dimensione del JSON, tempo di LTTB e tempo totale
+(downsampling + dict + serializzazione), oltre all'errore massimo della
+ricostruzione lineare rispetto alla serie completa.
+
+Modalità HTTP: interroga un server in esecuzione e misura latenza e byte
+ricevuti per ogni ``max_points``:
+    python benchmarks/lttb_payload.py
+    python benchmarks/lttb_payload.py --url http://localhost:5000 --days 365
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Aggiungi la directory src al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from utils.downsample import lttb_rows
+
+POINTS = [None, 2000, 1000, 500, 200]
+
+
+def synthetic_rows(days):
+    random.seed(42)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=days)
+    rows = []
+    for h in range(days * 24):
+        seasonal = 4 * math.sin(2 * math.pi * h / (365 * 24))
+        daily = 1.5 * math.sin(2 * math.pi * (h % 24) / 24)
+        rows.append({'hour': start + timedelta(hours=h), 'avg_temp': round(20 + seasonal + daily + random.gauss(0, 0.3), 2)})
+    return rows
+
+
+def build_payload(rows, max_points):
+    kept = lttb_rows(rows, max_points, 'hour', 'avg_temp')
+    data = [{"hour": r['hour'].isoformat(), "avg_temperature": float(r['avg_temp'])} for r in kept]
+    return kept, json.dumps(data)
+
+
+def max_error(rows, kept):
+    """Errore massimo della serie ricostruita (interpolazione lineare tra i punti tenuti)."""
+    x = np.array([r['hour'].timestamp() for r in rows])
+    y = np.array([r['avg_temp'] for r in rows], dtype=float)
+    kx = np.array([r['hour'].timestamp() for r in kept])
+    ky = np.array([r['avg_temp'] for r in kept], dtype=float)
+    return float(np.max(np.abs(y - np.interp(x, kx, ky))))
+
+
+def timed(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return result, best * 1000
+
+
+def run_local(days, repeat):
+    rows = synthetic_rows(days)
+    print(f"Serie sintetica: {len(rows)} medie orarie ({days} giorni), migliore di {repeat} ripetizioni\n")
+    print(f"{'max_points':>10} {'punti':>7} {'JSON KB':>9} {'LTTB ms':>8} {'totale ms':>10} {'err max':>8}")
+    for points in POINTS:
+        _, lttb_ms = timed(lambda: lttb_rows(rows, points, 'hour', 'avg_temp'), repeat)
+        (kept, payload), total_ms = timed(lambda: build_payload(rows, points), repeat)
+        print(
+            f"{points or 'tutti':>10} {len(kept):>7} {len(payload) / 1024:>9.1f} "
+            f"{lttb_ms:>8.2f} {total_ms:>10.2f} {max_error(rows, kept):>8.3f}"
+        )
+
+
+def run_http(url, days, repeat):
+    import requests
+
+    end = datetime.now().replace(microsecond=0)
+    start = end - timedelta(days=days)
+    endpoint = f"{url.rstrip('/')}/api/temperature_average/{start.isoformat()}/{end.isoformat()}"
+    print(f"GET {endpoint}, migliore di {repeat} richieste\n")
+    print(f"{'max_points':>10} {'punti':>7} {'KB':>9} {'latenza ms':>11}")
+    session = requests.Session()
+    for points in POINTS:
+        params = {'max_points': points} if points else {}
+        response, elapsed_ms = timed(lambda: session.get(endpoint, params=params, timeout=60), repeat)
+        response.raise_for_status()
+        print(f"{points or 'tutti':>10} {len(response.json()):>7} {len(response.content) / 1024:>9.1f} {elapsed_ms:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='base URL della web app (modalità HTTP)')
+    parser.add_argument('--days', type=int, default=365, help='ampiezza dell\'intervallo in giorni')
+    parser.add_argument('--repeat', type=int, default=5, help='ripetizioni per misura')
+    args = parser.parse_args()
+
+    if args.url:
+        run_http(args.url, args.days, args.repeat)
+    else:
+        run_local(args.days, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
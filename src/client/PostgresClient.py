@@ -1,118 +1,282 @@
 import psycopg2
-from psycopg2 import Error
-from datetime import datetime
+import psycopg2.extras
 from psycopg2 import Error
 from datetime import datetime, timedelta
+import io
+import json
 import logging
 from contextlib import contextmanager
 
+from models.pool import get_pool
+from models.prepared import hot_statements
+from models.daily_summary import summarize_days
+from utils.query_cache import invalidate_timestamp
+from config.settings import ALARM_STATUS_CHANNEL, SENSOR_READINGS_CHANNEL, AIR_QUALITY_CHANNEL, DEFAULT_SENSOR_ID, THERMOSTAT_SENSOR_ID
+
+
+# I payload di NOTIFY sono limitati a 8000 byte: le righe vengono spezzate
+NOTIFY_PAYLOAD_LIMIT = 7000
+
+
+def _notify_payloads(items):
+    """Payload JSON ``[item, ...]`` entro NOTIFY_PAYLOAD_LIMIT."""
+    chunk, size = [], 2
+    for item in items:
+        item = json.dumps(item, default=float)
+        if chunk and size + len(item) + 1 > NOTIFY_PAYLOAD_LIMIT:
+            yield f"[{','.join(chunk)}]"
+            chunk, size = [], 2
+        chunk.append(item)
+        size += len(item) + 1
+    if chunk:
+        yield f"[{','.join(chunk)}]"
+
+
+def notify_rows(cur, channel, items):
+    """Pubblica ``items`` su ``channel`` nella transazione di ``cur`` (partono al commit)."""
+    for payload in _notify_payloads(items):
+        cur.execute("SELECT pg_notify(%s, %s)", (channel, payload))
+
+
+def notify_readings(cur, rows):
+    """Pubblica le letture ``(temperatura, umidità, timestamp, sensor_id)`` come ``[epoch, temperatura, umidità, sensor_id]``."""
+    notify_rows(cur, SENSOR_READINGS_CHANNEL, (
+        [round(ts.timestamp(), 3), temperature, humidity, sensor_id]
+        for temperature, humidity, ts, sensor_id in rows
+    ))
+
+
+def notify_air_quality(cur, rows):
+    """Pubblica le righe di air_quality ``(smoke, lpg, methane, hydrogen, aqi, descrizione, timestamp)``
+    come ``[epoch, smoke, lpg, methane, hydrogen, aqi, descrizione]``."""
+    notify_rows(cur, AIR_QUALITY_CHANNEL, (
+        [round(row[6].timestamp(), 3), *row[:6]]
+        for row in rows
+    ))
+
+
+def _copy_text(value):
+    """Escape di un valore testuale per il formato text di COPY."""
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
 
 # Configura il logging per debug migliore
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
 class PostgresHandler:
+    """Accesso a PostgreSQL condivisibile tra thread.
+
+    L'handler non possiede una connessione propria: ogni operazione prende in
+    prestito una connessione dal pool di processo, apre il proprio cursore e la
+    restituisce al termine. Più thread Flask possono quindi usare la stessa
+    istanza senza condividere cursori.
+
+    Non viene eseguito alcun ``SELECT 1`` preventivo: se la connessione risulta
+    caduta durante l'operazione viene scartata e l'operazione ritentata una
+    volta su una connessione nuova.
+    """
+
+    # Tentativi per operazione quando la connessione cade a metà
+    MAX_ATTEMPTS = 2
+
+    # Aggiorna un bucket del rollup orario con somme parziali (una o più letture)
+    HOURLY_ROLLUP_UPSERT = """
+    INSERT INTO sensor_readings_hourly (
+        sensor_id, hour, reading_count, temperature_sum, humidity_sum,
+        temperature_min, temperature_max, humidity_min, humidity_max, updated_at
+    )
+    VALUES (
+        %(sensor_id)s, %(hour)s, %(count)s, %(temperature_sum)s, %(humidity_sum)s,
+        %(temperature_min)s, %(temperature_max)s, %(humidity_min)s, %(humidity_max)s, NOW()
+    )
+    ON CONFLICT (sensor_id, hour) DO UPDATE SET
+        reading_count   = sensor_readings_hourly.reading_count + EXCLUDED.reading_count,
+        temperature_sum = sensor_readings_hourly.temperature_sum + EXCLUDED.temperature_sum,
+        humidity_sum    = sensor_readings_hourly.humidity_sum + EXCLUDED.humidity_sum,
+        temperature_min = LEAST(sensor_readings_hourly.temperature_min, EXCLUDED.temperature_min),
+        temperature_max = GREATEST(sensor_readings_hourly.temperature_max, EXCLUDED.temperature_max),
+        humidity_min    = LEAST(sensor_readings_hourly.humidity_min, EXCLUDED.humidity_min),
+        humidity_max    = GREATEST(sensor_readings_hourly.humidity_max, EXCLUDED.humidity_max),
+        updated_at      = NOW();
+    """
+
     def __init__(self, db_config):
-        """Inizializza la connessione al database PostgreSQL e crea la tabella se non esiste."""
+        """Collega l'handler al pool condiviso.
+
+        Non esegue DDL: lo schema è creato una sola volta all'avvio da
+        ``models.migrations``, per cui costruire l'handler costa zero query.
+        """
         self.db_config = db_config
-        self.connection = None
-        self.cursor = None
-        self.connect_to_db()
-        self.create_table_if_not_exists()
-        self.create_thermostat_tables()
+        self.pool = get_pool(db_config)
 
-    def _connect(self):
-        return psycopg2.connect(**self.db_config)
+    def _run(self, operation, cursor_factory=None):
+        """Esegue ``operation(cur)`` in una transazione su una connessione del pool.
 
-    def _ensure_connection(self):
-        """Verifica e ripristina la connessione se necessario."""
-        try:
-            if self.connection is None or self.connection.closed:
-                logger.warning("Connessione chiusa, riconnessione in corso...")
-                self.connect_to_db()
-            else:
-                # Test della connessione con una query semplice
-                self.cursor.execute("SELECT 1")
-                self.cursor.fetchone()
-        except (Error, psycopg2.OperationalError) as e:
-            logger.error(f"Problema di connessione rilevato: {e}")
-            self.connect_to_db()
-
-    def connect_to_db(self):
-        """Stabilisce la connessione al database con retry logic."""
-        max_retries = 3
-        retry_delay = 1
-
-        for attempt in range(max_retries):
+        Fa commit se l'operazione termina senza errori, rollback altrimenti. Se
+        l'errore ha chiuso la connessione (server riavviato, socket caduto) la
+        connessione viene scartata e l'operazione ritentata, ma solo se la
+        connessione è caduta prima del COMMIT: durante il COMMIT il server
+        potrebbe aver già confermato la transazione, e ripetere scritture non
+        idempotenti (letture, somme del rollup orario, COPY) le duplicherebbe.
+        """
+        for attempt in range(1, self.MAX_ATTEMPTS + 1):
+            conn = self.pool.getconn()
+            committing = False
             try:
-                self.connection = psycopg2.connect(**self.db_config)
-                self.cursor = self.connection.cursor()
-                logger.info("Connessione al database stabilita con successo")
-                return
-            except Error as e:
-                logger.error(f"Tentativo {attempt + 1}/{max_retries} fallito: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                else:
-                    logger.error("Impossibile connettersi al database dopo tutti i tentativi")
+                with conn.cursor(cursor_factory=cursor_factory) as cur:
+                    result = operation(cur)
+                committing = True
+                conn.commit()
+                return result
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                if committing or not conn.closed or attempt == self.MAX_ATTEMPTS:
                     raise
+                logger.warning(f"Connessione persa ({e}), nuovo tentativo {attempt + 1}/{self.MAX_ATTEMPTS}")
+            finally:
+                # Le connessioni chiuse vengono scartate dal pool, le altre
+                # tornano disponibili dopo il rollback di eventuali transazioni aperte
+                conn.close()
 
-    def create_table_if_not_exists(self):
-        """Crea la tabella se non esiste già."""
-        try:
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-                id SERIAL PRIMARY KEY,
-                temperature_c FLOAT NOT NULL,
-                humidity FLOAT NOT NULL,
-                timestamp TIMESTAMP NOT NULL
-            );
-            """
-            self.cursor.execute(create_table_query)
-            self.connection.commit()
-        except Error as e:
-            print(f"Errore durante la creazione della tabella: {e}")
-            exit(1)
+    def _fetchone(self, query, params=None, cursor_factory=None):
+        def op(cur):
+            cur.execute(query, params)
+            return cur.fetchone()
+        return self._run(op, cursor_factory)
+
+    def _fetchall(self, query, params=None, cursor_factory=None):
+        def op(cur):
+            cur.execute(query, params)
+            return cur.fetchall()
+        return self._run(op, cursor_factory)
 
-    def save_to_db(self, temperature, humidity):
-        """Salva i dati nel database."""
+    def fetchone_prepared(self, name, params=None, cursor_factory=None):
+        """Esegue per nome una delle query frequenti di ``models.prepared.HOT_STATEMENTS``.
+
+        La query viene preparata una sola volta per connessione del pool; le
+        chiamate successive saltano parsing e planning.
+        """
+        def op(cur):
+            hot_statements.execute(cur, name, params)
+            return cur.fetchone()
+        return self._run(op, cursor_factory)
+
+    def _execute(self, query, params=None):
+        def op(cur):
+            cur.execute(query, params)
+            return cur.rowcount
+        return self._run(op)
+
+    def save_to_db(self, temperature, humidity, timestamp=None, sensor_id=DEFAULT_SENSOR_ID):
+        """Salva la lettura e aggiorna solo il bucket orario corrispondente del rollup."""
         try:
-            now = datetime.now()
-            query = """
-            INSERT INTO sensor_readings (temperature_c, humidity, timestamp) 
-            VALUES (%s, %s, %s)
-            """
-            values = (temperature, humidity, now)
-            self.cursor.execute(query, values)
-            self.connection.commit()
+            self.save_readings_batch([(temperature, humidity, timestamp or datetime.now(), sensor_id)])
         except Error as e:
             print(f"Errore durante l'inserimento dei dati: {e}")
 
-    def close(self):
-        """Chiude la connessione al database e il cursore."""
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
-        print("Connessione al database chiusa.")
-
-    def create_table_if_not_exists_devices(self):
-        """Crea la tabella se non esiste già."""
-        try:
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS network_devices (
-                ip_address VARCHAR(45) NOT NULL PRIMARY KEY,
-                hostname VARCHAR(255),
-                status VARCHAR(50),
-                timestamp TIMESTAMP NOT NULL
-            );
-            """
-            self.cursor.execute(create_table_query)
-            self.connection.commit()
-        except Error as e:
-            print(f"Errore durante la creazione della tabella: {e}")
-            exit(1)
+    def save_readings_batch(self, readings):
+        """Salva più letture ``(temperature, humidity, timestamp, sensor_id)`` in un'unica transazione.
+
+        Le righe grezze sono inserite con un solo INSERT multi-riga e il rollup
+        orario riceve un upsert per ogni sensore e ora toccati, con somme e
+        min/max dell'intero batch. Le righe senza ``sensor_id`` (es. rimaste
+        nello spool da prima dei sensori multipli) vanno a ``DEFAULT_SENSOR_ID``.
+        Solleva l'eccezione in caso di errore, così il chiamante può ritentare
+        il batch.
+        """
+        if not readings:
+            return 0
+        days = self._run(lambda cur: self._write_readings(cur, readings))
+        for day in days:
+            invalidate_timestamp('sensor', datetime.combine(day, datetime.min.time()))
+        return len(readings)
+
+    def _write_readings(self, cur, readings):
+        """Inserisce le letture e aggiorna il rollup orario sul cursore dato; restituisce i giorni toccati."""
+        rows = [
+            (r[0], r[1], r[2], r[3] if len(r) > 3 else DEFAULT_SENSOR_ID)
+            for r in readings
+        ]
+
+        buckets = {}
+        for temperature, humidity, ts, sensor_id in rows:
+            hour = ts.replace(minute=0, second=0, microsecond=0)
+            b = buckets.get((sensor_id, hour))
+            if b is None:
+                buckets[(sensor_id, hour)] = {
+                    'sensor_id': sensor_id,
+                    'hour': hour,
+                    'count': 1,
+                    'temperature_sum': temperature,
+                    'humidity_sum': humidity,
+                    'temperature_min': temperature,
+                    'temperature_max': temperature,
+                    'humidity_min': humidity,
+                    'humidity_max': humidity,
+                }
+            else:
+                b['count'] += 1
+                b['temperature_sum'] += temperature
+                b['humidity_sum'] += humidity
+                b['temperature_min'] = min(b['temperature_min'], temperature)
+                b['temperature_max'] = max(b['temperature_max'], temperature)
+                b['humidity_min'] = min(b['humidity_min'], humidity)
+                b['humidity_max'] = max(b['humidity_max'], humidity)
+
+        psycopg2.extras.execute_values(
+            cur,
+            "INSERT INTO sensor_readings (temperature_c, humidity, timestamp, sensor_id) VALUES %s",
+            rows,
+            page_size=1000,
+        )
+        cur.executemany(self.HOURLY_ROLLUP_UPSERT, list(buckets.values()))
+        # Le web app tengono in memoria le ultime ore (services/hot_window.py) e
+        # le inviano alle dashboard (services/live_push.py): le notifiche
+        # partono al commit, insieme alle righe
+        notify_readings(cur, rows)
+        return {hour.date() for _, hour in buckets}
+
+    def save_ingest_batch(self, readings=(), air_quality_rows=(), metric_rows=()):
+        """Scrive in un'unica transazione i punti ricevuti da ``/api/ingest``.
+
+        ``readings`` come per ``save_readings_batch``; ``air_quality_rows`` sono
+        tuple ``(smoke, lpg, methane, hydrogen, air_quality_index,
+        air_quality_description, timestamp)`` inserite con un INSERT
+        multi-riga; ``metric_rows`` sono tuple ``(timestamp, device_id,
+        measurement, field, value)`` caricate in ``device_metrics`` con COPY.
+        """
+        def save(cur):
+            days = set()
+            if readings:
+                days = self._write_readings(cur, readings)
+            if air_quality_rows:
+                psycopg2.extras.execute_values(
+                    cur,
+                    "INSERT INTO air_quality (smoke, lpg, methane, hydrogen, air_quality_index, "
+                    "air_quality_description, timestamp) VALUES %s",
+                    air_quality_rows,
+                    page_size=1000,
+                )
+                notify_air_quality(cur, air_quality_rows)
+            if metric_rows:
+                buffer = io.StringIO()
+                for ts, device_id, measurement, field, value in metric_rows:
+                    buffer.write(f"{ts.isoformat()}\t{_copy_text(device_id)}\t{_copy_text(measurement)}"
+                                 f"\t{_copy_text(field)}\t{value!r}\n")
+                buffer.seek(0)
+                cur.copy_expert(
+                    "COPY device_metrics (timestamp, device_id, measurement, field, value) FROM STDIN",
+                    buffer,
+                )
+            return days
+
+        days = self._run(save)
+        for day in days:
+            invalidate_timestamp('sensor', datetime.combine(day, datetime.min.time()))
+        for day in {row[6].date() for row in air_quality_rows}:
+            invalidate_timestamp('air_quality', datetime.combine(day, datetime.min.time()))
+        return len(readings) + len(air_quality_rows) + len(metric_rows)
 
     def save_devices_to_db(self, devices):
         """Salva le informazioni sui dispositivi di rete nel database."""
@@ -131,12 +295,9 @@ class PostgresHandler:
                 timestamp = EXCLUDED.timestamp;
             """
             timestamp = datetime.now()
+            values = [(ip, info['hostname'], info['status'], timestamp) for ip, info in devices.items()]
 
-            for ip, info in devices.items():
-                values = (ip, info['hostname'], info['status'], timestamp)
-                self.cursor.execute(query_insert_or_update, values)
-
-            self.connection.commit()
+            self._run(lambda cur: cur.executemany(query_insert_or_update, values))
             print("Dispositivi di rete inseriti o aggiornati nel database.")
 
         except Error as e:
@@ -150,8 +311,7 @@ class PostgresHandler:
             FROM network_devices 
             ORDER BY timestamp DESC;
             """
-            self.cursor.execute(query)
-            rows = self.cursor.fetchall()
+            rows = self._fetchall(query)
             devices = {}
             for row in rows:
                 ip_address, hostname, status, timestamp = row
@@ -171,8 +331,7 @@ class PostgresHandler:
             now = datetime.now()
             today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
 
-            self.cursor.execute("DELETE FROM trains WHERE timestamp < %s", (today_start,))
-            self.connection.commit()
+            self._execute("DELETE FROM trains WHERE timestamp < %s", (today_start,))
 
             query = """
             INSERT INTO trains (train_number, destination, time, delay, platform, stops, timestamp)
@@ -186,44 +345,22 @@ class PostgresHandler:
                 stops = EXCLUDED.stops,
                 timestamp = EXCLUDED.timestamp;
             """
-            for train_number, info in trains.items():
-                values = (
-                    train_number,
-                    info['destinazione'],
-                    info['orario'],
-                    info['ritardo'],
-                    info['binario'],
-                    info['fermate'],
-                    now
-                )
-                self.cursor.execute(query, values)
-
-            self.connection.commit()
+            values = [(
+                train_number,
+                info['destinazione'],
+                info['orario'],
+                info['ritardo'],
+                info['binario'],
+                info['fermate'],
+                now
+            ) for train_number, info in trains.items()]
+
+            self._run(lambda cur: cur.executemany(query, values))
             print("Treni inseriti o aggiornati nel database.")
 
         except Error as e:
             print(f"Errore durante l'inserimento o l'aggiornamento dei dati dei treni: {e}")
 
-    def create_table_if_not_exists_trains(self):
-        """Crea la tabella per i treni se non esiste già."""
-        try:
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS trains (
-                train_number VARCHAR(20) NOT NULL PRIMARY KEY,
-                destination VARCHAR(255),
-                time TIME,
-                delay VARCHAR(20),
-                platform VARCHAR(20),
-                stops TEXT,
-                timestamp TIMESTAMP NOT NULL
-            );
-            """
-            self.cursor.execute(create_table_query)
-            self.connection.commit()
-        except Error as e:
-            print(f"Errore durante la creazione della tabella trains: {e}")
-            exit(1)
-
     def save_alarm_status_to_db(self, status):
         """Salva uno stato booleano nel database."""
         try:
@@ -231,8 +368,12 @@ class PostgresHandler:
             INSERT INTO alarms_status (status) 
             VALUES (%s)
             """
-            self.cursor.execute(query, (status,))
-            self.connection.commit()
+
+            def save(cur):
+                cur.execute(query, (status,))
+                cur.execute("SELECT pg_notify(%s, %s)", (ALARM_STATUS_CHANNEL, json.dumps({'status': status})))
+
+            self._run(save)
             print("Stato dell'allarme inserito nel database.")
         except Error as e:
             print(f"Errore durante l'inserimento dello stato dell'allarme: {e}")
@@ -240,14 +381,7 @@ class PostgresHandler:
     def get_last_alarm_status(self):
         """Recupera l'ultimo stato booleano inserito nel database."""
         try:
-            query = """
-            SELECT status, timestamp 
-            FROM alarms_status 
-            ORDER BY timestamp DESC 
-            LIMIT 1;
-            """
-            self.cursor.execute(query)
-            result = self.cursor.fetchone()
+            result = self.fetchone_prepared('last_alarm_status')
             if result:
                 status, timestamp = result
                 return {'status': status, 'timestamp': timestamp}
@@ -257,108 +391,22 @@ class PostgresHandler:
             print(f"Errore durante il recupero dello stato dell'allarme: {e}")
             return None
 
-    def last_temp_db(self):
+    def last_temp_db(self, sensor_id=None):
         try:
-            query = """
-            SELECT temperature_c, timestamp
-            FROM sensor_readings
-            ORDER BY timestamp DESC
-            LIMIT 1;
-            """
-            self.cursor.execute(query)
-            result = self.cursor.fetchone()
+            if sensor_id:
+                row = self.fetchone_prepared('latest_reading_by_sensor', (sensor_id,))
+            else:
+                row = self.fetchone_prepared('latest_reading')
+            result = (row[0], row[2]) if row else None
             return {"last_entry": result}
 
         except Error as e:
             print(f"Errore durante il recupero dell'ultima temperatura: {e}")
             return None
 
-    def create_temp_table_and_aggregate_data(self):
-        """Crea una tabella temporanea per le medie orarie."""
-        try:
-            create_temp_table_query = """
-            CREATE TEMP TABLE IF NOT EXISTS temp_sensor_averages (
-                hour TIMESTAMP PRIMARY KEY,
-                avg_temperature_c FLOAT NOT NULL,
-                avg_humidity FLOAT NOT NULL
-            );
-            """
-            self.cursor.execute(create_temp_table_query)
-
-            insert_averages_query = """
-            INSERT INTO temp_sensor_averages (hour, avg_temperature_c, avg_humidity)
-            SELECT
-                date_trunc('hour', timestamp) AS hour,
-                AVG(temperature_c) AS avg_temperature_c,
-                AVG(humidity) AS avg_humidity
-            FROM
-                sensor_readings
-            GROUP BY
-                hour
-            ORDER BY
-                hour;
-            """
-            self.cursor.execute(insert_averages_query)
-
-            delete_original_query = "DELETE FROM sensor_readings;"
-            self.cursor.execute(delete_original_query)
-
-            insert_into_original_query = """
-            INSERT INTO sensor_readings (temperature_c, humidity, timestamp)
-            SELECT 
-                avg_temperature_c, 
-                avg_humidity, 
-                hour
-            FROM 
-                temp_sensor_averages;
-            """
-            self.cursor.execute(insert_into_original_query)
-
-            delete_original_query = "DROP TABLE temp_sensor_averages;"
-            self.cursor.execute(delete_original_query)
-
-            self.connection.commit()
-
-            print("Dati aggregati inseriti correttamente nella tabella originale.")
-
-        except Error as e:
-            print(f"Errore durante l'aggregazione dei dati: {e}")
-            self.connection.rollback()
-
-    def create_table_if_not_exists_air_quality(self):
-        """Crea la tabella per i dati di qualità dell'aria se non esiste già."""
-        try:
-            self._ensure_connection()
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS air_quality (
-                id SERIAL PRIMARY KEY,
-                smoke FLOAT NOT NULL,
-                lpg FLOAT NOT NULL,
-                methane FLOAT NOT NULL,
-                hydrogen FLOAT NOT NULL,
-                air_quality_index FLOAT NOT NULL,
-                air_quality_description TEXT NOT NULL,
-                timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            
-            CREATE INDEX IF NOT EXISTS idx_air_quality_timestamp ON air_quality(timestamp);
-            CREATE INDEX IF NOT EXISTS idx_air_quality_date ON air_quality(DATE(timestamp));
-            """
-            self.cursor.execute(create_table_query)
-            self.connection.commit()
-            logger.info("Tabella air_quality creata/verificata correttamente.")
-        except Error as e:
-            logger.error(f"Errore durante la creazione della tabella air_quality: {e}")
-            if self.connection:
-                self.connection.rollback()
-            raise
-
     def save_air_quality_to_db(self, smoke_value, lpg_value, methane_value, hydrogen_value, air_quality_index, air_quality_description):
         """Salva i dati di qualità dell'aria nel database."""
         try:
-            self._ensure_connection()
-
             if any(val is None or not isinstance(val, (int, float)) for val in [smoke_value, lpg_value, methane_value, hydrogen_value, air_quality_index]):
                 raise ValueError("Tutti i valori numerici devono essere float o int validi")
 
@@ -372,7 +420,7 @@ class PostgresHandler:
             RETURNING id
             """
 
-            self.cursor.execute(query, (
+            record_id = self._fetchone(query, (
                 float(smoke_value),
                 float(lpg_value),
                 float(methane_value),
@@ -380,31 +428,25 @@ class PostgresHandler:
                 float(air_quality_index),
                 str(air_quality_description),
                 timestamp
-            ))
-
-            record_id = self.cursor.fetchone()[0]
-            self.connection.commit()
+            ))[0]
+            invalidate_timestamp('air_quality', timestamp)
             logger.info(f"Dati di qualità dell'aria salvati con ID: {record_id}")
             return record_id
 
         except (Error, ValueError) as e:
             logger.error(f"Errore durante l'inserimento dei dati di qualità dell'aria: {e}")
-            if self.connection:
-                self.connection.rollback()
             raise
 
     def get_last_air_quality(self):
         """Recupera l'ultimo valore di qualità dell'aria dal database."""
         try:
-            self._ensure_connection()
             query = """
             SELECT smoke, lpg, methane, hydrogen, air_quality_index, air_quality_description, timestamp 
             FROM air_quality 
             ORDER BY timestamp DESC, id DESC
             LIMIT 1;
             """
-            self.cursor.execute(query)
-            result = self.cursor.fetchone()
+            result = self._fetchone(query)
 
             if result:
                 smoke, lpg, methane, hydrogen, air_quality_index, air_quality_description, timestamp = result
@@ -427,20 +469,15 @@ class PostgresHandler:
 
     def create_temp_table_and_aggregate_air_quality(self):
         """Versione migliorata dell'aggregazione con gestione errori e transaction sicure."""
-        try:
-            self._ensure_connection()
-
-            self.connection.autocommit = False
-
+        def aggregate(cur):
             logger.info("Inizio aggregazione dati qualità dell'aria...")
 
             check_query = "SELECT COUNT(*) FROM air_quality WHERE timestamp >= CURRENT_DATE - INTERVAL '1 day'"
-            self.cursor.execute(check_query)
-            data_count = self.cursor.fetchone()[0]
+            cur.execute(check_query)
+            data_count = cur.fetchone()[0]
 
             if data_count == 0:
                 logger.warning("Nessun dato recente trovato per l'aggregazione")
-                self.connection.rollback()
                 return False
 
             logger.info(f"Trovati {data_count} record da aggregare")
@@ -455,9 +492,9 @@ class PostgresHandler:
                 avg_hydrogen FLOAT NOT NULL,
                 avg_air_quality_index FLOAT NOT NULL,
                 record_count INTEGER NOT NULL
-            );
+            ) ON COMMIT DROP;
             """
-            self.cursor.execute(create_temp_hourly_table_query)
+            cur.execute(create_temp_hourly_table_query)
 
             insert_hourly_averages_query = """
             INSERT INTO temp_air_quality_hourly (hour, avg_smoke, avg_lpg, avg_methane, avg_hydrogen, avg_air_quality_index, record_count)
@@ -475,34 +512,30 @@ class PostgresHandler:
             HAVING COUNT(*) > 0
             ORDER BY hour;
             """
-            self.cursor.execute(insert_hourly_averages_query)
+            cur.execute(insert_hourly_averages_query)
 
-            self.cursor.execute("SELECT COUNT(*) FROM temp_air_quality_hourly")
-            hourly_count = self.cursor.fetchone()[0]
+            cur.execute("SELECT COUNT(*) FROM temp_air_quality_hourly")
+            hourly_count = cur.fetchone()[0]
             logger.info(f"Creati {hourly_count} record orari aggregati")
 
             if hourly_count == 0:
                 logger.error("Nessun record orario creato durante l'aggregazione")
-                self.connection.rollback()
                 return False
 
             backup_query = """
-            CREATE TABLE IF NOT EXISTS air_quality_backup AS 
-            SELECT * FROM air_quality WHERE FALSE;
-            
             INSERT INTO air_quality_backup 
             SELECT * FROM air_quality
             WHERE timestamp < date_trunc('hour', NOW()) - INTERVAL '1 hour';
             """
-            self.cursor.execute(backup_query)
+            cur.execute(backup_query)
 
             delete_old_query = """
             DELETE FROM air_quality 
             WHERE timestamp < date_trunc('hour', NOW()) - INTERVAL '1 hour'
             AND timestamp >= CURRENT_DATE - INTERVAL '2 days';
             """
-            self.cursor.execute(delete_old_query)
-            deleted_rows = self.cursor.rowcount
+            cur.execute(delete_old_query)
+            deleted_rows = cur.rowcount
             logger.info(f"Cancellati {deleted_rows} record originali")
 
             insert_into_original_query = """
@@ -523,27 +556,32 @@ class PostgresHandler:
             FROM temp_air_quality_hourly
             ON CONFLICT DO NOTHING;
             """
-            self.cursor.execute(insert_into_original_query)
-            inserted_rows = self.cursor.rowcount
+            cur.execute(insert_into_original_query)
+            inserted_rows = cur.rowcount
             logger.info(f"Inseriti {inserted_rows} record aggregati nella tabella principale")
 
-            self.connection.commit()
-            self.connection.autocommit = True
-
-            logger.info("Aggregazione completata con successo")
+            # I conteggi dei due giorni chiusi riscritti cambiano: aggiorna il riepilogo giornaliero
+            today = datetime.now().date()
+            summarize_days(cur, 'air_quality_index', today - timedelta(days=2), today)
             return True
 
+        try:
+            if self._run(aggregate):
+                # Le righe degli ultimi due giorni sono state sostituite dalle medie orarie
+                now = datetime.now()
+                for days_back in range(3):
+                    invalidate_timestamp('air_quality', now - timedelta(days=days_back))
+                logger.info("Aggregazione completata con successo")
+                return True
+            return False
+
         except Error as e:
             logger.error(f"Errore durante l'aggregazione dei dati: {e}")
-            if self.connection:
-                self.connection.rollback()
-                self.connection.autocommit = True
             return False
 
     def get_data_stats(self):
         """Ottieni statistiche sui dati per debugging."""
         try:
-            self._ensure_connection()
             stats_query = """
             SELECT 
                 COUNT(*) as total_records,
@@ -553,8 +591,7 @@ class PostgresHandler:
                 AVG(air_quality_index) as avg_aqi
             FROM air_quality;
             """
-            self.cursor.execute(stats_query)
-            result = self.cursor.fetchone()
+            result = self._fetchone(stats_query)
 
             if result:
                 return {
@@ -571,15 +608,8 @@ class PostgresHandler:
             return None
 
     def close(self):
-        """Chiudi connessione e cursor."""
-        try:
-            if self.cursor:
-                self.cursor.close()
-            if self.connection and not self.connection.closed:
-                self.connection.close()
-            logger.info("Connessione database chiusa")
-        except Error as e:
-            logger.error(f"Errore durante la chiusura della connessione: {e}")
+        """Le connessioni appartengono al pool condiviso: non c'è nulla da chiudere per l'handler."""
+        logger.debug("PostgresHandler rilasciato (le connessioni restano nel pool)")
 
     def __enter__(self):
         return self
@@ -588,20 +618,17 @@ class PostgresHandler:
         self.close()
 
     def execute_query(self, query, params=None, fetch=False):
-        with self.connection.cursor() as cur:
+        def op(cur):
             cur.execute(query, params or ())
-            if fetch:
-                return cur.fetchall()
-            else:
-                self.connection.commit()
-                return []
+            return cur.fetchall() if fetch else []
+        return self._run(op)
 
     @contextmanager
     def get_connection(self):
-        """Context manager per la connessione al DB"""
+        """Context manager per una connessione presa in prestito dal pool"""
         conn = None
         try:
-            conn = psycopg2.connect(**self.db_config)
+            conn = self.pool.getconn()
             yield conn
             conn.commit()
         except Exception:
@@ -615,42 +642,27 @@ class PostgresHandler:
     def set_target_temperature(self, value):
         query = "UPDATE target_temperature SET value=%s, updated_at=NOW() WHERE id=1;"
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query, (value,))
+            self._execute(query, (value,))
             return True
         except Exception as e:
             logger.error(f"Errore set_target_temperature: {e}")
             return False
 
     def get_target_temperature(self):
-        query = "SELECT value FROM target_temperature ORDER BY updated_at DESC LIMIT 1;"
-        conn = None
-        cur = None
         try:
-            conn = self._connect()
-            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cur.execute(query)
-            row = cur.fetchone()
+            row = self.fetchone_prepared('target_temperature', cursor_factory=psycopg2.extras.DictCursor)
             if row:
                 return float(row['value'])
             return None
         except Exception as e:
             logger.error(f"Errore get_target_temperature: {e}")
             return None
-        finally:
-            if cur: cur.close()
-            if conn: conn.close()
 
     def get_thermostat_status(self):
         """Ottiene lo stato corrente del termostato (abilitato/disabilitato)."""
-        query = "SELECT enabled FROM thermostat_status WHERE id = 1;"
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query)
-                    row = cur.fetchone()
-                    return bool(row[0]) if row else False
+            row = self.fetchone_prepared('thermostat_status')
+            return bool(row[0]) if row else False
         except Exception as e:
             logger.error(f"Errore get_thermostat_status: {e}")
             return False
@@ -664,9 +676,7 @@ class PostgresHandler:
         SET enabled = EXCLUDED.enabled, updated_at = NOW();
         """
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query, (enabled,))
+            self._execute(query, (enabled,))
             logger.info(f"Stato termostato impostato: {enabled}")
             return True
         except Exception as e:
@@ -675,13 +685,9 @@ class PostgresHandler:
 
     def get_boiler_status(self):
         """Ottiene lo stato corrente della caldaia (accesa/spenta)."""
-        query = "SELECT is_on FROM boiler_status WHERE id = 1;"
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query)
-                    row = cur.fetchone()
-                    return bool(row[0]) if row else False
+            row = self.fetchone_prepared('boiler_status')
+            return bool(row[0]) if row else False
         except Exception as e:
             logger.error(f"Errore get_boiler_status: {e}")
             return False
@@ -695,9 +701,7 @@ class PostgresHandler:
         SET is_on = EXCLUDED.is_on, updated_at = NOW();
         """
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query, (is_on,))
+            self._execute(query, (is_on,))
             logger.info(f"Stato caldaia impostato: {is_on}")
             return True
         except Exception as e:
@@ -705,17 +709,9 @@ class PostgresHandler:
             return False
 
     def get_current_temperature(self):
-        """Ottiene la temperatura corrente dal sensore."""
-        query = """
-        SELECT temperature_c 
-        FROM sensor_readings 
-        ORDER BY timestamp DESC 
-        LIMIT 1;
-        """
+        """Ottiene la temperatura corrente dal sensore del termostato (``THERMOSTAT_SENSOR_ID``)."""
         try:
-            self._ensure_connection()
-            self.cursor.execute(query)
-            row = self.cursor.fetchone()
+            row = self.fetchone_prepared('latest_reading_by_sensor', (THERMOSTAT_SENSOR_ID,))
             if row:
                 return float(row[0])
             return None
@@ -723,97 +719,6 @@ class PostgresHandler:
             logger.error(f"Errore get_current_temperature: {e}")
             return None
 
-    def create_thermostat_tables(self):
-        """Crea le tabelle necessarie per il termostato se non esistono."""
-        try:
-            self._ensure_connection()
-
-            create_target_temp_query = """
-            CREATE TABLE IF NOT EXISTS target_temperature (
-                id INTEGER PRIMARY KEY DEFAULT 1,
-                value FLOAT NOT NULL DEFAULT 20.0,
-                updated_at TIMESTAMP DEFAULT NOW(),
-                CONSTRAINT single_row CHECK (id = 1)
-            );
-            INSERT INTO target_temperature (id, value, updated_at)
-            VALUES (1, 20.0, NOW())
-            ON CONFLICT (id) DO NOTHING;
-            """
-
-            create_thermostat_status_query = """
-            CREATE TABLE IF NOT EXISTS thermostat_status (
-                id INTEGER PRIMARY KEY DEFAULT 1,
-                enabled BOOLEAN NOT NULL DEFAULT FALSE,
-                updated_at TIMESTAMP DEFAULT NOW(),
-                CONSTRAINT single_row CHECK (id = 1)
-            );
-            INSERT INTO thermostat_status (id, enabled, updated_at)
-            VALUES (1, FALSE, NOW())
-            ON CONFLICT (id) DO NOTHING;
-            """
-
-            create_boiler_status_query = """
-            CREATE TABLE IF NOT EXISTS boiler_status (
-                id INTEGER PRIMARY KEY DEFAULT 1,
-                is_on BOOLEAN NOT NULL DEFAULT FALSE,
-                updated_at TIMESTAMP DEFAULT NOW(),
-                CONSTRAINT single_row CHECK (id = 1)
-            );
-            INSERT INTO boiler_status (id, is_on, updated_at)
-            VALUES (1, FALSE, NOW())
-            ON CONFLICT (id) DO NOTHING;
-            """
-
-            create_thermostat_log_query = """
-            CREATE TABLE IF NOT EXISTS thermostat_log (
-                id SERIAL PRIMARY KEY,
-                action VARCHAR(50) NOT NULL,
-                current_temp FLOAT,
-                target_temp FLOAT,
-                boiler_status BOOLEAN,
-                timestamp TIMESTAMP DEFAULT NOW()
-            );
-            CREATE INDEX IF NOT EXISTS idx_thermostat_log_timestamp 
-            ON thermostat_log(timestamp DESC);
-            """
-
-            # ── Nuova tabella blackout ──────────────────────────────────────────────
-            create_boiler_blackout_query = """
-            CREATE TABLE IF NOT EXISTS boiler_blackout (
-                id INTEGER PRIMARY KEY DEFAULT 1,
-                enabled BOOLEAN NOT NULL DEFAULT FALSE,
-                start_month INTEGER NOT NULL DEFAULT 4,
-                start_day   INTEGER NOT NULL DEFAULT 1,
-                end_month   INTEGER NOT NULL DEFAULT 9,
-                end_day     INTEGER NOT NULL DEFAULT 30,
-                reason      TEXT NOT NULL DEFAULT 'Boiler disabled during warm season',
-                updated_at  TIMESTAMP DEFAULT NOW(),
-                CONSTRAINT single_row CHECK (id = 1),
-                CONSTRAINT valid_start_month CHECK (start_month BETWEEN 1 AND 12),
-                CONSTRAINT valid_end_month   CHECK (end_month   BETWEEN 1 AND 12),
-                CONSTRAINT valid_start_day   CHECK (start_day   BETWEEN 1 AND 31),
-                CONSTRAINT valid_end_day     CHECK (end_day     BETWEEN 1 AND 31)
-            );
-            INSERT INTO boiler_blackout (id, enabled, start_month, start_day, end_month, end_day, reason, updated_at)
-            VALUES (1, FALSE, 4, 1, 9, 30, 'Boiler disabled during warm season', NOW())
-            ON CONFLICT (id) DO NOTHING;
-            """
-
-            self.cursor.execute(create_target_temp_query)
-            self.cursor.execute(create_thermostat_status_query)
-            self.cursor.execute(create_boiler_status_query)
-            self.cursor.execute(create_thermostat_log_query)
-            self.cursor.execute(create_boiler_blackout_query)
-
-            self.connection.commit()
-            logger.info("Tabelle termostato (incluso blackout) create/verificate correttamente")
-
-        except Exception as e:
-            logger.error(f"Errore durante la creazione delle tabelle termostato: {e}")
-            if self.connection:
-                self.connection.rollback()
-            raise
-
     def log_thermostat_action(self, action, current_temp=None, target_temp=None, boiler_status=None):
         """Registra un'azione del termostato nel log."""
         query = """
@@ -821,13 +726,9 @@ class PostgresHandler:
         VALUES (%s, %s, %s, %s, NOW())
         """
         try:
-            self._ensure_connection()
-            self.cursor.execute(query, (action, current_temp, target_temp, boiler_status))
-            self.connection.commit()
+            self._execute(query, (action, current_temp, target_temp, boiler_status))
         except Exception as e:
             logger.error(f"Errore log_thermostat_action: {e}")
-            if self.connection:
-                self.connection.rollback()
 
     def get_thermostat_log(self, limit=50):
         """Ottiene gli ultimi N record del log del termostato."""
@@ -838,9 +739,7 @@ class PostgresHandler:
         LIMIT %s;
         """
         try:
-            self._ensure_connection()
-            self.cursor.execute(query, (limit,))
-            rows = self.cursor.fetchall()
+            rows = self._fetchall(query, (limit,))
 
             return [{
                 'action': row[0],
@@ -872,20 +771,17 @@ class PostgresHandler:
             'updated_at': None,
         }
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query)
-                    row = cur.fetchone()
-                    if row:
-                        return {
-                            'enabled':     bool(row[0]),
-                            'start_month': int(row[1]),
-                            'start_day':   int(row[2]),
-                            'end_month':   int(row[3]),
-                            'end_day':     int(row[4]),
-                            'reason':      str(row[5]),
-                            'updated_at':  row[6].isoformat() if row[6] else None,
-                        }
+            row = self._fetchone(query)
+            if row:
+                return {
+                    'enabled':     bool(row[0]),
+                    'start_month': int(row[1]),
+                    'start_day':   int(row[2]),
+                    'end_month':   int(row[3]),
+                    'end_day':     int(row[4]),
+                    'reason':      str(row[5]),
+                    'updated_at':  row[6].isoformat() if row[6] else None,
+                }
             return fallback
         except Exception as e:
             logger.error(f"Errore get_boiler_blackout: {e}")
@@ -906,10 +802,8 @@ class PostgresHandler:
             updated_at  = NOW();
         """
         try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cur:
-                    cur.execute(query, (enabled, start_month, start_day,
-                                        end_month, end_day, reason))
+            self._execute(query, (enabled, start_month, start_day,
+                                  end_month, end_day, reason))
             return True
         except Exception as e:
             logger.error(f"Errore set_boiler_blackout: {e}")
@@ -0,0 +1,130 @@
+class Deadband:
+    """Banda morta su una metrica: un valore conta solo se si allontana più di ``width``
+    dall'ultimo valore salvato."""
+
+    def __init__(self, width):
+        self.width = width
+        self.archived = None
+
+    def reset(self, t, value):
+        self.archived = value
+
+    def exceeded(self, t, value):
+        return self.archived is None or abs(value - self.archived) > self.width
+
+
+class SwingingDoor:
+    """Swinging door trending (SDT) su una metrica.
+
+    Dall'ultimo punto salvato (l'"anchor") partono due porte a ±``deviation``;
+    ogni nuovo campione le restringe. Quando un campione cade fuori, il
+    campione precedente va salvato: la retta tra due punti salvati consecutivi
+    passa a meno di ``deviation`` da tutti i campioni scartati in mezzo.
+    """
+
+    def __init__(self, deviation):
+        self.deviation = deviation
+        self.anchor = None
+        self.upper = None   # pendenza massima ammessa
+        self.lower = None   # pendenza minima ammessa
+
+    def reset(self, t, value):
+        self.anchor = (t, value)
+        self.upper = float('inf')
+        self.lower = float('-inf')
+
+    def exceeded(self, t, value):
+        """True se il campione chiude la porta (il precedente va salvato)."""
+        if self.anchor is None:
+            return True
+        t0, v0 = self.anchor
+        dt = t - t0
+        if dt <= 0:
+            return abs(value - v0) > self.deviation
+        slope = (value - v0) / dt
+        if slope > self.upper or slope < self.lower:
+            return True
+        self.upper = min(self.upper, (value + self.deviation - v0) / dt)
+        self.lower = max(self.lower, (value - self.deviation - v0) / dt)
+        return False
+
+
+class IngestCompressor:
+    """Decide quali righe multi-metrica salvare tra quelle lette dal sensore.
+
+    ``mode`` è ``'deadband'`` (si salva il campione corrente quando una
+    metrica esce dalla sua banda) o ``'sdt'`` (si salva il campione che
+    precede la chiusura di una porta). ``tolerances`` associa a ogni metrica
+    la banda o la deviazione massima; una tolleranza 0 salva ogni variazione.
+    In entrambi i modi una riga viene salvata comunque ogni ``heartbeat``
+    secondi, così i grafici e l'ultima lettura non restano mai fermi a lungo.
+    Una riga salvata azzera lo stato di tutte le metriche, perché viene
+    memorizzata con tutti i suoi valori.
+    """
+
+    MODES = ('deadband', 'sdt')
+
+    def __init__(self, metrics, tolerances, mode='deadband', heartbeat=900):
+        if mode not in self.MODES:
+            raise ValueError(f"Modalità di compressione non valida: {mode}")
+        self.metrics = tuple(metrics)
+        self.mode = mode
+        self.heartbeat = heartbeat
+        factory = SwingingDoor if mode == 'sdt' else Deadband
+        self.filters = {metric: factory(tolerances.get(metric, 0)) for metric in self.metrics}
+
+        self.last_archived_at = None
+        self.held = None   # (t, valori, payload) dell'ultimo campione non salvato (solo SDT)
+        self.received = 0
+        self.archived = 0
+        self.heartbeats = 0
+
+    def _archive(self, t, values):
+        for metric in self.metrics:
+            self.filters[metric].reset(t, values[metric])
+        self.last_archived_at = t
+        self.archived += 1
+
+    def offer(self, t, values, payload=None):
+        """Valuta un campione (``t`` in secondi, ``values`` dict metrica -> valore).
+
+        Restituisce il ``payload`` del campione da salvare, o None. In modalità
+        SDT il payload restituito può essere quello del campione precedente.
+        """
+        self.received += 1
+        payload = values if payload is None else payload
+
+        if self.last_archived_at is None:
+            self._archive(t, values)
+            return payload
+
+        exceeded = any(self.filters[m].exceeded(t, values[m]) for m in self.metrics)
+
+        if self.mode == 'sdt' and exceeded and self.held is not None:
+            held_t, held_values, held_payload = self.held
+            self._archive(held_t, held_values)
+            # La nuova porta parte dal punto salvato e contiene già il campione corrente
+            for metric in self.metrics:
+                self.filters[metric].exceeded(t, values[metric])
+            self.held = (t, values, payload)
+            return held_payload
+
+        if exceeded or t - self.last_archived_at >= self.heartbeat:
+            if not exceeded:
+                self.heartbeats += 1
+            self._archive(t, values)
+            self.held = None
+            return payload
+
+        if self.mode == 'sdt':
+            self.held = (t, values, payload)
+        return None
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'received': self.received,
+            'archived': self.archived,
+            'heartbeats': self.heartbeats,
+            'ratio': round(self.received / self.archived, 2) if self.archived else None,
+        }
@@ -20,6 +20,112 @@ RECEIPTS_DB_CONFIG = {
     'port': int(os.environ.get('DB_PORT', '5432'))
 }
 
+# PostgreSQL connection pool (shared by every service in the process)
+DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))  # seconds to wait for a free connection
+DB_POOL_HEALTHCHECK_IDLE = float(os.environ.get('DB_POOL_HEALTHCHECK_IDLE', '30'))  # ping connections idle longer than this
+
+# Retention of the partitioned time-series tables, in days (0 = keep everything).
+# Applied by dropping whole monthly partitions.
+SENSOR_RAW_RETENTION_DAYS = int(os.environ.get('SENSOR_RAW_RETENTION_DAYS', '0'))
+AIR_QUALITY_RETENTION_DAYS = int(os.environ.get('AIR_QUALITY_RETENTION_DAYS', '0'))
+PICO_LOGS_RETENTION_DAYS = int(os.environ.get('PICO_LOGS_RETENTION_DAYS', '30'))
+DEVICE_METRICS_RETENTION_DAYS = int(os.environ.get('DEVICE_METRICS_RETENTION_DAYS', '0'))
+
+REDIS_HOST = os.environ.get('REDIS_HOST', 'redis')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', '6379'))
+
+# Two-level (in-process LRU + Redis) cache of historical aggregates
+QUERY_CACHE_ENABLED = os.environ.get('QUERY_CACHE_ENABLED', 'true').lower() == 'true'
+QUERY_CACHE_SIZE = int(os.environ.get('QUERY_CACHE_SIZE', '256'))  # entries in the in-process LRU
+QUERY_CACHE_CURRENT_TTL = int(os.environ.get('QUERY_CACHE_CURRENT_TTL', '60'))  # period still in progress
+QUERY_CACHE_HISTORY_TTL = int(os.environ.get('QUERY_CACHE_HISTORY_TTL', str(7 * 24 * 3600)))  # closed periods
+QUERY_CACHE_LOCAL_MAX_TTL = int(os.environ.get('QUERY_CACHE_LOCAL_MAX_TTL', '300'))  # cap for the in-process level
+
+# Serial sensors read by main.py, as comma-separated "sensor_id=port[:baud[:temperature_offset]]".
+# Rows written before sensors had an identity belong to DEFAULT_SENSOR_ID; the
+# thermostat regulates on THERMOSTAT_SENSOR_ID.
+DEFAULT_SENSOR_ID = 'main'
+SENSOR_SOURCES = os.environ.get('SENSOR_SOURCES', f'{DEFAULT_SENSOR_ID}=/dev/ttyACM0:9600:-1.7')
+THERMOSTAT_SENSOR_ID = os.environ.get('THERMOSTAT_SENSOR_ID', DEFAULT_SENSOR_ID)
+
+# Serial ingest pipeline (sensor_reader -> bounded queue -> batched writes)
+INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', '1000'))  # samples buffered before dropping the oldest
+INGEST_FLUSH_INTERVAL = float(os.environ.get('INGEST_FLUSH_INTERVAL', '5'))  # seconds between group commits
+INGEST_MAX_BATCH = int(os.environ.get('INGEST_MAX_BATCH', '500'))  # rows that force an early flush
+INGEST_STATS_INTERVAL = float(os.environ.get('INGEST_STATS_INTERVAL', '60'))  # seconds between stats snapshots
+
+# Ingest compression of sensor readings: 'deadband' or 'sdt' (swinging door trending).
+# The tolerances are the deadband width or the maximum SDT deviation per metric;
+# a row is stored anyway after COMPRESSION_HEARTBEAT seconds without one.
+COMPRESSION_MODE = os.environ.get('COMPRESSION_MODE', 'deadband')
+COMPRESSION_TEMPERATURE_TOLERANCE = float(os.environ.get('COMPRESSION_TEMPERATURE_TOLERANCE', '0.2'))  # °C
+COMPRESSION_HUMIDITY_TOLERANCE = float(os.environ.get('COMPRESSION_HUMIDITY_TOLERANCE', '1.0'))  # % RH
+COMPRESSION_HEARTBEAT = float(os.environ.get('COMPRESSION_HEARTBEAT', '900'))
+
+# Local SQLite spool for rows that could not be written while PostgreSQL was down
+SPOOL_DIR = os.environ.get('SPOOL_DIR', 'spool')
+SPOOL_REPLAY_BATCH = int(os.environ.get('SPOOL_REPLAY_BATCH', '500'))  # rows per replayed insert
+SPOOL_REPLAY_PAUSE = float(os.environ.get('SPOOL_REPLAY_PAUSE', '1'))  # seconds between replayed batches
+SPOOL_REPLAY_MAX_QUEUE_RATIO = float(os.environ.get('SPOOL_REPLAY_MAX_QUEUE_RATIO', '0.5'))  # pause replay above this live queue fill
+
+# Write-behind buffer for air quality POSTs: one multi-row insert per flush
+AIR_QUALITY_QUEUE_SIZE = int(os.environ.get('AIR_QUALITY_QUEUE_SIZE', '5000'))
+AIR_QUALITY_FLUSH_INTERVAL_MS = int(os.environ.get('AIR_QUALITY_FLUSH_INTERVAL_MS', '500'))
+AIR_QUALITY_MAX_BATCH = int(os.environ.get('AIR_QUALITY_MAX_BATCH', '200'))  # rows that force an early flush
+AIR_QUALITY_WAIT_TIMEOUT = float(os.environ.get('AIR_QUALITY_WAIT_TIMEOUT', '5'))  # seconds a ?wait=true POST blocks
+
+# Alarm notifications (notifier.NotificationDispatcher)
+NOTIFY_QUEUE_SIZE = int(os.environ.get('NOTIFY_QUEUE_SIZE', '1000'))
+NOTIFY_COALESCE_WINDOW = float(os.environ.get('NOTIFY_COALESCE_WINDOW', '10'))  # seconds a burst of alarms is merged over
+NOTIFY_RATE_PER_MINUTE = float(os.environ.get('NOTIFY_RATE_PER_MINUTE', '6'))  # messages per channel
+NOTIFY_BURST = int(os.environ.get('NOTIFY_BURST', '3'))
+NOTIFY_MAX_ATTEMPTS = int(os.environ.get('NOTIFY_MAX_ATTEMPTS', '3'))
+NOTIFY_DEVICES_TTL = float(os.environ.get('NOTIFY_DEVICES_TTL', '60'))  # seconds the device list in alarm emails is cached
+SMTP_TIMEOUT = float(os.environ.get('SMTP_TIMEOUT', '30'))
+
+# Unified time-series endpoint (/api/series)
+SERIES_MAX_POINTS = int(os.environ.get('SERIES_MAX_POINTS', '1000'))  # target points when bucket=auto
+SERIES_MIN_POINTS = int(os.environ.get('SERIES_MIN_POINTS', '100'))  # bucket=auto switches to a rollup above this many of its rows
+SERIES_MAX_BUCKETS = int(os.environ.get('SERIES_MAX_BUCKETS', '20000'))  # explicit buckets allowed per request
+SERIES_RAW_LIMIT = int(os.environ.get('SERIES_RAW_LIMIT', '50000'))  # rows returned with bucket=raw
+
+# Multiplexed dashboard requests (/api/batch)
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', '20'))  # routes per batch
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', '6'))  # sub-requests running at once, across batches
+BATCH_TIMEOUT = float(os.environ.get('BATCH_TIMEOUT', '15'))  # seconds before pending entries answer 504
+
+# Streaming exports (/api/export, export_data.py): rows fetched per round trip,
+# which is also the Parquet row group size
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '10000'))
+EXPORT_MAX_CHUNK_SIZE = 100000
+
+# Batched HTTP ingest (/api/ingest)
+INGEST_HTTP_MAX_POINTS = int(os.environ.get('INGEST_HTTP_MAX_POINTS', '100000'))  # points accepted per request
+INGEST_HTTP_MAX_ERRORS = 20  # parse errors echoed back per request
+
+# Postgres LISTEN/NOTIFY channel carrying alarm state changes to the sensor reader
+ALARM_STATUS_CHANNEL = 'alarm_status'
+
+# Postgres LISTEN/NOTIFY channel carrying every committed sensor reading to the web app
+SENSOR_READINGS_CHANNEL = 'sensor_readings_new'
+
+# Postgres LISTEN/NOTIFY channel carrying every committed air quality record to the web app
+AIR_QUALITY_CHANNEL = 'air_quality_new'
+
+# Socket.IO push of new readings and hourly aggregates (/sensors and /air-quality namespaces)
+LIVE_PUSH_ENABLED = os.environ.get('LIVE_PUSH_ENABLED', 'true').lower() == 'true'
+
+# Raspberry Pi stats (/api_raspberry_pi_stats) are sampled in the background every
+# RASPI_STATS_INTERVAL seconds; polls between two samples are answered with 304
+RASPI_STATS_INTERVAL = float(os.environ.get('RASPI_STATS_INTERVAL', '10'))
+
+# In-process window of recent readings answering the "today"/latest endpoints
+HOT_WINDOW_ENABLED = os.environ.get('HOT_WINDOW_ENABLED', 'true').lower() == 'true'
+HOT_WINDOW_HOURS = int(os.environ.get('HOT_WINDOW_HOURS', '48'))
+HOT_WINDOW_CAPACITY = int(os.environ.get('HOT_WINDOW_CAPACITY', '200000'))  # rows; keep at least 2x the rows of HOT_WINDOW_HOURS
+
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'tiff', 'bmp'}
 
 RECEIPT_LOG_LEVEL = os.environ.get('RECEIPT_LOG_LEVEL', 'INFO')
@@ -56,8 +162,8 @@ def get_config():
         'USERNAME_PI': os.getenv('USERNAME_PI'),
         
         # Redis Configuration
-        'REDIS_HOST': os.getenv('REDIS_HOST', 'redis'),
-        'REDIS_PORT': int(os.getenv('REDIS_PORT', 6379))
+        'REDIS_HOST': REDIS_HOST,
+        'REDIS_PORT': REDIS_PORT
     }
 
 def setup_logging():
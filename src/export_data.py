@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Esportazione a riga di comando delle tabelle storiche (CSV, NDJSON, Parquet).
+
+Stesso motore di ``GET /api/export/<table>`` (services.export_service): le
+righe arrivano da un cursore lato server a blocchi di ``--chunk-size`` e
+vengono scritte man mano, quindi la memoria resta costante qualunque sia
+l'intervallo. Senza ``--output`` CSV e NDJSON vanno su stdout.
+
+    python export_data.py sensor_readings --from 2023-01-01 --to 2025-01-01 -f parquet -o letture.parquet
+    python export_data.py air_quality --from 2024-06-01 -f ndjson | gzip > aria.ndjson.gz
+    python export_data.py thermostat_log -o termostato.csv
+"""
+
+import argparse
+import resource
+import sys
+import time
+
+from config.settings import get_config
+from services.export_service import EXPORT_TABLES, FORMATS, TableExport, parse_chunk_size
+from utils.time_windows import parse_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('table', choices=sorted(EXPORT_TABLES), help='tabella da esportare')
+    parser.add_argument('-f', '--format', choices=sorted(FORMATS), default='csv', help='formato di uscita')
+    parser.add_argument('--from', dest='start', type=parse_time, help='inizio (incluso), ISO 8601 o epoch')
+    parser.add_argument('--to', dest='end', type=parse_time, help='fine (esclusa), ISO 8601 o epoch')
+    parser.add_argument('--sensor-id', '--device', dest='key', help='solo questo sensore/dispositivo')
+    parser.add_argument('--chunk-size', type=parse_chunk_size, default=None,
+                        help='righe per blocco (e per row group Parquet)')
+    parser.add_argument('-o', '--output', help='file di uscita (default: stdout)')
+    args = parser.parse_args()
+
+    if args.format == 'parquet' and not args.output and sys.stdout.isatty():
+        parser.error("l'output Parquet è binario: usa --output o redirigi stdout")
+
+    config = get_config()
+    try:
+        export = TableExport(
+            config['DB_CONFIG'], args.table, fmt=args.format, start=args.start, end=args.end,
+            key=args.key, chunk_size=args.chunk_size or parse_chunk_size(None),
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    started = time.perf_counter()
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        export.open()
+        for data in export.chunks():
+            out.write(data)
+    finally:
+        export.close()
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+
+    # ru_maxrss è in KB su Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(
+        f"Esportate {export.rows} righe di {args.table} ({export.bytes / 1024 ** 2:.1f} MB {args.format}) "
+        f"in {time.perf_counter() - started:.1f}s, memoria massima {peak_mb:.0f} MB",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
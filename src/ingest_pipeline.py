@@ -0,0 +1,297 @@
+import json
+import logging
+import queue
+import threading
+import time
+
+import redis
+
+from config.settings import (
+    REDIS_HOST,
+    REDIS_PORT,
+    INGEST_QUEUE_SIZE,
+    INGEST_FLUSH_INTERVAL,
+    INGEST_MAX_BATCH,
+    INGEST_STATS_INTERVAL,
+)
+
+# Chiave Redis con l'ultima istantanea dei contatori, letta dalla web app
+STATS_KEY_PREFIX = 'smarthouse:ingest'
+
+
+class WriteTicket:
+    """Permette a chi accoda un campione di attendere l'esito della sua scrittura.
+
+    ``status`` diventa ``'written'`` (commit su PostgreSQL), ``'spooled'``
+    (salvato nello spool locale), ``'filtered'`` (scartato da ``transform``)
+    o ``'dropped'`` (perso per coda piena).
+    """
+
+    def __init__(self):
+        self.status = None
+        self._event = threading.Event()
+
+    def resolve(self, status):
+        self.status = status
+        self._event.set()
+
+    def wait(self, timeout=None):
+        """Attende l'esito per al massimo ``timeout`` secondi; None se non è ancora noto."""
+        self._event.wait(timeout)
+        return self.status
+
+
+class IngestPipeline:
+    """Coda limitata tra chi produce campioni e uno stadio di scrittura a batch.
+
+    Il produttore (es. il thread che legge la seriale) chiama ``offer()``, che
+    non blocca mai: se la coda è piena viene scartato il campione più vecchio e
+    conteggiato. Il thread ``run()`` svuota la coda, applica ``transform`` a
+    ogni campione (``None`` = scarta) e ogni ``flush_interval`` secondi, o al
+    raggiungimento di ``max_batch`` righe, chiama ``write_batch(rows)`` con un
+    solo commit. Se la scrittura fallisce le righe finiscono nello ``spool``
+    locale (vedi spool.py), che le reinserisce quando il database torna; senza
+    spool, o se anche lo spool fallisce, restano in memoria e vengono ritentate
+    al flush successivo, fino a ``max_queue`` righe. ``extra_stats`` (nome ->
+    funzione) aggiunge alle statistiche pubblicate quelle di altri componenti.
+
+    Chi deve sapere quando il campione è durevole passa un ``WriteTicket`` a
+    ``offer()`` (o usa ``submit()``) e ne attende l'esito.
+    """
+
+    def __init__(self, name, write_batch, transform=None, spool=None, max_queue=INGEST_QUEUE_SIZE,
+                 flush_interval=INGEST_FLUSH_INTERVAL, max_batch=INGEST_MAX_BATCH,
+                 stats_interval=INGEST_STATS_INTERVAL, extra_stats=None):
+        self.name = name
+        self.write_batch = write_batch
+        self.transform = transform
+        self.spool = spool
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.stats_interval = stats_interval
+        self.extra_stats = dict(extra_stats or {})
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.pending = []
+        self.pending_tickets = []
+        self.failing = False
+        self.running = True
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.last_flush = time.monotonic()
+        self.last_stats = time.monotonic()
+
+        self.logger = logging.getLogger(f"ingest.{name}")
+        self.redis = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+        self.counters = {
+            'received': 0,
+            'dropped': 0,
+            'filtered': 0,
+            'transform_errors': 0,
+            'written': 0,
+            'batches': 0,
+            'flush_errors': 0,
+            'retry_dropped': 0,
+            'spooled': 0,
+            'queue_high_water': 0,
+            'flush_latency_last_ms': 0.0,
+            'flush_latency_max_ms': 0.0,
+            'flush_latency_total_ms': 0.0,
+            'waiters': 0,
+            'wait_timeouts': 0,
+        }
+
+    def _bump(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    @staticmethod
+    def _resolve(tickets, status):
+        for ticket in tickets:
+            if ticket is not None:
+                ticket.resolve(status)
+
+    def offer(self, sample, ticket=None):
+        """Accoda un campione senza mai bloccare il produttore."""
+        self._bump('received')
+        try:
+            self.queue.put_nowait((sample, ticket))
+        except queue.Full:
+            # Coda piena: si perde il campione più vecchio, non quello appena letto
+            try:
+                _, dropped_ticket = self.queue.get_nowait()
+                self._resolve([dropped_ticket], 'dropped')
+            except queue.Empty:
+                pass
+            self._bump('dropped')
+            try:
+                self.queue.put_nowait((sample, ticket))
+            except queue.Full:
+                self._bump('dropped')
+                self._resolve([ticket], 'dropped')
+                return False
+
+        depth = self.queue.qsize()
+        with self._lock:
+            if depth > self.counters['queue_high_water']:
+                self.counters['queue_high_water'] = depth
+        return True
+
+    def submit(self, sample, timeout):
+        """Accoda un campione e attende fino a ``timeout`` secondi che sia scritto.
+
+        Restituisce lo stato del ``WriteTicket`` (None se il tempo è scaduto:
+        il campione resta comunque in coda).
+        """
+        ticket = WriteTicket()
+        self._bump('waiters')
+        self.offer(sample, ticket)
+        status = ticket.wait(timeout)
+        if status is None:
+            self._bump('wait_timeouts')
+        return status
+
+    def _drain(self, timeout):
+        """Sposta in ``pending`` i campioni in coda, attendendo al massimo ``timeout`` il primo."""
+        try:
+            sample, ticket = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            try:
+                row = self.transform(sample) if self.transform else sample
+            except Exception as e:
+                # Un campione che fa fallire la trasformazione non deve fermare lo stadio
+                row = None
+                self._bump('transform_errors')
+                self.logger.error(f"Errore elaborazione campione {sample}: {e}")
+            if row is None:
+                self._bump('filtered')
+                self._resolve([ticket], 'filtered')
+            else:
+                self.pending.append(row)
+                self.pending_tickets.append(ticket)
+            if len(self.pending) >= self.max_batch:
+                return
+            try:
+                sample, ticket = self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def flush(self):
+        """Scrive le righe in attesa con un solo commit."""
+        with self._flush_lock:
+            self.last_flush = time.monotonic()
+            if not self.pending:
+                return 0
+
+            batch = self.pending
+            tickets = self.pending_tickets
+            started = time.monotonic()
+            try:
+                self.write_batch(batch)
+            except Exception as e:
+                self.failing = True
+                self._bump('flush_errors')
+                self.logger.error(f"Scrittura batch fallita ({len(batch)} righe in attesa): {e}")
+                if self.spool is not None:
+                    try:
+                        self.spool.append(batch)
+                        self.pending = []
+                        self.pending_tickets = []
+                        self._bump('spooled', len(batch))
+                        self._resolve(tickets, 'spooled')
+                        return 0
+                    except Exception as spool_error:
+                        self.logger.error(f"Scrittura nello spool fallita, righe tenute in memoria: {spool_error}")
+                overflow = len(batch) - self.max_queue
+                if overflow > 0:
+                    # Il database è giù da troppo: si tengono le righe più recenti
+                    del batch[:overflow]
+                    self._resolve(tickets[:overflow], 'dropped')
+                    del tickets[:overflow]
+                    self._bump('retry_dropped', overflow)
+                return 0
+
+            elapsed_ms = (time.monotonic() - started) * 1000
+            self.pending = []
+            self.pending_tickets = []
+            self.failing = False
+            self._resolve(tickets, 'written')
+            with self._lock:
+                self.counters['written'] += len(batch)
+                self.counters['batches'] += 1
+                self.counters['flush_latency_last_ms'] = round(elapsed_ms, 2)
+                self.counters['flush_latency_max_ms'] = round(max(self.counters['flush_latency_max_ms'], elapsed_ms), 2)
+                self.counters['flush_latency_total_ms'] += elapsed_ms
+            return len(batch)
+
+    def stats(self):
+        """Istantanea dei contatori della pipeline."""
+        with self._lock:
+            snapshot = dict(self.counters)
+        snapshot['queue_depth'] = self.queue.qsize()
+        snapshot['queue_capacity'] = self.max_queue
+        snapshot['pending'] = len(self.pending)
+        snapshot['flush_latency_avg_ms'] = (
+            round(snapshot['flush_latency_total_ms'] / snapshot['batches'], 2) if snapshot['batches'] else None
+        )
+        snapshot['flush_latency_total_ms'] = round(snapshot['flush_latency_total_ms'], 2)
+        if self.spool is not None:
+            try:
+                snapshot['spool'] = self.spool.stats()
+            except Exception as e:
+                snapshot['spool'] = {'error': str(e)}
+        for name, source in self.extra_stats.items():
+            snapshot[name] = source()
+        snapshot['updated_at'] = time.time()
+        return snapshot
+
+    def publish_stats(self):
+        """Registra i contatori nel log e li pubblica su Redis per l'API della web app."""
+        snapshot = self.stats()
+        self.logger.info(
+            f"coda {snapshot['queue_depth']}/{snapshot['queue_capacity']}, "
+            f"scritti {snapshot['written']}, scartati {snapshot['dropped']}, "
+            f"flush medio {snapshot['flush_latency_avg_ms']} ms"
+        )
+        try:
+            self.redis.set(f"{STATS_KEY_PREFIX}:{self.name}", json.dumps(snapshot), ex=int(self.stats_interval * 3))
+        except redis.RedisError as e:
+            self.logger.debug(f"Pubblicazione statistiche su Redis fallita: {e}")
+
+    def run(self):
+        """Loop dello stadio di scrittura."""
+        self.logger.info(f"📥 Pipeline {self.name} avviata (flush ogni {self.flush_interval}s)")
+
+        while self.running:
+            timeout = max(0.05, self.flush_interval - (time.monotonic() - self.last_flush))
+            self._drain(timeout)
+
+            # Dopo un errore si ritenta solo allo scadere dell'intervallo
+            batch_full = len(self.pending) >= self.max_batch and not self.failing
+            if batch_full or time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+            if time.monotonic() - self.last_stats >= self.stats_interval:
+                self.last_stats = time.monotonic()
+                self.publish_stats()
+
+        # Arresto: si scrive quello che è rimasto in coda
+        while not self.queue.empty():
+            self._drain(0)
+            if not self.flush() and self.failing:
+                break
+        self.flush()
+
+    def stop(self):
+        self.running = False
+
+
+def get_pipeline_stats(name):
+    """Legge da Redis l'ultima istantanea pubblicata dalla pipeline ``name``."""
+    client = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, socket_timeout=0.5, socket_connect_timeout=0.5)
+    payload = client.get(f"{STATS_KEY_PREFIX}:{name}")
+    return json.loads(payload) if payload else None
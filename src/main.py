@@ -1,6 +1,9 @@
-from sensor_reader import SensorReader
+from sensor_reader import SensorReader, parse_sensor_sources
 from dotenv import load_dotenv
 from thermostat_daemon import ThermostatDaemon
+from partition_daemon import PartitionMaintenanceDaemon
+from models.migrations import migrate
+from config.settings import get_config
 import threading
 
 # Carica le variabili d'ambiente dal file .env
@@ -8,11 +11,22 @@ load_dotenv()
 
 def main():
     """Funzione principale per eseguire il programma."""
-    port = '/dev/ttyACM0'  # Porta seriale
-    baud_rate = 9600  # Baud rate
-    timeout = 10  # Timeout in secondi
+    # Porte seriali dei sensori (SENSOR_SOURCES, es. "main=/dev/ttyACM0:9600:-1.7")
+    sources = parse_sensor_sources()
+
+    # Applica le migrazioni dello schema (una sola volta, prima di ogni accesso)
+    migrate(get_config()['DB_CONFIG'])
+
+    # Prepara le partizioni mensili prima di iniziare a scrivere
+    partitions = PartitionMaintenanceDaemon()
+    partitions.maintain()
+    partitions_thread = threading.Thread(
+        target=partitions.run,
+        daemon=True
+    )
+    partitions_thread.start()
         
-    reader = SensorReader(port, baud_rate, timeout)
+    reader = SensorReader(sources)
     thermostat = ThermostatDaemon()
     thermostat_thread = threading.Thread(
         target=thermostat.run,
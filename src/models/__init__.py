@@ -1,4 +1,15 @@
 # models/__init__.py
 from .database import BaseService, handle_db_error, get_db_connection
+from .pool import ConnectionPool, PoolTimeout, get_pool, get_pool_stats
+from .migrations import migrate
 
-__all__ = ['BaseService', 'handle_db_error', 'get_db_connection']
\ No newline at end of file
+__all__ = [
+    'BaseService',
+    'handle_db_error',
+    'get_db_connection',
+    'ConnectionPool',
+    'PoolTimeout',
+    'get_pool',
+    'get_pool_stats',
+    'migrate'
+]
\ No newline at end of file
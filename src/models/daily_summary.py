@@ -0,0 +1,199 @@
+"""
+Day-level summary of the sensor and air quality series, for the heatmaps.
+
+The year heatmaps (month × day) used to aggregate a whole year of
+``sensor_readings_hourly`` or raw ``air_quality`` rows on every request.
+``daily_summary`` keeps, per metric, source and day, the minimum, maximum,
+sum and count of the values, so a year reads at most 366 rows per source.
+
+Only closed days are materialized: ``close_days`` (run by the partition
+maintenance daemon) summarizes the days elapsed since its last pass, plus
+the last ``LOOKBACK_DAYS`` (the air quality compression rewrites the last
+two days) and any sensor day whose hourly rollup changed since (late
+readings replayed from the spool). ``read_days`` completes the summary with
+the days not closed yet, today included, aggregated live from the same
+sources, so a day reads the same before and after it is closed.
+
+All functions take an open cursor and run inside the caller's transaction.
+"""
+
+import logging
+from datetime import date, timedelta
+
+from utils.time_windows import day_window
+
+logger = logging.getLogger(__name__)
+
+# Closed days summarized again on every pass
+LOOKBACK_DAYS = 2
+
+# Statistics a heatmap can show
+HEATMAP_STATS = ('avg', 'min', 'max', 'count')
+
+# metric -> query of its per-source daily aggregates over [start, end), and
+# (optionally) of the days whose source rows changed after a given time
+DAILY_METRICS = {
+    'temperature': {
+        'select': """
+            SELECT sensor_id AS source, hour::date AS day,
+                   MIN(temperature_min) AS value_min, MAX(temperature_max) AS value_max,
+                   SUM(temperature_sum) AS value_sum, SUM(reading_count) AS value_count
+            FROM sensor_readings_hourly
+            WHERE hour >= %(start)s AND hour < %(end)s
+            GROUP BY 1, 2
+        """,
+        'changed': """
+            SELECT DISTINCT hour::date FROM sensor_readings_hourly
+            WHERE hour < %(end)s AND updated_at > %(since)s
+        """,
+    },
+    'humidity': {
+        'select': """
+            SELECT sensor_id AS source, hour::date AS day,
+                   MIN(humidity_min) AS value_min, MAX(humidity_max) AS value_max,
+                   SUM(humidity_sum) AS value_sum, SUM(reading_count) AS value_count
+            FROM sensor_readings_hourly
+            WHERE hour >= %(start)s AND hour < %(end)s
+            GROUP BY 1, 2
+        """,
+        'changed': """
+            SELECT DISTINCT hour::date FROM sensor_readings_hourly
+            WHERE hour < %(end)s AND updated_at > %(since)s
+        """,
+    },
+    'air_quality_index': {
+        'select': """
+            SELECT 'air_quality' AS source, timestamp::date AS day,
+                   MIN(air_quality_index) AS value_min, MAX(air_quality_index) AS value_max,
+                   SUM(air_quality_index) AS value_sum, COUNT(air_quality_index) AS value_count
+            FROM air_quality
+            WHERE timestamp >= %(start)s AND timestamp < %(end)s
+            GROUP BY 1, 2
+        """,
+    },
+}
+
+# Margin on the last summary time: a rollup row updated by a transaction
+# started before the previous pass may have been committed after it
+CHANGED_MARGIN = timedelta(minutes=5)
+
+
+def create_daily_summary_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS daily_summary (
+            metric VARCHAR(32) NOT NULL,
+            source VARCHAR(50) NOT NULL,
+            day DATE NOT NULL,
+            value_min DOUBLE PRECISION,
+            value_max DOUBLE PRECISION,
+            value_sum DOUBLE PRECISION,
+            value_count INTEGER NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (metric, day, source)
+        );
+    """)
+
+
+def summarize_days(cur, metric, start, end):
+    """Rebuild the summary of ``metric`` for the days in ``[start, end)``; returns the rows written."""
+    window = {'start': day_window(start)[0], 'end': day_window(end)[0]}
+    cur.execute(
+        "DELETE FROM daily_summary WHERE metric = %(metric)s AND day >= %(start)s AND day < %(end)s",
+        dict(window, metric=metric),
+    )
+    cur.execute(f"""
+        INSERT INTO daily_summary (metric, source, day, value_min, value_max, value_sum, value_count)
+        SELECT %(metric)s, source, day, value_min, value_max, value_sum, value_count
+        FROM ({DAILY_METRICS[metric]['select']}) AS days
+    """, dict(window, metric=metric))
+    return cur.rowcount
+
+
+def close_days(cur, today=None, lookback=LOOKBACK_DAYS):
+    """Summarize the closed days that are missing or may have changed; returns the rows written."""
+    today = today or date.today()
+    written = 0
+    for metric, spec in DAILY_METRICS.items():
+        cur.execute(
+            "SELECT MAX(day), MAX(updated_at) FROM daily_summary WHERE metric = %s",
+            (metric,),
+        )
+        last_day, last_update = cur.fetchone()
+        if last_day is None:
+            # Nothing summarized yet: the whole history
+            start = date.min
+        else:
+            start = min(last_day + timedelta(days=1), today - timedelta(days=lookback))
+        if start < today:
+            written += summarize_days(cur, metric, start, today)
+
+        if spec.get('changed') and last_update is not None:
+            cur.execute(spec['changed'], {
+                'end': day_window(start)[0],
+                'since': last_update - CHANGED_MARGIN,
+            })
+            for (day,) in cur.fetchall():
+                written += summarize_days(cur, metric, day, day + timedelta(days=1))
+    if written:
+        logger.info(f"Daily summary: {written} rows written up to {today - timedelta(days=1)}")
+    return written
+
+
+def read_days(cur, metric, start, end, source=None):
+    """Daily ``day, min, max, avg, count`` of ``metric`` over ``[start, end)``.
+
+    ``start`` and ``end`` are day bounds. Closed days come from
+    ``daily_summary``; the days after the last closed one (normally just
+    today) are aggregated live. With ``source=None`` the values are combined
+    across sources (the average weighs each source by its count).
+    """
+    start, end = day_window(start)[0], day_window(end)[0]
+    cur.execute("SELECT MAX(day) FROM daily_summary WHERE metric = %s", (metric,))
+    last_day = cur.fetchone()[0]
+    live_start = max(start, day_window(last_day)[1]) if last_day is not None else start
+
+    source_filter = " AND source = %(source)s" if source is not None else ""
+    cur.execute(f"""
+        SELECT day, MIN(value_min) AS min, MAX(value_max) AS max,
+               SUM(value_sum) / NULLIF(SUM(value_count), 0) AS avg, SUM(value_count) AS count
+        FROM (
+            SELECT source, day, value_min, value_max, value_sum, value_count
+            FROM daily_summary
+            WHERE metric = %(metric)s AND day >= %(closed_start)s AND day < %(closed_end)s
+            UNION ALL
+            SELECT * FROM ({DAILY_METRICS[metric]['select']}) AS live
+        ) AS days
+        WHERE value_count > 0{source_filter}
+        GROUP BY day
+        ORDER BY day;
+    """, {
+        'metric': metric,
+        'closed_start': start,
+        'closed_end': min(live_start, end),
+        # window of the live part
+        'start': min(live_start, end),
+        'end': end,
+        'source': source,
+    })
+    return cur.fetchall()
+
+
+def parse_heatmap_stat(value):
+    """``?stat=`` of a heatmap (``avg`` when absent); raises ValueError when unknown."""
+    if value in (None, ''):
+        return 'avg'
+    if value not in HEATMAP_STATS:
+        raise ValueError(f"stat must be one of {', '.join(HEATMAP_STATS)}")
+    return value
+
+
+def to_heatmap(rows, stat='avg'):
+    """``{month: {day: value}}`` of one statistic of ``read_days`` rows (read with a DictCursor)."""
+    heatmap = {}
+    for row in rows:
+        value = row[stat]
+        if value is None:
+            continue
+        value = int(value) if stat == 'count' else round(float(value), 2)
+        heatmap.setdefault(row['day'].month, {})[row['day'].day] = value
+    return heatmap
@@ -6,12 +6,17 @@ import traceback
 from functools import wraps
 from flask import jsonify
 
+from .pool import get_pool, PoolTimeout
+
 logger = logging.getLogger(__name__)
 
 def get_db_connection(db_config):
-    """Create a connection to the PostgreSQL database."""
+    """Lease a connection from the shared PostgreSQL pool.
+
+    Calling ``close()`` on the returned connection gives it back to the pool.
+    """
     try:
-        conn = psycopg2.connect(**db_config)
+        conn = get_pool(db_config).getconn()
         return conn
     except Exception as e:
         logger.error(f"DB connection error: {e}")
@@ -23,6 +28,9 @@ def handle_db_error(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except PoolTimeout as e:
+            logger.error(f"Connection pool exhausted in {func.__name__}: {e}")
+            return jsonify({'error': 'Database busy', 'message': str(e)}), 503
         except psycopg2.OperationalError as e:
             logger.error(f"OperationalError in {func.__name__}: {e}")
             return jsonify({'error': 'Database connection error', 'message': str(e)}), 503
@@ -42,8 +50,8 @@ class BaseService:
         self.db_config = db_config
 
     def _connect(self):
-        """Open a new database connection."""
-        return psycopg2.connect(**self.db_config)
+        """Lease a connection from the shared pool; ``close()`` returns it."""
+        return get_pool(self.db_config).getconn()
     
     def _execute_query(self, query, params=None, fetch_one=False, fetch_all=True):
         """Safely execute an SQL query with options for fetchone, fetchall, or commit.
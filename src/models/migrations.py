@@ -0,0 +1,335 @@
+"""
+Versioned schema migrations.
+
+The schema used to be created piecemeal: ``PostgresHandler.__init__`` and
+several services ran ``CREATE TABLE IF NOT EXISTS`` every time they were
+constructed, some of them once per request or per inserted row. All DDL now
+lives here as an ordered list of migrations that run once, at startup of
+``main.py`` / ``app.py`` or explicitly at deploy time::
+
+    python -m models.migrations          # apply pending migrations
+    python -m models.migrations --status # list applied / pending versions
+
+Applied versions are recorded in ``schema_migrations``. Concurrent runners
+(the reader and the web app start together) are serialised with an advisory
+lock, so each migration is applied exactly once. Migrations must be written
+to also succeed against databases created by the old ad-hoc DDL, which is
+why the first ones use ``IF NOT EXISTS``.
+
+To change the schema, append a new ``(version, name, function)`` entry to
+``MIGRATIONS``; never edit one that has already shipped.
+"""
+
+import argparse
+import logging
+import sys
+
+from .pool import get_pool
+from .partitions import create_partitioned_table
+from .activity_models import CREATE_TABLES_SQL
+from .daily_summary import create_daily_summary_table, close_days
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_lock, shared by every process running migrations
+MIGRATION_LOCK_KEY = 727_100_001
+
+
+def _sensor_readings(cur):
+    create_partitioned_table(cur, 'sensor_readings')
+
+
+def _sensor_readings_hourly(cur):
+    # Sums and counts per hour: averages are sum/count, so the rollup is
+    # updated in O(1) for every reading (see PostgresHandler.save_to_db)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS sensor_readings_hourly (
+            hour TIMESTAMP PRIMARY KEY,
+            reading_count INTEGER NOT NULL,
+            temperature_sum DOUBLE PRECISION NOT NULL,
+            humidity_sum DOUBLE PRECISION NOT NULL,
+            temperature_min FLOAT NOT NULL,
+            temperature_max FLOAT NOT NULL,
+            humidity_min FLOAT NOT NULL,
+            humidity_max FLOAT NOT NULL,
+            avg_temperature_c FLOAT GENERATED ALWAYS AS (temperature_sum / reading_count) STORED,
+            avg_humidity FLOAT GENERATED ALWAYS AS (humidity_sum / reading_count) STORED,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+    """)
+    # One-time backfill from the raw history, only if the rollup is still empty
+    cur.execute("""
+        INSERT INTO sensor_readings_hourly (
+            hour, reading_count, temperature_sum, humidity_sum,
+            temperature_min, temperature_max, humidity_min, humidity_max
+        )
+        SELECT
+            date_trunc('hour', timestamp),
+            COUNT(*), SUM(temperature_c), SUM(humidity),
+            MIN(temperature_c), MAX(temperature_c), MIN(humidity), MAX(humidity)
+        FROM sensor_readings
+        WHERE NOT EXISTS (SELECT 1 FROM sensor_readings_hourly)
+        GROUP BY 1
+        ON CONFLICT (hour) DO NOTHING;
+    """)
+    if cur.rowcount:
+        logger.info(f"Hourly rollup backfilled with {cur.rowcount} hours of history")
+
+
+def _thermostat(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS target_temperature (
+            id INTEGER PRIMARY KEY DEFAULT 1,
+            value FLOAT NOT NULL DEFAULT 20.0,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            CONSTRAINT single_row CHECK (id = 1)
+        );
+        INSERT INTO target_temperature (id, value, updated_at)
+        VALUES (1, 20.0, NOW())
+        ON CONFLICT (id) DO NOTHING;
+
+        CREATE TABLE IF NOT EXISTS thermostat_status (
+            id INTEGER PRIMARY KEY DEFAULT 1,
+            enabled BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            CONSTRAINT single_row CHECK (id = 1)
+        );
+        INSERT INTO thermostat_status (id, enabled, updated_at)
+        VALUES (1, FALSE, NOW())
+        ON CONFLICT (id) DO NOTHING;
+
+        CREATE TABLE IF NOT EXISTS boiler_status (
+            id INTEGER PRIMARY KEY DEFAULT 1,
+            is_on BOOLEAN NOT NULL DEFAULT FALSE,
+            updated_at TIMESTAMP DEFAULT NOW(),
+            CONSTRAINT single_row CHECK (id = 1)
+        );
+        INSERT INTO boiler_status (id, is_on, updated_at)
+        VALUES (1, FALSE, NOW())
+        ON CONFLICT (id) DO NOTHING;
+
+        CREATE TABLE IF NOT EXISTS thermostat_log (
+            id SERIAL PRIMARY KEY,
+            action VARCHAR(50) NOT NULL,
+            current_temp FLOAT,
+            target_temp FLOAT,
+            boiler_status BOOLEAN,
+            timestamp TIMESTAMP DEFAULT NOW()
+        );
+        CREATE INDEX IF NOT EXISTS idx_thermostat_log_timestamp
+        ON thermostat_log(timestamp DESC);
+
+        CREATE TABLE IF NOT EXISTS boiler_blackout (
+            id INTEGER PRIMARY KEY DEFAULT 1,
+            enabled BOOLEAN NOT NULL DEFAULT FALSE,
+            start_month INTEGER NOT NULL DEFAULT 4,
+            start_day   INTEGER NOT NULL DEFAULT 1,
+            end_month   INTEGER NOT NULL DEFAULT 9,
+            end_day     INTEGER NOT NULL DEFAULT 30,
+            reason      TEXT NOT NULL DEFAULT 'Boiler disabled during warm season',
+            updated_at  TIMESTAMP DEFAULT NOW(),
+            CONSTRAINT single_row CHECK (id = 1),
+            CONSTRAINT valid_start_month CHECK (start_month BETWEEN 1 AND 12),
+            CONSTRAINT valid_end_month   CHECK (end_month   BETWEEN 1 AND 12),
+            CONSTRAINT valid_start_day   CHECK (start_day   BETWEEN 1 AND 31),
+            CONSTRAINT valid_end_day     CHECK (end_day     BETWEEN 1 AND 31)
+        );
+        INSERT INTO boiler_blackout (id, enabled, start_month, start_day, end_month, end_day, reason, updated_at)
+        VALUES (1, FALSE, 4, 1, 9, 30, 'Boiler disabled during warm season', NOW())
+        ON CONFLICT (id) DO NOTHING;
+    """)
+
+
+def _air_quality(cur):
+    create_partitioned_table(cur, 'air_quality')
+    # Destination of the raw rows replaced by hourly aggregates
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS air_quality_backup AS
+        SELECT * FROM air_quality WHERE FALSE;
+    """)
+
+
+def _pico_logs(cur):
+    create_partitioned_table(cur, 'pico_logs')
+
+
+def _network_and_trains(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS network_devices (
+            ip_address VARCHAR(45) NOT NULL PRIMARY KEY,
+            hostname VARCHAR(255),
+            status VARCHAR(50),
+            timestamp TIMESTAMP NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS trains (
+            train_number VARCHAR(20) NOT NULL PRIMARY KEY,
+            destination VARCHAR(255),
+            time TIME,
+            delay VARCHAR(20),
+            platform VARCHAR(20),
+            stops TEXT,
+            timestamp TIMESTAMP NOT NULL
+        );
+    """)
+
+
+def _alarms_status(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS alarms_status (
+            id SERIAL PRIMARY KEY,
+            status BOOLEAN NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+    """)
+
+
+def _activity(cur):
+    cur.execute(CREATE_TABLES_SQL)
+
+
+def _sensor_identity(cur):
+    # Every row written so far came from the single serial sensor: the constant
+    # default ('main', config.settings.DEFAULT_SENSOR_ID) tags them without
+    # rewriting the table
+    cur.execute("""
+        ALTER TABLE sensor_readings
+            ADD COLUMN IF NOT EXISTS sensor_id VARCHAR(50) NOT NULL DEFAULT 'main';
+        CREATE INDEX IF NOT EXISTS idx_sensor_readings_sensor_timestamp
+            ON sensor_readings (sensor_id, timestamp);
+
+        ALTER TABLE sensor_readings_hourly
+            ADD COLUMN IF NOT EXISTS sensor_id VARCHAR(50) NOT NULL DEFAULT 'main';
+        ALTER TABLE sensor_readings_hourly DROP CONSTRAINT IF EXISTS sensor_readings_hourly_pkey;
+        ALTER TABLE sensor_readings_hourly ADD PRIMARY KEY (sensor_id, hour);
+        -- Queries over all sensors filter on the hour alone
+        CREATE INDEX IF NOT EXISTS idx_sensor_readings_hourly_hour
+            ON sensor_readings_hourly (hour);
+    """)
+
+
+def _device_metrics(cur):
+    # Generic long-format series written by /api/ingest for measurements that
+    # have no dedicated table
+    create_partitioned_table(cur, 'device_metrics')
+
+
+def _daily_summary(cur):
+    # Day-level min/max/sum/count per metric for the heatmaps, backfilled
+    # with every closed day; kept up to date by the partition daemon
+    create_daily_summary_table(cur)
+    close_days(cur)
+
+
+# (version, name, function(cur)) — append only
+MIGRATIONS = [
+    (1, 'sensor_readings', _sensor_readings),
+    (2, 'sensor_readings_hourly', _sensor_readings_hourly),
+    (3, 'thermostat', _thermostat),
+    (4, 'air_quality', _air_quality),
+    (5, 'pico_logs', _pico_logs),
+    (6, 'network_devices_and_trains', _network_and_trains),
+    (7, 'alarms_status', _alarms_status),
+    (8, 'activity', _activity),
+    (9, 'sensor_identity', _sensor_identity),
+    (10, 'device_metrics', _device_metrics),
+    (11, 'daily_summary', _daily_summary),
+]
+
+
+def _ensure_migrations_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT NOW()
+        );
+    """)
+
+
+def applied_versions(cur):
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def migrate(db_config, target=None):
+    """Apply every pending migration up to ``target`` (all by default).
+
+    Each migration runs in its own transaction together with its
+    ``schema_migrations`` row, so a failure leaves the database at the last
+    fully applied version. Returns the list of versions applied by this call.
+    """
+    pool = get_pool(db_config)
+    conn = pool.getconn()
+    applied = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            conn.commit()
+            try:
+                _ensure_migrations_table(cur)
+                conn.commit()
+                done = applied_versions(cur)
+                conn.commit()
+
+                for version, name, migration in MIGRATIONS:
+                    if version in done or (target is not None and version > target):
+                        continue
+                    logger.info(f"Applying migration {version:04d} {name}")
+                    try:
+                        migration(cur)
+                        cur.execute(
+                            "INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                            (version, name),
+                        )
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        logger.error(f"Migration {version:04d} {name} failed")
+                        raise
+                    applied.append(version)
+            finally:
+                # The advisory lock is session-level: it survives the rollback
+                conn.rollback()
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+                conn.commit()
+    finally:
+        conn.close()
+
+    if applied:
+        logger.info(f"Schema migrated to version {applied[-1]:04d} ({len(applied)} applied)")
+    return applied
+
+
+def status(db_config):
+    """Return ``[(version, name, applied)]`` for every known migration."""
+    with get_pool(db_config).connection() as conn:
+        with conn.cursor() as cur:
+            _ensure_migrations_table(cur)
+            done = applied_versions(cur)
+    return [(version, name, version in done) for version, name, _ in MIGRATIONS]
+
+
+def main(argv=None):
+    from config.settings import get_config
+
+    parser = argparse.ArgumentParser(description="Apply the SmartHouse schema migrations")
+    parser.add_argument('--status', action='store_true', help="list applied and pending migrations")
+    parser.add_argument('--target', type=int, help="stop at this version")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    db_config = get_config()['DB_CONFIG']
+
+    if args.status:
+        for version, name, applied in status(db_config):
+            print(f"{version:04d} {name:32} {'applied' if applied else 'pending'}")
+        return 0
+
+    applied = migrate(db_config, target=args.target)
+    print(f"{len(applied)} migration(s) applied")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Monthly range partitioning for the time-series tables.
+
+``sensor_readings``, ``air_quality``, ``pico_logs`` and ``device_metrics`` only ever grow and are
+almost always queried by time. Partitioning them by month lets PostgreSQL skip
+every month outside a query's time bounds, and turns retention into dropping
+whole partitions instead of running huge ``DELETE`` statements.
+
+Partitions are named ``<table>_yYYYYmMM``. Each table also has a ``_default``
+partition so that rows with an unexpected timestamp (e.g. a Pico whose clock
+was never synchronised) are stored instead of rejected.
+
+All functions take an open cursor and run inside the caller's transaction.
+"""
+
+import logging
+from datetime import date, datetime
+
+logger = logging.getLogger(__name__)
+
+# Months of partitions created ahead of the current one
+MONTHS_AHEAD = 3
+
+# Oldest month that gets its own partition when converting a table; anything
+# older (typically rows with a bogus clock) lands in the default partition
+MAX_MONTHS_BACK = 120
+
+# table -> partition key and parent definition. Sequences are created
+# separately so that converting an existing table can keep its id sequence.
+PARTITIONED_TABLES = {
+    'sensor_readings': {
+        'column': 'timestamp',
+        'sequence': 'sensor_readings_id_seq',
+        'columns': """
+            id INTEGER NOT NULL DEFAULT nextval('sensor_readings_id_seq'),
+            temperature_c FLOAT NOT NULL,
+            humidity FLOAT NOT NULL,
+            timestamp TIMESTAMP NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        """,
+        'copy_columns': 'id, temperature_c, humidity, timestamp',
+        'copy_select': 'id, temperature_c, humidity, timestamp',
+        'indexes': [
+            "CREATE INDEX IF NOT EXISTS idx_sensor_readings_timestamp ON sensor_readings (timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_sensor_readings_timestamp_brin ON sensor_readings "
+            "USING BRIN (timestamp) WITH (pages_per_range = 32)",
+        ],
+    },
+    'air_quality': {
+        'column': 'timestamp',
+        'sequence': 'air_quality_id_seq',
+        'columns': """
+            id INTEGER NOT NULL DEFAULT nextval('air_quality_id_seq'),
+            smoke FLOAT NOT NULL,
+            lpg FLOAT NOT NULL,
+            methane FLOAT NOT NULL,
+            hydrogen FLOAT NOT NULL,
+            air_quality_index FLOAT NOT NULL,
+            air_quality_description TEXT NOT NULL,
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp)
+        """,
+        'copy_columns': 'id, smoke, lpg, methane, hydrogen, air_quality_index, '
+                        'air_quality_description, timestamp, created_at',
+        'copy_select': 'id, smoke, lpg, methane, hydrogen, air_quality_index, '
+                       'air_quality_description, timestamp, created_at',
+        'indexes': [
+            "CREATE INDEX IF NOT EXISTS idx_air_quality_timestamp ON air_quality (timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_air_quality_timestamp_brin ON air_quality "
+            "USING BRIN (timestamp) WITH (pages_per_range = 32)",
+        ],
+    },
+    'pico_logs': {
+        'column': 'created_at',
+        'sequence': 'pico_logs_id_seq',
+        'columns': """
+            id INTEGER NOT NULL DEFAULT nextval('pico_logs_id_seq'),
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            level VARCHAR(10) NOT NULL,
+            message TEXT NOT NULL,
+            sensor_data JSONB,
+            device_id VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, created_at)
+        """,
+        'copy_columns': 'id, timestamp, level, message, sensor_data, device_id, created_at',
+        'copy_select': 'id, timestamp, level, message, sensor_data, device_id, '
+                       'COALESCE(created_at, timestamp, NOW())',
+        'indexes': [
+            "CREATE INDEX IF NOT EXISTS idx_pico_logs_created_at ON pico_logs (created_at)",
+        ],
+    },
+    'device_metrics': {
+        'column': 'timestamp',
+        'sequence': 'device_metrics_id_seq',
+        'columns': """
+            id BIGINT NOT NULL DEFAULT nextval('device_metrics_id_seq'),
+            timestamp TIMESTAMP NOT NULL,
+            device_id VARCHAR(50) NOT NULL,
+            measurement VARCHAR(64) NOT NULL,
+            field VARCHAR(64) NOT NULL,
+            value DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        """,
+        'copy_columns': 'id, timestamp, device_id, measurement, field, value',
+        'copy_select': 'id, timestamp, device_id, measurement, field, value',
+        'indexes': [
+            "CREATE INDEX IF NOT EXISTS idx_device_metrics_series ON device_metrics "
+            "(device_id, measurement, field, timestamp)",
+            "CREATE INDEX IF NOT EXISTS idx_device_metrics_timestamp_brin ON device_metrics "
+            "USING BRIN (timestamp) WITH (pages_per_range = 32)",
+        ],
+    },
+}
+
+
+def month_start(d):
+    """First day of the month containing ``d``."""
+    return date(d.year, d.month, 1)
+
+
+def add_months(d, months):
+    """First day of the month ``months`` after the month containing ``d``."""
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(cur, table):
+    """True if ``table`` exists and is already a partitioned parent."""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cur.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def table_exists(cur, table):
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+    return cur.fetchone()[0]
+
+
+def partition_horizon(now=None):
+    """End of the last month created ahead by ``ensure_partitions``.
+
+    Rows past it would land in the default partition, and would then block
+    the creation of their month's partition until moved out of it.
+    """
+    return add_months(month_start(now or datetime.now()), MONTHS_AHEAD + 1)
+
+
+def create_month_partition(cur, table, month):
+    """Create the partition of ``table`` covering ``month`` if it does not exist.
+
+    Rows of that month already stored in the default partition (a device
+    with a wrong clock, rows past the horizon when they were written) would
+    make ``CREATE TABLE ... PARTITION OF`` fail: the partition is then created
+    as a plain table, the rows are moved into it and it is attached.
+    """
+    name = partition_name(table, month)
+    if table_exists(cur, name):
+        return name
+    bounds = (month, add_months(month, 1))
+    default = f"{table}_default"
+    column = PARTITIONED_TABLES[table]['column']
+
+    stranded = False
+    if table_exists(cur, default):
+        cur.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {column} >= %s AND {column} < %s)",
+            bounds,
+        )
+        stranded = cur.fetchone()[0]
+    if not stranded:
+        cur.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)", bounds)
+        return name
+
+    cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    cur.execute(f"""
+        WITH moved AS (
+            DELETE FROM {default} WHERE {column} >= %s AND {column} < %s RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """, bounds)
+    moved = cur.rowcount
+    cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", bounds)
+    logger.warning(f"{moved} rows of {name} moved out of {default} before attaching it")
+    return name
+
+
+def ensure_partitions(cur, table, start=None, months_ahead=MONTHS_AHEAD):
+    """Create monthly partitions of ``table`` from ``start`` up to ``months_ahead`` past today."""
+    current = month_start(datetime.now())
+    month = month_start(start) if start else current
+    month = max(month, add_months(current, -MAX_MONTHS_BACK))
+    last = add_months(current, months_ahead)
+    created = []
+    while month <= last:
+        created.append(create_month_partition(cur, table, month))
+        month = add_months(month, 1)
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+    return created
+
+
+def create_partitioned_table(cur, table):
+    """Create ``table`` as a partitioned parent, converting a plain table if one exists.
+
+    A plain table is renamed, its rows are copied into monthly partitions
+    covering their time range and the old table is dropped. The id sequence
+    is kept so that ids keep increasing.
+    """
+    spec = PARTITIONED_TABLES[table]
+    column = spec['column']
+
+    if is_partitioned(cur, table):
+        ensure_partitions(cur, table)
+        create_indexes(cur, table)
+        return False
+
+    legacy = None
+    if table_exists(cur, table):
+        legacy = f"{table}_legacy"
+        cur.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        cur.execute(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {legacy}_pkey")
+        cur.execute(f"ALTER TABLE {legacy} ALTER COLUMN id DROP DEFAULT")
+        cur.execute(f"ALTER SEQUENCE IF EXISTS {spec['sequence']} OWNED BY NONE")
+
+    cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {spec['sequence']}")
+    cur.execute(f"CREATE TABLE {table} ({spec['columns']}) PARTITION BY RANGE ({column})")
+
+    start = None
+    if legacy:
+        cur.execute(f"SELECT MIN({column}) FROM {legacy}")
+        start = cur.fetchone()[0]
+    ensure_partitions(cur, table, start=start)
+
+    if legacy:
+        cur.execute(
+            f"INSERT INTO {table} ({spec['copy_columns']}) "
+            f"SELECT {spec['copy_select']} FROM {legacy}"
+        )
+        logger.info(f"Converted {table} to monthly partitions ({cur.rowcount} rows moved)")
+        cur.execute(f"DROP TABLE {legacy}")
+        cur.execute(
+            f"SELECT setval('{spec['sequence']}', COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        )
+
+    cur.execute(f"ALTER SEQUENCE {spec['sequence']} OWNED BY {table}.id")
+    create_indexes(cur, table)
+    return True
+
+
+def create_indexes(cur, table):
+    """Create the time-column indexes of ``table`` on the parent and every partition.
+
+    The B-tree serves "latest row" lookups and short ranges; the BRIN index is
+    a few pages per month and lets long range aggregates skip blocks cheaply,
+    since rows arrive in timestamp order.
+    """
+    for index_sql in PARTITIONED_TABLES[table]['indexes']:
+        cur.execute(index_sql)
+
+
+def list_partitions(cur, table):
+    """Return ``[(name, lower_bound, upper_bound)]`` for the monthly partitions of ``table``."""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname;
+    """, (table,))
+    partitions = []
+    prefix = f"{table}_y"
+    for (name,) in cur.fetchall():
+        if not name.startswith(prefix):
+            continue
+        try:
+            lower = datetime.strptime(name[len(prefix):], "%Ym%m").date()
+        except ValueError:
+            continue
+        partitions.append((name, lower, add_months(lower, 1)))
+    return partitions
+
+
+def drop_partitions_before(cur, table, cutoff):
+    """Drop every monthly partition of ``table`` that lies entirely before ``cutoff``.
+
+    Rows in the partially retained month are kept: retention is applied at
+    month granularity, which is what makes it a cheap metadata operation.
+    """
+    cutoff = cutoff.date() if isinstance(cutoff, datetime) else cutoff
+    dropped = []
+    for name, _, upper in list_partitions(cur, table):
+        if upper <= cutoff:
+            cur.execute(f"DROP TABLE IF EXISTS {name}")
+            dropped.append(name)
+    if dropped:
+        logger.info(f"Dropped {len(dropped)} partitions of {table}: {', '.join(dropped)}")
+    return dropped
@@ -0,0 +1,305 @@
+"""
+Process-wide PostgreSQL connection pool.
+
+Every service used to open a brand-new connection for each query, which on the
+Raspberry Pi costs more than the query itself. The pool keeps a small set of
+authenticated connections alive and hands them out to whichever thread needs
+one. Connections returned by ``getconn()`` behave like plain psycopg2
+connections, except that ``close()`` gives them back to the pool.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+from config.settings import (
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_POOL_HEALTHCHECK_IDLE,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class PooledConnection:
+    """Thin proxy around a psycopg2 connection leased from a ConnectionPool.
+
+    All attributes are forwarded to the real connection. ``close()`` returns
+    the connection to the pool instead of closing the socket, so existing
+    ``try/finally: conn.close()`` code keeps working unchanged.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.putconn(raw)
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise psycopg2.InterfaceError("connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._raw is not None:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe, bounded pool of PostgreSQL connections.
+
+    Args:
+        db_config (dict): Keyword arguments for ``psycopg2.connect``.
+        minconn (int): Connections opened eagerly and kept warm.
+        maxconn (int): Upper bound on open connections.
+        timeout (float): Seconds to wait for a free connection before giving up.
+        healthcheck_idle (float): Connections idle longer than this are pinged
+            with ``SELECT 1`` before being handed out.
+    """
+
+    def __init__(self, db_config, minconn=DB_POOL_MIN_SIZE, maxconn=DB_POOL_MAX_SIZE,
+                 timeout=DB_POOL_TIMEOUT, healthcheck_idle=DB_POOL_HEALTHCHECK_IDLE):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: minconn=%s maxconn=%s" % (minconn, maxconn))
+
+        self.db_config = dict(db_config)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(raw_connection, returned_at)], LIFO
+        self._open = 0           # idle + leased
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'healthchecks': 0,
+            'healthcheck_failures': 0,
+            'timeouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+        }
+
+        for _ in range(minconn):
+            try:
+                self._idle.append((self._new_connection(), time.monotonic()))
+                self._open += 1
+            except psycopg2.Error as e:
+                logger.warning(f"Pool warm-up failed, connections will be opened lazily: {e}")
+                break
+
+    def _bump(self, counter, amount=1):
+        with self._cond:
+            self._stats[counter] += amount
+
+    def _new_connection(self):
+        conn = psycopg2.connect(**self.db_config)
+        self._bump('connections_created')
+        return conn
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < self.healthcheck_idle:
+            return True
+        self._bump('healthchecks')
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            self._bump('healthcheck_failures')
+            return False
+
+    def _discard(self, conn):
+        self._bump('connections_discarded')
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        """Lease a connection, waiting up to ``timeout`` seconds for one to free up."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+        started = time.monotonic()
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("connection pool is closed")
+
+                while not self._idle and self._open >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"no connection available after {timeout:.1f}s "
+                            f"({self._open}/{self.maxconn} in use)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+
+                if waited:
+                    self._stats['waits'] += 1
+                    self._stats['wait_time_total'] += time.monotonic() - started
+                    waited = False
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._open += 1  # reserve the slot before connecting outside the lock
+
+            if conn is None:
+                try:
+                    conn = self._new_connection()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, time.monotonic() - returned_at):
+                self._discard(conn)
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                continue
+
+            self._bump('checkouts')
+            return PooledConnection(self, conn)
+
+    def putconn(self, conn, discard=False):
+        """Return a raw connection to the pool, resetting any open transaction."""
+        if isinstance(conn, PooledConnection):
+            conn.close()
+            return
+
+        if not discard and not conn.closed:
+            try:
+                status = conn.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if not discard and conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                discard = True
+        else:
+            discard = True
+
+        with self._cond:
+            if discard or self._closed:
+                self._discard(conn)
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that leases a connection and commits or rolls back on exit."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def stats(self):
+        """Return a snapshot of pool usage counters."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'host': self.db_config.get('host'),
+                'database': self.db_config.get('database') or self.db_config.get('dbname'),
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'timeout_seconds': self.timeout,
+            })
+        snapshot['wait_time_total'] = round(snapshot['wait_time_total'], 4)
+        return snapshot
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+                self._open -= 1
+            self._idle = []
+            self._cond.notify_all()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(db_config):
+    return tuple(sorted((k, str(v)) for k, v in db_config.items()))
+
+
+def get_pool(db_config):
+    """Return the process-wide pool for ``db_config``, creating it on first use."""
+    key = _pool_key(db_config)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = ConnectionPool(db_config)
+                _pools[key] = pool
+    return pool
+
+
+def get_pool_stats():
+    """Return usage counters for every pool created in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [p.stats() for p in pools]
+
+
+def close_all_pools():
+    """Close every pool created in this process."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.closeall()
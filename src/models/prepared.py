@@ -0,0 +1,149 @@
+"""
+Server-side prepared statements for hot lookup queries.
+
+A handful of tiny queries (latest reading, thermostat and boiler state, alarm
+state) run thousands of times a day, and for each of them PostgreSQL spends
+more time parsing and planning than executing. The registry ``PREPARE``s each
+statement once per pooled connection and afterwards only sends
+``EXECUTE <name>``.
+
+Which statements are prepared is tracked per raw connection, so a connection
+that is discarded by the pool (and therefore loses its prepared statements)
+is simply forgotten.
+"""
+
+import logging
+import threading
+import weakref
+
+import psycopg2
+import psycopg2.errors
+
+logger = logging.getLogger(__name__)
+
+# name -> SQL using $1, $2... placeholders
+HOT_STATEMENTS = {
+    'latest_reading': """
+        SELECT temperature_c, humidity, timestamp, sensor_id
+        FROM sensor_readings
+        ORDER BY timestamp DESC
+        LIMIT 1
+    """,
+    'latest_reading_by_sensor': """
+        SELECT temperature_c, humidity, timestamp, sensor_id
+        FROM sensor_readings
+        WHERE sensor_id = $1
+        ORDER BY timestamp DESC
+        LIMIT 1
+    """,
+    'target_temperature': "SELECT value FROM target_temperature ORDER BY updated_at DESC LIMIT 1",
+    'thermostat_status': "SELECT enabled FROM thermostat_status WHERE id = 1",
+    'boiler_status': "SELECT is_on FROM boiler_status WHERE id = 1",
+    'last_alarm_status': """
+        SELECT status, timestamp
+        FROM alarms_status
+        ORDER BY timestamp DESC
+        LIMIT 1
+    """,
+}
+
+# Errors meaning the server-side statement is gone or stale: the statement is
+# prepared again and executed once more
+_STALE_ERRORS = (
+    psycopg2.errors.InvalidSqlStatementName,   # prepared statement does not exist
+    psycopg2.errors.FeatureNotSupported,       # cached plan must not change result type
+)
+
+
+class PreparedStatementRegistry:
+    """Prepares named statements lazily on each connection and executes them by name."""
+
+    def __init__(self, statements):
+        self.statements = dict(statements)
+        self._prepared = weakref.WeakKeyDictionary()   # raw connection -> {names}
+        self._lock = threading.Lock()
+        self._stats = {name: {'executions': 0, 'prepares': 0, 'reprepares': 0} for name in self.statements}
+
+    def _bump(self, name, counter):
+        with self._lock:
+            self._stats[name][counter] += 1
+
+    def _prepared_names(self, conn):
+        with self._lock:
+            names = self._prepared.get(conn)
+            if names is None:
+                names = self._prepared[conn] = set()
+            return names
+
+    def _prepare(self, cur, name):
+        cur.execute(f"PREPARE {name} AS {self.statements[name]}")
+        self._prepared_names(cur.connection).add(name)
+        self._bump(name, 'prepares')
+
+    def _execute_prepared(self, cur, name, params):
+        if params:
+            placeholders = ', '.join(['%s'] * len(params))
+            cur.execute(f"EXECUTE {name} ({placeholders})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def execute(self, cur, name, params=None):
+        """Execute statement ``name`` on ``cur``, preparing it first if this connection has not yet.
+
+        Must be the first statement of its transaction: if the server no longer
+        knows the statement, the transaction is rolled back and the statement
+        is prepared and executed again.
+        """
+        if name not in self.statements:
+            raise KeyError(f"unknown prepared statement: {name}")
+
+        conn = cur.connection
+        names = self._prepared_names(conn)
+        self._bump(name, 'executions')
+
+        if name not in names:
+            self._prepare(cur, name)
+            self._execute_prepared(cur, name, params)
+            return
+
+        try:
+            self._execute_prepared(cur, name, params)
+        except _STALE_ERRORS as e:
+            logger.info(f"Prepared statement {name} is stale ({e.pgcode}), preparing again")
+            conn.rollback()
+            names.discard(name)
+            if isinstance(e, psycopg2.errors.FeatureNotSupported):
+                cur.execute(f"DEALLOCATE PREPARE {name}")
+            self._bump(name, 'reprepares')
+            self._prepare(cur, name)
+            self._execute_prepared(cur, name, params)
+
+    def stats(self):
+        """Per-statement counters plus the overall hit rate (executions that skipped PREPARE)."""
+        with self._lock:
+            statements = {name: dict(counters) for name, counters in self._stats.items()}
+            connections = len(self._prepared)
+
+        for counters in statements.values():
+            executions = counters['executions']
+            hits = executions - counters['prepares']
+            counters['hits'] = hits
+            counters['hit_rate'] = round(hits / executions, 4) if executions else None
+
+        executions = sum(c['executions'] for c in statements.values())
+        hits = sum(c['hits'] for c in statements.values())
+        return {
+            'connections': connections,
+            'executions': executions,
+            'hits': hits,
+            'hit_rate': round(hits / executions, 4) if executions else None,
+            'statements': statements,
+        }
+
+
+hot_statements = PreparedStatementRegistry(HOT_STATEMENTS)
+
+
+def get_prepared_stats():
+    """Return the counters of the process-wide registry of hot statements."""
+    return hot_statements.stats()
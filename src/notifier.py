@@ -0,0 +1,275 @@
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from config.settings import (
+    NOTIFY_QUEUE_SIZE,
+    NOTIFY_COALESCE_WINDOW,
+    NOTIFY_RATE_PER_MINUTE,
+    NOTIFY_BURST,
+    NOTIFY_MAX_ATTEMPTS,
+)
+
+# Messaggio già pronto per i canali: ``text`` per Telegram, ``html`` per l'email
+Notification = namedtuple('Notification', ['kind', 'subject', 'text', 'html', 'events'])
+
+# Evento grezzo accodato da chi rileva qualcosa (es. il sensore di distanza)
+Event = namedtuple('Event', ['kind', 'at', 'details'])
+
+
+def merge_notifications(messages):
+    """Unisce più messaggi in attesa dello stesso canale in uno solo."""
+    if len(messages) == 1:
+        return messages[0]
+    last = messages[-1]
+    return Notification(
+        last.kind,
+        last.subject,
+        "\n\n".join(m.text for m in messages),
+        "<hr>".join(m.html for m in messages),
+        sum(m.events for m in messages),
+    )
+
+
+class TokenBucket:
+    """Limite di frequenza: ``rate_per_minute`` messaggi al minuto con raffiche fino a ``burst``."""
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now=None):
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now=None):
+        """Secondi mancanti al prossimo gettone."""
+        self._refill(now if now is not None else time.monotonic())
+        if self.tokens >= 1 or self.rate <= 0:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class EmailChannel:
+    """Consegna via email, sulla sessione SMTP persistente di ``EmailSender``."""
+
+    name = 'email'
+
+    def __init__(self, sender, to_email):
+        self.sender = sender
+        self.to_email = to_email
+
+    def send(self, message):
+        self.sender.deliver(self.to_email, message.subject, message.html)
+
+
+class TelegramChannel:
+    """Consegna via bot Telegram (sendMessage) a una o più chat in parallelo."""
+
+    name = 'telegram'
+
+    def __init__(self, token, chat_ids, timeout=10):
+        self.url = f'https://api.telegram.org/bot{token}/sendMessage'
+        self.chat_ids = list(chat_ids)
+        self.timeout = timeout
+        # Keep-alive HTTPS tra un messaggio e l'altro
+        self.session = requests.Session()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.chat_ids)), thread_name_prefix="telegram")
+
+    def _send_to(self, chat_id, text):
+        response = self.session.post(
+            self.url,
+            data={'chat_id': chat_id, 'text': text, 'disable_web_page_preview': 'true'},
+            timeout=self.timeout,
+        )
+        if not response.ok:
+            raise Exception(f"Telegram API error {response.status_code}: {response.text}")
+
+    def send(self, message):
+        futures = [self.executor.submit(self._send_to, chat_id, message.text) for chat_id in self.chat_ids]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            raise errors[0]
+
+
+class _ChannelState:
+    def __init__(self, channel, rate_per_minute, burst):
+        self.channel = channel
+        self.bucket = TokenBucket(rate_per_minute, burst)
+        self.pending = []        # messaggi in attesa (limite di frequenza o tentativo precedente fallito)
+        self.attempts = 0
+        self.retry_at = 0.0
+        self.in_flight = False
+        self.counters = {'sent': 0, 'failed': 0, 'retries': 0, 'rate_limited': 0, 'merged': 0}
+
+
+class NotificationDispatcher:
+    """Coda e worker che consegnano le notifiche fuori dal loop di lettura.
+
+    ``notify()`` non blocca mai: accoda l'evento e ritorna. Il thread ``run()``
+    raggruppa gli eventi dello stesso tipo: il primo parte subito, quelli
+    che arrivano nei ``coalesce_window`` secondi successivi vengono riassunti
+    in un solo messaggio alla chiusura della finestra (una raffica di allarmi
+    produce così un messaggio ogni finestra, non uno per campione).
+    ``render(kind, events)`` costruisce la Notification; viene chiamato dal
+    worker, quindi eventuali query per il corpo del messaggio non pesano su
+    chi notifica.
+
+    Ogni canale ha il suo limite di frequenza (token bucket): i messaggi che
+    lo superano restano in attesa e vengono uniti in uno solo appena c'è un
+    gettone. I canali consegnano in parallelo su un pool di thread; un invio
+    fallito viene ritentato fino a ``max_attempts`` volte con attesa crescente.
+    """
+
+    def __init__(self, channels, render, max_queue=NOTIFY_QUEUE_SIZE, coalesce_window=NOTIFY_COALESCE_WINDOW,
+                 rate_per_minute=NOTIFY_RATE_PER_MINUTE, burst=NOTIFY_BURST, max_attempts=NOTIFY_MAX_ATTEMPTS):
+        self.render = render
+        self.coalesce_window = coalesce_window
+        self.max_attempts = max_attempts
+        self.channels = [_ChannelState(channel, rate_per_minute, burst) for channel in channels]
+
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.bursts = {}   # tipo -> [fine finestra, eventi arrivati dopo il primo]
+        self.running = True
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(self.channels)), thread_name_prefix="notify")
+        self.logger = logging.getLogger("notifier")
+
+        self.counters = {'received': 0, 'dropped': 0, 'coalesced': 0, 'messages': 0, 'render_errors': 0}
+
+    def _bump(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    def notify(self, kind, details=None, at=None):
+        """Accoda un evento senza bloccare; False se la coda è piena."""
+        self._bump('received')
+        try:
+            self.queue.put_nowait(Event(kind, at or time.time(), details or {}))
+            return True
+        except queue.Full:
+            self._bump('dropped')
+            return False
+
+    def _emit(self, kind, events):
+        try:
+            message = self.render(kind, events)
+        except Exception as e:
+            self._bump('render_errors')
+            self.logger.error(f"Errore preparazione notifica {kind}: {e}")
+            return
+        with self._lock:
+            self.counters['messages'] += 1
+            for state in self.channels:
+                state.pending.append(message)
+
+    def _add(self, event, now):
+        burst = self.bursts.get(event.kind)
+        if burst is None:
+            # Primo evento: si notifica subito e si apre la finestra di raggruppamento
+            self.bursts[event.kind] = [now + self.coalesce_window, []]
+            self._emit(event.kind, [event])
+        else:
+            burst[1].append(event)
+            self._bump('coalesced')
+
+    def _close_bursts(self, now):
+        for kind, (window_end, events) in list(self.bursts.items()):
+            if now < window_end:
+                continue
+            if events:
+                # La raffica continua: riassunto e nuova finestra
+                self._emit(kind, events)
+                self.bursts[kind] = [now + self.coalesce_window, []]
+            else:
+                del self.bursts[kind]
+
+    def _deliver(self, state, message):
+        try:
+            state.channel.send(message)
+        except Exception as e:
+            self.logger.error(f"Invio {state.channel.name} fallito (tentativo {state.attempts + 1}): {e}")
+            with self._lock:
+                state.attempts += 1
+                if state.attempts >= self.max_attempts:
+                    state.counters['failed'] += 1
+                    state.attempts = 0
+                else:
+                    state.counters['retries'] += 1
+                    state.pending.insert(0, message)
+                    state.retry_at = time.monotonic() + 2 ** state.attempts
+                state.in_flight = False
+            return
+        with self._lock:
+            state.counters['sent'] += 1
+            state.attempts = 0
+            state.in_flight = False
+
+    def _dispatch(self, now):
+        for state in self.channels:
+            with self._lock:
+                if state.in_flight or not state.pending or now < state.retry_at:
+                    continue
+                if not state.bucket.take(now):
+                    state.counters['rate_limited'] += 1
+                    continue
+                if len(state.pending) > 1:
+                    state.counters['merged'] += len(state.pending) - 1
+                message = merge_notifications(state.pending)
+                state.pending = []
+                state.in_flight = True
+            self.executor.submit(self._deliver, state, message)
+
+    def _next_wakeup(self, now):
+        deadlines = [window_end for window_end, _ in self.bursts.values()]
+        with self._lock:
+            for state in self.channels:
+                if state.pending and not state.in_flight:
+                    deadlines.append(max(state.retry_at, now + state.bucket.wait_time(now)))
+        if not deadlines:
+            return 1.0
+        return min(1.0, max(0.05, min(deadlines) - now))
+
+    def run(self):
+        """Loop del worker."""
+        names = ', '.join(state.channel.name for state in self.channels) or 'nessun canale'
+        self.logger.info(f"🔔 Notifiche avviate ({names}, finestra {self.coalesce_window}s)")
+
+        while self.running:
+            try:
+                event = self.queue.get(timeout=self._next_wakeup(time.monotonic()))
+                self._add(event, time.monotonic())
+                # Si prende tutto quello che è già in coda prima di consegnare
+                while True:
+                    self._add(self.queue.get_nowait(), time.monotonic())
+            except queue.Empty:
+                pass
+            now = time.monotonic()
+            self._close_bursts(now)
+            self._dispatch(now)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self.counters)
+            snapshot['channels'] = {
+                state.channel.name: dict(state.counters, pending=len(state.pending)) for state in self.channels
+            }
+        snapshot['queue_depth'] = self.queue.qsize()
+        return snapshot
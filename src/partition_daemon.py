@@ -0,0 +1,85 @@
+import time
+import logging
+from datetime import date, datetime, timedelta
+from config.settings import (
+    get_config,
+    SENSOR_RAW_RETENTION_DAYS,
+    AIR_QUALITY_RETENTION_DAYS,
+    PICO_LOGS_RETENTION_DAYS,
+    DEVICE_METRICS_RETENTION_DAYS,
+)
+from models.pool import get_pool
+from models.partitions import PARTITIONED_TABLES, is_partitioned, ensure_partitions, drop_partitions_before
+from models.daily_summary import close_days
+
+
+RETENTION_DAYS = {
+    'sensor_readings': SENSOR_RAW_RETENTION_DAYS,
+    'air_quality': AIR_QUALITY_RETENTION_DAYS,
+    'pico_logs': PICO_LOGS_RETENTION_DAYS,
+    'device_metrics': DEVICE_METRICS_RETENTION_DAYS,
+}
+
+
+class PartitionMaintenanceDaemon:
+    """Tiene pronte le partizioni mensili future e applica la retention eliminando le partizioni vecchie.
+
+    Chiude anche i riepiloghi giornalieri delle heatmap (``daily_summary``):
+    appena cambia la data e a ogni giro di manutenzione, per raccogliere le
+    letture arrivate in ritardo.
+    """
+
+    def __init__(self, check_interval=6 * 3600):
+        self.check_interval = check_interval
+        self.last_run = 0
+        self.summary_day = None  # data dell'ultima chiusura dei riepiloghi giornalieri
+        self.running = True
+
+        config = get_config()
+        self.pool = get_pool(config['DB_CONFIG'])
+
+        self.logger = logging.getLogger("partition_daemon")
+
+    def maintain(self):
+        """Crea le partizioni dei mesi futuri e applica la retention."""
+        for table in PARTITIONED_TABLES:
+            try:
+                with self.pool.connection() as conn:
+                    with conn.cursor() as cur:
+                        if not is_partitioned(cur, table):
+                            self.logger.warning(f"Tabella {table} non partizionata: migrazioni non applicate?")
+                            continue
+                        ensure_partitions(cur, table)
+
+                        days = RETENTION_DAYS.get(table, 0)
+                        if days > 0:
+                            drop_partitions_before(cur, table, datetime.now() - timedelta(days=days))
+            except Exception as e:
+                self.logger.error(f"Errore manutenzione partizioni {table}: {e}")
+        self.close_summary_days()
+        self.last_run = time.time()
+
+    def close_summary_days(self):
+        """Materializza i riepiloghi dei giorni chiusi (e di quelli cambiati nel frattempo)."""
+        today = date.today()
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    close_days(cur, today)
+            self.summary_day = today
+        except Exception as e:
+            self.logger.error(f"Errore chiusura riepiloghi giornalieri: {e}")
+
+    def run(self):
+        """Loop infinito del daemon."""
+        self.logger.info("🗂️ PartitionMaintenanceDaemon avviato")
+
+        while self.running:
+            if time.time() - self.last_run >= self.check_interval:
+                self.maintain()
+            elif self.summary_day != date.today():
+                self.close_summary_days()
+            time.sleep(60)
+
+    def stop(self):
+        self.running = False
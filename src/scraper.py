@@ -1,8 +1,8 @@
 import requests
 from bs4 import BeautifulSoup
-import psycopg2
 from psycopg2 import Error
 from datetime import datetime
+from models.database import get_db_connection
 
 class TrainScraper:
     def __init__(self, url, db_config):
@@ -74,9 +74,11 @@ class TrainScraper:
 
     def save_trains_to_db(self, trains):
         """Salva i treni nel database."""
+        connection = None
+        cursor = None
         try:
-            # Connessione al database
-            connection = psycopg2.connect(**self.db_config)
+            # Connessione dal pool condiviso
+            connection = get_db_connection(self.db_config)
             cursor = connection.cursor()
 
             now = datetime.now()
@@ -105,8 +107,11 @@ class TrainScraper:
 
             connection.commit()
             print("Treni inseriti nel database.")
-            cursor.close()
-            connection.close()
         
         except Error as e:
             print(f"Errore durante l'inserimento dei dati dei treni: {e}")
+        finally:
+            if cursor:
+                cursor.close()
+            if connection:
+                connection.close()
@@ -1,10 +1,13 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+import threading
 import time
 import os
 import requests
 from client.PostgresClient import PostgresHandler
+from config.settings import NOTIFY_DEVICES_TTL, SMTP_TIMEOUT
+from notifier import Notification, NotificationDispatcher, EmailChannel, TelegramChannel
 
 
 db_config = {
@@ -16,40 +19,84 @@ db_config = {
 
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+# Comma-separated chats that receive alarms (defaults to the backup chat)
+TELEGRAM_ALARM_CHAT_IDS = os.getenv('TELEGRAM_ALARM_CHAT_IDS') or TELEGRAM_CHAT_ID
 
 
 class EmailSender:
-    def __init__(self, smtp_server, smtp_port, username, password):
+    """Sends email over one SMTP session that is kept open between messages.
+
+    The STARTTLS handshake and login happen on the first message and again
+    only when the server has dropped the connection (idle timeout, restart).
+    """
+
+    def __init__(self, smtp_server, smtp_port, username, password, timeout=SMTP_TIMEOUT):
         self.smtp_server = smtp_server
         self.smtp_port = smtp_port
         self.username = username
         self.password = password
+        self.timeout = timeout
+        self._server = None
+        self._lock = threading.Lock()
 
     def get_current_timestamp(self):
         """Returns the current timestamp as a formatted string."""
         return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))
 
-    def send_email(self, to_email, subject, body):
-        """General-purpose function to send an email with a given subject and body."""
+    def _connect(self):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=self.timeout)
+        try:
+            server.starttls()
+            server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def close(self):
+        """Closes the SMTP session; the next message opens a new one."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                self._server.close()
+            self._server = None
+
+    def deliver(self, to_email, subject, body):
+        """Sends one HTML email, reconnecting once if the session was dropped; raises on failure."""
         timestamp = self.get_current_timestamp()
-        subject_with_timestamp = subject.format(timestamp=timestamp)
 
         msg = MIMEMultipart()
         msg['From'] = self.username
         msg['To'] = to_email
-        msg['Subject'] = subject_with_timestamp
+        msg['Subject'] = subject.format(timestamp=timestamp)
         msg.attach(MIMEText(body, 'html'))
 
+        with self._lock:
+            for attempt in (1, 2):
+                if self._server is None:
+                    self._server = self._connect()
+                try:
+                    self._server.sendmail(self.username, to_email, msg.as_string())
+                    return
+                except (smtplib.SMTPServerDisconnected, OSError):
+                    # Stale session: open a fresh one and try again
+                    self._server.close()
+                    self._server = None
+                    if attempt == 2:
+                        raise
+
+    def send_email(self, to_email, subject, body):
+        """General-purpose function to send an email with a given subject and body."""
         try:
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.username, self.password)
-            server.sendmail(self.username, to_email, msg.as_string())
+            self.deliver(to_email, subject, body)
             print("[Email] Email sent successfully.")
         except Exception as e:
             print(f'[Email] Error sending email: {e}')
-        finally:
-            server.quit()
 
     # Keep Italian alias for backward compatibility with existing callers
     def invia_email(self, to_email, subject, body):
@@ -59,12 +106,22 @@ class EmailSender:
 db = PostgresHandler(db_config=db_config)
 
 
-def send_alarm_email(email_sender):
-    """Sends an alarm notification email with the current status of all connected devices."""
-    to_email = os.getenv('TO_EMAIL')
-    subject = 'Alarm Triggered! at {timestamp}'
+_devices_cache = {'at': 0.0, 'devices': {}}
+_devices_lock = threading.Lock()
+
+
+def get_devices_cached(ttl=NOTIFY_DEVICES_TTL):
+    """Network devices for the alarm body, re-read from the database at most every ``ttl`` seconds."""
+    with _devices_lock:
+        if time.monotonic() - _devices_cache['at'] >= ttl:
+            _devices_cache['devices'] = db.get_devices_from_db()
+            _devices_cache['at'] = time.monotonic()
+        return _devices_cache['devices']
+
+
+def build_alarm_body(devices, detections=None):
+    """HTML body of the alarm email; ``detections`` lists the times of a coalesced burst."""
     devices_html = "<ul>"
-    devices = db.get_devices_from_db()
     for ip_address, details in devices.items():
         devices_html += (
             f"<li><strong>IP Address:</strong> {ip_address}<br>"
@@ -73,10 +130,16 @@ def send_alarm_email(email_sender):
             f"<strong>Timestamp:</strong> {details['timestamp']}</li>"
         )
     devices_html += "</ul>"
-    body = (
+    detections_html = ""
+    if detections and len(detections) > 1:
+        detections_html = (
+            f"<p><strong>{len(detections)} detections</strong> between {detections[0]} and {detections[-1]}.</p>"
+        )
+    return (
         "<html>"
         "<body style='font-family: Arial, sans-serif; color: #333;'>"
         "<h2 style='color: #d9534f;'>Alarm Triggered!</h2>"
+        f"{detections_html}"
         "<p>An alarm has been triggered in the security system. Here are the details of the connected devices:</p>"
         f"{devices_html}"
         "<h3>Instructions to Follow:</h3>"
@@ -92,7 +155,40 @@ def send_alarm_email(email_sender):
         "</html>"
     )
 
-    email_sender.send_email(to_email, subject, body)
+
+def send_alarm_email(email_sender):
+    """Sends an alarm notification email with the current status of all connected devices."""
+    to_email = os.getenv('TO_EMAIL')
+    subject = 'Alarm Triggered! at {timestamp}'
+    email_sender.send_email(to_email, subject, build_alarm_body(get_devices_cached()))
+
+
+def render_notification(kind, events):
+    """Builds the message for a burst of ``events`` (notifier.Event) of the same kind."""
+    times = [time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.at)) for event in events]
+    sensors = sorted({str(event.details.get('sensor_id')) for event in events if event.details.get('sensor_id')})
+    where = f" ({', '.join(sensors)})" if sensors else ""
+
+    if kind == 'alarm':
+        if len(events) == 1:
+            subject = 'Alarm Triggered! at {timestamp}'
+            text = f"🚨 Alarm triggered at {times[0]}{where}"
+        else:
+            subject = f'Alarm Triggered! {len(events)} detections at {{timestamp}}'
+            text = f"🚨 Alarm still active: {len(events)} detections between {times[0]} and {times[-1]}{where}"
+        return Notification(kind, subject, text, build_alarm_body(get_devices_cached(), times), len(events))
+
+    text = f"{kind}: {len(events)} event(s) between {times[0]} and {times[-1]}{where}"
+    return Notification(kind, f'{kind} at {{timestamp}}', text, f"<p>{text}</p>", len(events))
+
+
+def create_notification_dispatcher(email_sender, to_email=None):
+    """Dispatcher delivering to email and, when TELEGRAM_TOKEN is set, to every chat in TELEGRAM_ALARM_CHAT_IDS."""
+    channels = [EmailChannel(email_sender, to_email or os.getenv('TO_EMAIL'))]
+    chat_ids = [chat.strip() for chat in (TELEGRAM_ALARM_CHAT_IDS or '').split(',') if chat.strip()]
+    if TELEGRAM_TOKEN and chat_ids:
+        channels.append(TelegramChannel(TELEGRAM_TOKEN, chat_ids))
+    return NotificationDispatcher(channels, render_notification)
 
 
 # Keep Italian alias for backward compatibility with existing callers
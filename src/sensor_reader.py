@@ -1,9 +1,26 @@
 import serial
 import psycopg2
-from datetime import datetime, timedelta
+import logging
+import selectors
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
 from client.PostgresClient import PostgresHandler
 import psutil
-from send_email import EmailSender, invia_allarme_email
+from send_email import EmailSender, create_notification_dispatcher
+from ingest_pipeline import IngestPipeline
+from alarm_listener import AlarmStateListener
+from spool import Spool, SpoolReplayer
+from compression import IngestCompressor
+from config.settings import (
+    SPOOL_DIR,
+    COMPRESSION_MODE,
+    COMPRESSION_TEMPERATURE_TOLERANCE,
+    COMPRESSION_HUMIDITY_TOLERANCE,
+    COMPRESSION_HEARTBEAT,
+    SENSOR_SOURCES,
+)
 import os
 
 # Definizione delle variabili di connessione al database
@@ -22,19 +39,109 @@ def get_db_connection():
         host=db_host
     )
 
+# Campione letto dalla seriale, con l'ora di ricezione e il sensore di provenienza
+SerialSample = namedtuple('SerialSample', ['received_at', 'temperature', 'humidity', 'distance', 'sensor_id'])
+
+# Porta seriale di un sensore; l'offset viene sommato alla temperatura letta
+SerialSource = namedtuple('SerialSource', ['sensor_id', 'port', 'baud_rate', 'temperature_offset'])
+
+# Oltre questa lunghezza senza fine riga il buffer di una porta viene scartato
+MAX_LINE_LENGTH = 1024
+
+
+def parse_sensor_sources(spec=SENSOR_SOURCES):
+    """Interpreta ``sensor_id=porta[:baud[:offset]]`` separati da virgola in una lista di SerialSource."""
+    sources = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        sensor_id, _, rest = item.partition('=')
+        parts = rest.split(':')
+        if not sensor_id or not parts[0]:
+            raise ValueError(f"Sorgente seriale non valida: {item!r}")
+        baud_rate = int(parts[1]) if len(parts) > 1 and parts[1] else 9600
+        offset = float(parts[2]) if len(parts) > 2 and parts[2] else 0.0
+        sources.append(SerialSource(sensor_id.strip(), parts[0], baud_rate, offset))
+    return sources
+
+
+class SerialPort:
+    """Una porta seriale non bloccante con il suo buffer di riga e lo stato di riconnessione."""
+
+    def __init__(self, source, reconnect_delay=5):
+        self.source = source
+        self.reconnect_delay = reconnect_delay
+        self.ser = None
+        self.buffer = b''
+        self.retry_at = 0
+        self.lines = 0
+        self.parse_errors = 0
+        self.reconnects = 0
+
+    def open(self):
+        # timeout=0: read() restituisce solo quello che è già arrivato
+        self.ser = serial.Serial(self.source.port, self.source.baud_rate, timeout=0)
+        self.buffer = b''
+        return self.ser
+
+    def close(self):
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except (serial.SerialException, OSError):
+                pass
+        self.ser = None
+        self.retry_at = time.monotonic() + self.reconnect_delay
+
+    def read_lines(self):
+        """Legge i byte disponibili e restituisce le righe complete."""
+        data = self.ser.read(self.ser.in_waiting or 1)
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        if len(self.buffer) > MAX_LINE_LENGTH:
+            self.buffer = b''
+            self.parse_errors += 1
+        return [line for line in lines if line.strip()]
+
+    def stats(self):
+        return {
+            'port': self.source.port,
+            'connected': self.ser is not None,
+            'lines': self.lines,
+            'parse_errors': self.parse_errors,
+            'reconnects': self.reconnects,
+        }
+
+
 class SensorReader:
-    def __init__(self, port, baud_rate, timeout):
-        """Inizializza la connessione seriale e la connessione al database."""
-        self.ser = serial.Serial(port, baud_rate, timeout=timeout)
+    """Legge N porte seriali con un solo selector e delega il resto a una pipeline.
+
+    Ogni sensore è una ``SerialSource`` (id, porta, baud, offset di
+    temperatura); le porte sono aperte in modalità non bloccante e un unico
+    loop ``selectors`` legge quelle pronte, anche pty usate al posto dei
+    dispositivi veri. Una porta che cade viene chiusa e riaperta dopo qualche
+    secondo senza fermare le altre. Il loop fa solo lettura e parsing e mette
+    in coda il campione con timestamp e ``sensor_id``: nessuna query o email
+    può più rallentare la seriale e far perdere righe. Lo stadio di scrittura
+    (``IngestPipeline``) gestisce allarme, filtro dei valori, compressione
+    (vedi compression.py, uno stato per sensore) e inserimento a batch con un
+    commit per intervallo di flush.
+    """
+
+    def __init__(self, sources, timeout=1):
+        """Prepara le porte seriali e la connessione al database."""
+        self.ports = [SerialPort(source) for source in sources]
+        self.timeout = timeout
+        self.selector = selectors.DefaultSelector()
         self.db_config = {
             'dbname': db_database,
             'user': db_user,
             'password': db_password,
             'host': db_host
         }
-        self.last_temperature = None
-        self.last_humidity = None
-        self.last_record_time = datetime.now()  # Timestamp dell'ultima registrazione
+        # Si salvano solo le variazioni significative (deadband o SDT), più un heartbeat
+        self.compressors = {}
         self.db = PostgresHandler(self.db_config)
         
         # Configurazione dell'email
@@ -43,65 +150,143 @@ class SensorReader:
         self.username = os.getenv('EMAIL_USERNAME')
         self.password = os.getenv('EMAIL_PASSWORD')
         self.email_sender = EmailSender(self.smtp_server, self.smtp_port, self.username, self.password)
+        # Le notifiche partono da un thread dedicato: il loop di lettura non attende mai SMTP o Telegram
+        self.notifier = create_notification_dispatcher(self.email_sender)
         
-        self.last_alarm_time = datetime.now()
         self.last_backup_time = datetime.now()
-        self.db = PostgresHandler(self.db_config)
 
+        # Stato dell'allarme tenuto in memoria e aggiornato via LISTEN/NOTIFY
+        self.alarm = AlarmStateListener(self.db_config)
 
-    def read_data(self):
-        """Legge e processa i dati dalla porta seriale e ritorna una lista con temperatura e umidità."""
-        try:
-            while True:
-                line = self.ser.readline().decode('utf-8').strip()
-                temperature, humidity, distance = line.split(",")
-
-                # Converte i valori in float per una comparazione accurata
-                temperature = float(temperature) - 1.7  # Sottrai 1.7 gradi per compensare il calore residuo della ciabatta e allineare la lettura al termostato della caldaia
-                humidity = float(humidity)
-                distance = int(distance)
-                #print("Eseguo script di backup")
-                # Esegui il backup se è passato più di 24 ore dall'ultima esecuzione
-                #if datetime.now() - self.last_backup_time >= timedelta(minutes=1):
-                #    os.system('./backup.sh')
-                #    print("Eseguito script di backup")
-                #    self.last_backup_time = datetime.now()
-
-
-                last_alarm = self.db.get_last_alarm_status()
-                status = last_alarm["status"]
-                 # Ottieni il timestamp corrente come oggetto datetime
-                check_timestamp = datetime.now()
-                print(f"status: {status}, distance: {distance}")
-                # Verifica se è passato abbastanza tempo dall'ultimo allarme
-                if status == "true" and distance < 80:
-                    print(f"pre - invio allarme, {check_timestamp} \n")
-
-                    # Verifica se è passato abbastanza tempo dall'ultimo allarme
-                    if (check_timestamp - self.last_alarm_time) >= timedelta(seconds=10):  # Intervallo di 10 secondi
-                        invia_allarme_email(self.email_sender)
-                        #print("invio allarme")
-
-                        # Aggiorna il timestamp dell'ultimo allarme
-                        self.last_alarm_time = check_timestamp
-
-                if temperature <= 45 and temperature >=8 and humidity <= 90:
-                    # Controlla se i valori sono cambiati
-                    if temperature != self.last_temperature or humidity != self.last_humidity:
-                        # Salva i nuovi valori nel database
-                        self.db.save_to_db(temperature, humidity)
-                        
-                        # Aggiorna gli ultimi valori salvati
-                        self.last_temperature = temperature
-                        self.last_humidity = humidity
-                        self.db.create_temp_table_and_aggregate_data()
-                    #current_time = datetime.now()
-                    #if current_time - self.last_aggregation_time >= timedelta(minutes=60):
-                        #self.db.create_temp_table_and_aggregate_data()  # Esegui l'aggregazione
-                        #self.last_aggregation_time = current_time  # Aggiorna il tempo dell'ultima aggregazione
+        self.running = True
+        self.logger = logging.getLogger("sensor_reader")
+        # Se il database è giù i batch finiscono nello spool e vengono reinseriti dopo
+        self.spool = Spool(os.path.join(SPOOL_DIR, 'sensor_readings.sqlite3'))
+        self.pipeline = IngestPipeline(
+            'sensor_readings',
+            write_batch=self.db.save_readings_batch,
+            transform=self.process_sample,
+            spool=self.spool,
+            extra_stats={
+                'compression': lambda: {sid: c.stats() for sid, c in list(self.compressors.items())},
+                'ports': lambda: {port.source.sensor_id: port.stats() for port in self.ports},
+                'notifications': self.notifier.stats,
+            },
+        )
+        self.replayer = SpoolReplayer(self.spool, self.db.save_readings_batch, pipeline=self.pipeline)
 
-        except Exception as e:
+    def compressor(self, sensor_id):
+        compressor = self.compressors.get(sensor_id)
+        if compressor is None:
+            compressor = self.compressors[sensor_id] = IngestCompressor(
+                ('temperature', 'humidity'),
+                {'temperature': COMPRESSION_TEMPERATURE_TOLERANCE, 'humidity': COMPRESSION_HUMIDITY_TOLERANCE},
+                mode=COMPRESSION_MODE,
+                heartbeat=COMPRESSION_HEARTBEAT,
+            )
+        return compressor
+
+    def parse_line(self, raw, received_at, source):
+        """Converte una riga ``temperatura,umidità,distanza`` in un SerialSample."""
+        temperature, humidity, distance = raw.decode('utf-8').strip().split(",")
+        # L'offset compensa ad es. il calore residuo della ciabatta (-1.7 sul sensore principale)
+        # e allinea la lettura al termostato della caldaia
+        return SerialSample(
+            received_at, float(temperature) + source.temperature_offset,
+            float(humidity), int(distance), source.sensor_id,
+        )
+
+    def open_ports(self):
+        """Apre (o riapre, scaduta l'attesa) le porte chiuse e le registra nel selector."""
+        now = time.monotonic()
+        for port in self.ports:
+            if port.ser is not None or now < port.retry_at:
+                continue
+            try:
+                self.selector.register(port.open(), selectors.EVENT_READ, port)
+                self.logger.info(f"🔌 Porta {port.source.port} aperta (sensore {port.source.sensor_id})")
+            except (serial.SerialException, OSError, ValueError) as e:
+                self.logger.error(f"Apertura {port.source.port} fallita: {e}")
+                port.close()
+                port.reconnects += 1
+
+    def drop_port(self, port, error):
+        self.logger.error(f"Errore lettura seriale {port.source.port}: {error}")
+        try:
+            self.selector.unregister(port.ser)
+        except (KeyError, ValueError):
             pass
+        port.close()
+        port.reconnects += 1
+
+    def read_port(self, port):
+        try:
+            lines = port.read_lines()
+        except (serial.SerialException, OSError) as e:
+            self.drop_port(port, e)
+            return
+
+        received_at = datetime.now()
+        for raw in lines:
+            port.lines += 1
+            try:
+                sample = self.parse_line(raw, received_at, port.source)
+            except (UnicodeDecodeError, ValueError) as e:
+                port.parse_errors += 1
+                self.logger.debug(f"Riga seriale non valida da {port.source.port} {raw!r}: {e}")
+                continue
+            self.pipeline.offer(sample)
+
+    def read_data(self):
+        """Avvia lo stadio di scrittura e legge le porte su questo thread finché ``stop()``."""
+        threading.Thread(target=self.alarm.run, name="alarm-listener", daemon=True).start()
+        threading.Thread(target=self.replayer.run, name="spool-replayer", daemon=True).start()
+        threading.Thread(target=self.notifier.run, name="notifier", daemon=True).start()
+        writer = threading.Thread(target=self.pipeline.run, name="sensor-writer", daemon=True)
+        writer.start()
+
+        while self.running:
+            self.open_ports()
+            if not self.selector.get_map():
+                time.sleep(1)  # nessuna porta aperta: si attende la riconnessione
+                continue
+            for key, _ in self.selector.select(timeout=self.timeout):
+                self.read_port(key.data)
+
+        for port in self.ports:
+            if port.ser is not None:
+                self.selector.unregister(port.ser)
+                port.close()
+        self.selector.close()
+        self.pipeline.stop()
+        self.alarm.stop()
+        self.replayer.stop()
+        writer.join()
+        self.notifier.stop()
+
+    def stop(self):
+        self.running = False
+
+    def process_sample(self, sample):
+        """Stadio di scrittura: controlla l'allarme e restituisce la riga da salvare (o None)."""
+        self.check_alarm(sample)
+
+        temperature, humidity = sample.temperature, sample.humidity
+        if not (8 <= temperature <= 45 and humidity <= 90):
+            return None
+        return self.compressor(sample.sensor_id).offer(
+            sample.received_at.timestamp(),
+            {'temperature': temperature, 'humidity': humidity},
+            payload=(temperature, humidity, sample.received_at, sample.sensor_id),
+        )
+
+    def check_alarm(self, sample):
+        if sample.distance >= 80 or not self.alarm.armed:
+            return
+
+        # Nessun intervallo minimo qui: le raffiche vengono raggruppate dal dispatcher
+        self.notifier.notify('alarm', {'sensor_id': sample.sensor_id, 'distance': sample.distance},
+                             at=sample.received_at.timestamp())
 
 
     def get_raspberry_pi_stats():
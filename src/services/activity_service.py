@@ -11,9 +11,10 @@ from collections import defaultdict
 import os
 from client.GoogleCalendarClient import GoogleCalendarClient
 from client.PostgresClient import PostgresHandler
+from utils.time_windows import day_window, month_window, iso_week_window
+from models.migrations import migrate
 from models.activity_models import (
-    Category, Event, DailyStat, WeeklyStat, MonthlyStat,
-    CREATE_TABLES_SQL
+    Category, Event, DailyStat, WeeklyStat, MonthlyStat
 )
 
 db_config = {
@@ -40,9 +41,9 @@ class ActivityService:
         self._load_categories_cache()
     
     def initialize_database(self):
-        """Crea le tabelle necessarie nel database"""
+        """Crea le tabelle necessarie nel database applicando le migrazioni pendenti"""
         print("Creazione tabelle database...")
-        self.pg.execute_query(CREATE_TABLES_SQL)
+        migrate(self.pg.db_config)
         print("✓ Tabelle create")
     
     def load_categories_from_json(self, json_path: str = 'config/categories.json'):
@@ -230,13 +231,13 @@ class ActivityService:
                 SUM(duration_minutes) as total_minutes,
                 COUNT(*) as event_count
             FROM activity_events
-            WHERE DATE(start_datetime) = %s 
+            WHERE start_datetime >= %s AND start_datetime < %s
                 AND category_id IS NOT NULL
                 AND is_all_day = FALSE
             GROUP BY category_id
         """
         
-        results = self.pg.execute_query(query, (target_date,))
+        results = self.pg.execute_query(query, day_window(target_date))
         
         # Calcola il totale per le percentuali
         total_minutes = sum(row[1] for row in results)
@@ -341,13 +342,12 @@ class ActivityService:
                 SUM(ds.event_count) as event_count
             FROM activity_daily_stats ds
             JOIN activity_categories c ON ds.category_id = c.id
-            WHERE EXTRACT(YEAR FROM ds.date) = %s 
-                AND EXTRACT(WEEK FROM ds.date) = %s
+            WHERE ds.date >= %s::date AND ds.date < %s::date
             GROUP BY c.id, c.code, c.macro_category, c.micro_category, c.icon
             ORDER BY total_minutes DESC
         """
         
-        results = self.pg.execute_query(query, (year, week))
+        results = self.pg.execute_query(query, iso_week_window(year, week))
         
         stats = []
         for row in results:
@@ -388,13 +388,12 @@ class ActivityService:
                 COUNT(DISTINCT ds.date) as days_tracked
             FROM activity_daily_stats ds
             JOIN activity_categories c ON ds.category_id = c.id
-            WHERE EXTRACT(YEAR FROM ds.date) = %s 
-                AND EXTRACT(MONTH FROM ds.date) = %s
+            WHERE ds.date >= %s::date AND ds.date < %s::date
             GROUP BY c.id, c.code, c.macro_category, c.micro_category, c.icon
             ORDER BY total_minutes DESC
         """
         
-        results = self.pg.execute_query(query, (year, month))
+        results = self.pg.execute_query(query, month_window(year, month))
         
         stats = []
         for row in results:
@@ -1,7 +1,19 @@
+import atexit
+import threading
 import psycopg2
 import psycopg2.extras
 from datetime import datetime
 from models.database import BaseService
+from utils.time_windows import day_window, month_window, year_window
+from utils.query_cache import cached_period, invalidate_timestamp
+from ingest_pipeline import IngestPipeline
+from client.PostgresClient import notify_air_quality
+from models.daily_summary import read_days, to_heatmap
+from config.settings import (
+    AIR_QUALITY_QUEUE_SIZE,
+    AIR_QUALITY_FLUSH_INTERVAL_MS,
+    AIR_QUALITY_MAX_BATCH,
+)
 
 class AirQualityService(BaseService):
     """Service to manage air quality data"""
@@ -40,8 +52,9 @@ class AirQualityService(BaseService):
             if conn:
                 conn.close()
 
-    def insert_record(self, payload: dict):
-        """Inserts a new air quality record"""
+    @staticmethod
+    def validate_record(payload: dict):
+        """Validates a POSTed record and returns the row to insert (timestamped now)"""
         required_fields = ['smoke', 'lpg', 'methane', 'hydrogen', 'air_quality_index', 'air_quality_description']
         for f in required_fields:
             if f not in payload:
@@ -68,6 +81,12 @@ class AirQualityService(BaseService):
         if not desc:
             raise ValueError("description is empty")
 
+        return (smoke, lpg, methane, hydrogen, aqi, desc, datetime.now())
+
+    def insert_record(self, payload: dict):
+        """Inserts a new air quality record"""
+        row = self.validate_record(payload)
+
         query = """
             INSERT INTO air_quality (smoke, lpg, methane, hydrogen, air_quality_index, air_quality_description, timestamp)
             VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id, timestamp;
@@ -77,10 +96,11 @@ class AirQualityService(BaseService):
         try:
             conn = self._connect()
             cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            timestamp = datetime.now()
-            cur.execute(query, (smoke, lpg, methane, hydrogen, aqi, desc, timestamp))
+            cur.execute(query, row)
             res = cur.fetchone()
+            notify_air_quality(cur, [row])
             conn.commit()
+            invalidate_timestamp('air_quality', row[-1])
             return {'id': res['id'], 'timestamp': res['timestamp'].isoformat()}
         finally:
             if cur:
@@ -88,6 +108,48 @@ class AirQualityService(BaseService):
             if conn:
                 conn.close()
 
+    def insert_records_batch(self, rows):
+        """Inserts validated rows with a single multi-row INSERT and one commit"""
+        if not rows:
+            return 0
+        conn = None
+        cur = None
+        try:
+            conn = self._connect()
+            cur = conn.cursor()
+            psycopg2.extras.execute_values(
+                cur,
+                "INSERT INTO air_quality (smoke, lpg, methane, hydrogen, air_quality_index, "
+                "air_quality_description, timestamp) VALUES %s",
+                rows,
+                page_size=1000,
+            )
+            # Pushed to the dashboards by services/live_push.py once committed
+            notify_air_quality(cur, rows)
+            conn.commit()
+        except Exception:
+            if conn:
+                conn.rollback()
+            raise
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                conn.close()
+        for day in {row[-1].date() for row in rows}:
+            invalidate_timestamp('air_quality', datetime.combine(day, datetime.min.time()))
+        return len(rows)
+
+    def today_version(self):
+        """Version of today's readings (newest timestamp and row count), for conditional GETs"""
+        start, end = day_window()
+        row = self._execute_query(
+            "SELECT MAX(timestamp) AS latest, COUNT(*) AS rows FROM air_quality WHERE timestamp >= %s AND timestamp < %s;",
+            (start, end),
+            fetch_one=True,
+        )
+        return start.date(), row['latest'], row['rows']
+
     def get_daily_aggregated(self):
         """Gets aggregated air quality data for today"""
         query = """
@@ -98,7 +160,7 @@ class AirQualityService(BaseService):
                 MIN(air_quality_index) as min_aqi,
                 MAX(air_quality_index) as max_aqi
             FROM air_quality
-            WHERE DATE(timestamp) = CURRENT_DATE
+            WHERE timestamp >= %s AND timestamp < %s
             GROUP BY EXTRACT(HOUR FROM timestamp)
             ORDER BY hour;
         """
@@ -107,7 +169,7 @@ class AirQualityService(BaseService):
         try:
             conn = self._connect()
             cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cur.execute(query)
+            cur.execute(query, day_window())
             rows = cur.fetchall()
             data = {}
             for r in rows:
@@ -136,7 +198,7 @@ class AirQualityService(BaseService):
                 ROUND(AVG(hydrogen)::numeric, 2) AS avg_hydrogen,
                 COUNT(*) as measurement_count
             FROM air_quality 
-            WHERE DATE(timestamp) = CURRENT_DATE
+            WHERE timestamp >= %s AND timestamp < %s
             GROUP BY EXTRACT(HOUR FROM timestamp)
             ORDER BY hour;
         """
@@ -145,7 +207,7 @@ class AirQualityService(BaseService):
         try:
             conn = self._connect()
             cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cur.execute(query)
+            cur.execute(query, day_window())
             rows = cur.fetchall()
             if not rows:
                 # Return placeholder for 24 hours
@@ -174,38 +236,86 @@ class AirQualityService(BaseService):
             if conn:
                 conn.close()
     
+    @cached_period('air_quality', 'month')
     def get_monthly_daily_avg(self, month: int, year: int):
         query = """
             SELECT EXTRACT(DAY FROM timestamp)::int AS day,
                 ROUND(AVG(air_quality_index)::numeric, 2) AS avg_aqi
             FROM air_quality
-            WHERE EXTRACT(MONTH FROM timestamp) = %s AND EXTRACT(YEAR FROM timestamp) = %s
+            WHERE timestamp >= %s AND timestamp < %s
             GROUP BY EXTRACT(DAY FROM timestamp) ORDER BY day;
         """
         conn, cur = None, None
         try:
             conn = self._connect()
             cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cur.execute(query, (month, year))
+            cur.execute(query, month_window(year, month))
             return {str(int(r['day'])): float(r['avg_aqi']) for r in cur.fetchall()}
         finally:
             if cur: cur.close()
             if conn: conn.close()
 
+    @cached_period('air_quality', 'year')
     def get_yearly_monthly_avg(self, year: int):
         query = """
             SELECT EXTRACT(MONTH FROM timestamp)::int AS month,
                 ROUND(AVG(air_quality_index)::numeric, 2) AS avg_aqi
             FROM air_quality
-            WHERE EXTRACT(YEAR FROM timestamp) = %s
+            WHERE timestamp >= %s AND timestamp < %s
             GROUP BY EXTRACT(MONTH FROM timestamp) ORDER BY month;
         """
         conn, cur = None, None
         try:
             conn = self._connect()
             cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cur.execute(query, (year,))
+            cur.execute(query, year_window(year))
             return {str(int(r['month'])): float(r['avg_aqi']) for r in cur.fetchall()}
         finally:
             if cur: cur.close()
             if conn: conn.close()
+
+    @cached_period('air_quality', 'year')
+    def get_year_heatmap(self, year: int, stat: str = 'avg'):
+        """Daily AQI of a year as {month: {day: value}}, from the day-level summary"""
+        conn = None
+        try:
+            conn = self._connect()
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                rows = read_days(cur, 'air_quality_index', *year_window(year))
+            return to_heatmap(rows, stat)
+        finally:
+            if conn: conn.close()
+
+
+_write_buffer = None
+_write_buffer_lock = threading.Lock()
+
+
+def get_air_quality_write_buffer(service):
+    """Return the process-wide write-behind buffer for air quality POSTs, starting it on first use.
+
+    Validated rows are queued and written by ``service.insert_records_batch``
+    every ``AIR_QUALITY_FLUSH_INTERVAL_MS`` or as soon as
+    ``AIR_QUALITY_MAX_BATCH`` rows are waiting; rows still queued at exit are
+    flushed before the process ends.
+    """
+    global _write_buffer
+    with _write_buffer_lock:
+        if _write_buffer is None:
+            buffer = IngestPipeline(
+                'air_quality',
+                write_batch=service.insert_records_batch,
+                max_queue=AIR_QUALITY_QUEUE_SIZE,
+                flush_interval=AIR_QUALITY_FLUSH_INTERVAL_MS / 1000,
+                max_batch=AIR_QUALITY_MAX_BATCH,
+            )
+            thread = threading.Thread(target=buffer.run, name="air-quality-writer", daemon=True)
+            thread.start()
+
+            def shutdown():
+                buffer.stop()
+                thread.join(timeout=5)
+
+            atexit.register(shutdown)
+            _write_buffer = buffer
+        return _write_buffer
@@ -0,0 +1,281 @@
+"""
+Streaming export of the historical tables (CSV, NDJSON, Parquet).
+
+Exports read through a server-side (named) cursor, ``chunk_size`` rows at a
+time, on a dedicated read-only connection: an export of several years
+neither loads the result in memory nor holds a connection of the shared
+pool for minutes. Each chunk is encoded and handed to the caller as bytes
+before the next one is fetched, so memory stays bounded by one chunk
+whatever the range. Parquet files are written with one row group per
+chunk (pyarrow is only imported when Parquet is requested).
+
+Used by ``GET /api/export/<table>`` and by the ``export_data.py`` CLI.
+"""
+
+import csv
+import io
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+import psycopg2
+
+from config.settings import EXPORT_CHUNK_SIZE, EXPORT_MAX_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# table -> time column, exported columns with their type, optional key filter
+EXPORT_TABLES = {
+    'sensor_readings': {
+        'time': 'timestamp',
+        'columns': [('timestamp', 'timestamp'), ('sensor_id', 'string'),
+                    ('temperature_c', 'float'), ('humidity', 'float')],
+        'key': 'sensor_id',
+    },
+    'air_quality': {
+        'time': 'timestamp',
+        'columns': [('id', 'int'), ('timestamp', 'timestamp'), ('smoke', 'float'), ('lpg', 'float'),
+                    ('methane', 'float'), ('hydrogen', 'float'), ('air_quality_index', 'float'),
+                    ('air_quality_description', 'string')],
+    },
+    'thermostat_log': {
+        'time': 'timestamp',
+        'columns': [('id', 'int'), ('timestamp', 'timestamp'), ('action', 'string'),
+                    ('current_temp', 'float'), ('target_temp', 'float'), ('boiler_status', 'bool')],
+    },
+    'device_metrics': {
+        'time': 'timestamp',
+        'columns': [('timestamp', 'timestamp'), ('device_id', 'string'), ('measurement', 'string'),
+                    ('field', 'string'), ('value', 'float')],
+        'key': 'device_id',
+    },
+}
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def encode_csv(columns, chunks):
+    """Header line, then one CSV block per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(
+            [v.isoformat() if isinstance(v, datetime) else v for v in row] for row in rows
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(columns, chunks):
+    """One JSON object per line, one block per chunk."""
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(columns, row)), default=_json_value) + "\n" for row in rows
+        ).encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file collecting what pyarrow writes until it is drained."""
+
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema(spec):
+    import pyarrow as pa
+
+    types = {
+        'timestamp': pa.timestamp('us'),
+        'string': pa.string(),
+        'float': pa.float64(),
+        'int': pa.int64(),
+        'bool': pa.bool_(),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in spec['columns']])
+
+
+def encode_parquet(spec, chunks):
+    """A Parquet file with one row group per chunk, yielded as it is written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(spec)
+    floats = [kind == 'float' for _, kind in spec['columns']]
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in chunks:
+            arrays = [
+                pa.array([None if v is None else float(v) for v in values] if is_float else list(values),
+                         type=field.type)
+                for values, is_float, field in zip(zip(*rows), floats, schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parse_chunk_size(value):
+    if value in (None, ''):
+        return EXPORT_CHUNK_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("chunk_size must be an integer")
+    if not 1 <= size <= EXPORT_MAX_CHUNK_SIZE:
+        raise ValueError(f"chunk_size must be between 1 and {EXPORT_MAX_CHUNK_SIZE}")
+    return size
+
+
+class TableExport:
+    """One export: validated and opened on creation, streamed by iterating ``chunks()``.
+
+    The server-side cursor is declared in ``open()``, so connection and
+    query errors surface before the first byte is sent; iterating yields the
+    encoded bytes and closes the connection at the end (or on ``close()``,
+    e.g. when the client goes away).
+    """
+
+    def __init__(self, db_config, table, fmt='csv', start=None, end=None, key=None, chunk_size=EXPORT_CHUNK_SIZE):
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown table {table!r}. Use one of {', '.join(EXPORT_TABLES)}.")
+        if fmt not in FORMATS:
+            raise ValueError(f"Invalid format {fmt!r}. Use one of {', '.join(FORMATS)}.")
+        if fmt == 'parquet':
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                raise ValueError("Parquet export needs pyarrow, which is not installed.")
+        spec = EXPORT_TABLES[table]
+        if key is not None and 'key' not in spec:
+            raise ValueError(f"Table {table!r} has no sensor/device filter.")
+        if start and end and end <= start:
+            raise ValueError("'from' must be before 'to'.")
+
+        self.db_config = db_config
+        self.table = table
+        self.spec = spec
+        self.format = fmt
+        self.start, self.end, self.key = start, end, key
+        self.chunk_size = chunk_size
+        self.columns = [name for name, _ in spec['columns']]
+        self.rows = 0
+        self.bytes = 0
+        self._conn = None
+        self._cur = None
+
+    @property
+    def mimetype(self):
+        return FORMATS[self.format][0]
+
+    @property
+    def filename(self):
+        bounds = "_".join(f"{t:%Y%m%d}" for t in (self.start, self.end) if t)
+        return f"{self.table}{'_' + bounds if bounds else ''}.{FORMATS[self.format][1]}"
+
+    def _query(self):
+        time_column = self.spec['time']
+        conditions, params = [], []
+        if self.start:
+            conditions.append(f"{time_column} >= %s")
+            params.append(self.start)
+        if self.end:
+            conditions.append(f"{time_column} < %s")
+            params.append(self.end)
+        if self.key is not None:
+            conditions.append(f"{self.spec['key']} = %s")
+            params.append(self.key)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        query = f"SELECT {', '.join(self.columns)} FROM {self.table}{where} ORDER BY {time_column}"
+        return query, params
+
+    def open(self):
+        self._conn = psycopg2.connect(**self.db_config)
+        try:
+            self._conn.set_session(readonly=True)
+            # Named cursor: rows stay on the server and arrive chunk_size at a time
+            self._cur = self._conn.cursor(name=f"export_{uuid.uuid4().hex[:12]}")
+            self._cur.itersize = self.chunk_size
+            self._cur.execute(*self._query())
+        except Exception:
+            self.close()
+            raise
+        return self
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+            self._conn = self._cur = None
+
+    def _row_chunks(self):
+        while self._cur is not None:
+            rows = self._cur.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            self.rows += len(rows)
+            yield rows
+
+    def chunks(self):
+        """Encoded bytes of the export, chunk by chunk."""
+        started = time.perf_counter()
+        if self.format == 'parquet':
+            encoded = encode_parquet(self.spec, self._row_chunks())
+        elif self.format == 'ndjson':
+            encoded = encode_ndjson(self.columns, self._row_chunks())
+        else:
+            encoded = encode_csv(self.columns, self._row_chunks())
+        try:
+            for data in encoded:
+                if data:
+                    self.bytes += len(data)
+                    yield data
+            logger.info(
+                f"Exported {self.rows} rows of {self.table} as {self.format} "
+                f"({self.bytes / 1024 ** 2:.1f} MB) in {time.perf_counter() - started:.1f}s"
+            )
+        finally:
+            self.close()
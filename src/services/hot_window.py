@@ -0,0 +1,339 @@
+"""
+In-process window of the most recent sensor readings.
+
+The dashboard endpoints only look at the last day (hourly averages of
+today, latest reading, thermostat temperature), yet each call went to
+PostgreSQL. ``HotWindow`` keeps the last ``HOT_WINDOW_HOURS`` of readings
+in NumPy columns (epoch seconds, temperature, humidity, sensor code) and
+answers those queries with vectorized aggregations.
+
+``HotWindowListener`` fills it: it loads the window from ``sensor_readings``
+at startup and after every reconnection, then appends the rows that the
+writers announce on ``SENSOR_READINGS_CHANNEL`` (see
+``PostgresHandler._write_readings``) when they commit. While the listener
+is disconnected the window reports itself not ready and callers go to the
+database as before.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import psycopg2
+
+from config.settings import (
+    SENSOR_READINGS_CHANNEL,
+    HOT_WINDOW_ENABLED,
+    HOT_WINDOW_HOURS,
+    HOT_WINDOW_CAPACITY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class HotWindow:
+    """Time-ordered columns of recent readings in preallocated arrays.
+
+    Rows live in ``[start, end)`` of arrays of ``capacity`` slots: appends
+    write at ``end``, expired rows are dropped by moving ``start``, and the
+    live slice is moved back to the front only when ``end`` reaches the
+    capacity. Reads are therefore zero-copy slices, already sorted for
+    ``np.searchsorted``. Late rows are inserted in place by shifting the
+    rows after them; only rows older than ``covered_from`` make ``extend``
+    return False, and the owner reloads the window.
+    """
+
+    def __init__(self, hours=HOT_WINDOW_HOURS, capacity=HOT_WINDOW_CAPACITY):
+        self.hours = hours
+        self.capacity = capacity
+        self.ts = np.empty(capacity, dtype=np.float64)
+        self.temperature = np.empty(capacity, dtype=np.float32)
+        self.humidity = np.empty(capacity, dtype=np.float32)
+        self.sensor = np.empty(capacity, dtype=np.int16)
+        self.start = self.end = 0
+
+        self.codes = {}           # sensor_id -> code stored in ``sensor``
+        self.latest_by_sensor = {}
+        self.covered_from = None  # epoch from which the window holds every reading
+        self.ready = False
+        self._lock = threading.Lock()
+
+        self.counters = {'loads': 0, 'appended': 0, 'evicted': 0, 'overflow': 0, 'out_of_order': 0, 'hits': 0}
+
+    def _code(self, sensor_id):
+        code = self.codes.get(sensor_id)
+        if code is None:
+            code = self.codes[sensor_id] = len(self.codes)
+        return code
+
+    def _evict(self, now):
+        cutoff = now - self.hours * 3600
+        drop = int(np.searchsorted(self.ts[self.start:self.end], cutoff, side='left'))
+        if drop:
+            self.start += drop
+            self.counters['evicted'] += drop
+        self.covered_from = max(self.covered_from or cutoff, cutoff)
+
+    def _make_room(self, n):
+        """Move the live slice to the front if ``n`` more rows do not fit after it; caller holds the lock."""
+        if self.end + n <= self.capacity:
+            return
+        size = self.end - self.start
+        keep = max(0, min(size, self.capacity - n))
+        if keep < size:
+            # Window too small for HOT_WINDOW_HOURS: the oldest rows are lost
+            self.counters['overflow'] += size - keep
+            self.covered_from = float(self.ts[self.end - keep]) if keep else None
+        for column in (self.ts, self.temperature, self.humidity, self.sensor):
+            column[:keep] = column[self.end - keep:self.end]
+        self.start, self.end = 0, keep
+
+    def _append(self, rows):
+        """Append ``(epoch, temperature, humidity, sensor_id)`` rows, oldest first; caller holds the lock."""
+        n = len(rows)
+        if self.end + n > self.capacity:
+            self._make_room(n)
+            if n > self.capacity:
+                # More new rows than the window holds: keep the newest ones
+                self.counters['overflow'] += n - self.capacity
+                rows = rows[-self.capacity:]
+                n = len(rows)
+                self.covered_from = float(rows[0][0])
+
+        stop = self.end + n
+        self.ts[self.end:stop] = [r[0] for r in rows]
+        self.temperature[self.end:stop] = [r[1] for r in rows]
+        self.humidity[self.end:stop] = [r[2] for r in rows]
+        self.sensor[self.end:stop] = [self._code(r[3]) for r in rows]
+        self.end = stop
+        for epoch, temperature, humidity, sensor_id in rows:
+            self.latest_by_sensor[sensor_id] = (epoch, temperature, humidity)
+        self.counters['appended'] += n
+
+    def _insert(self, rows):
+        """Insert late rows (sorted, older than the newest row held) at their place; caller holds the lock."""
+        rows = rows[-self.capacity:]
+        n = len(rows)
+        self._make_room(n)
+        epochs = np.array([r[0] for r in rows], dtype=np.float64)
+        at = np.searchsorted(self.ts[self.start:self.end], epochs, side='right')
+        # Only the rows after the first insertion point move
+        first = self.start + int(at[0])
+        offsets = at - at[0]
+        for column, values in (
+            (self.ts, epochs),
+            (self.temperature, [r[1] for r in rows]),
+            (self.humidity, [r[2] for r in rows]),
+            (self.sensor, [self._code(r[3]) for r in rows]),
+        ):
+            column[first:self.end + n] = np.insert(column[first:self.end], offsets, values)
+        self.end += n
+        for epoch, temperature, humidity, sensor_id in rows:
+            latest = self.latest_by_sensor.get(sensor_id)
+            if latest is None or epoch >= latest[0]:
+                self.latest_by_sensor[sensor_id] = (epoch, temperature, humidity)
+        self.counters['out_of_order'] += n
+
+    def load(self, rows, since):
+        """Replace the content with ``rows`` (sorted), which hold every reading from epoch ``since``."""
+        with self._lock:
+            self.start = self.end = 0
+            self.latest_by_sensor = {}
+            self.covered_from = since
+            if rows:
+                self._append(rows)
+            self._evict(time.time())
+            self.counters['loads'] += 1
+
+    def _contains(self, epoch, sensor_id):
+        ts = self.ts[self.start:self.end]
+        lo = int(np.searchsorted(ts, epoch, side='left'))
+        hi = int(np.searchsorted(ts, epoch, side='right'))
+        code = self.codes.get(sensor_id)
+        return code is not None and bool(np.any(self.sensor[self.start + lo:self.start + hi] == code))
+
+    def extend(self, rows):
+        """Add notified rows; False if some are older than ``covered_from`` (reload needed).
+
+        Rows already held (committed while the window was being loaded, so
+        both read and notified) are skipped, rows older than the window are
+        dropped and late rows are inserted at their place.
+        """
+        rows = sorted(rows, key=lambda r: r[0])
+        with self._lock:
+            now = time.time()
+            cutoff = now - self.hours * 3600
+            rows = [r for r in rows if r[0] >= cutoff]
+            if self.end > self.start and rows:
+                newest = self.ts[self.end - 1]
+                rows = [r for r in rows if r[0] > newest or not self._contains(r[0], r[3])]
+                late = [r for r in rows if r[0] < newest]
+                if late:
+                    if self.covered_from is None or late[0][0] < self.covered_from:
+                        return False
+                    self._insert(late)
+                    rows = rows[len(late):]
+            if rows:
+                self._append(rows)
+            self._evict(now)
+            return True
+
+    def covers(self, start):
+        """True if every reading since datetime ``start`` is in the window."""
+        return self.ready and self.covered_from is not None and start.timestamp() >= self.covered_from
+
+    def latest(self, sensor_id=None):
+        """Latest reading as a dict shaped like the ``latest_reading`` row, or None."""
+        with self._lock:
+            if sensor_id is None:
+                if not self.latest_by_sensor:
+                    return None
+                sensor_id, row = max(self.latest_by_sensor.items(), key=lambda item: item[1][0])
+            else:
+                row = self.latest_by_sensor.get(sensor_id)
+                if row is None:
+                    return None
+            self.counters['hits'] += 1
+        epoch, temperature, humidity = row
+        return {
+            'temperature_c': temperature,
+            'humidity': humidity,
+            'timestamp': datetime.fromtimestamp(epoch),
+            'sensor_id': sensor_id,
+        }
+
+    def hourly(self, start, end, sensor_id=None):
+        """``[(hour, count, avg_temperature, avg_humidity)]`` for every hour of ``[start, end)`` with readings."""
+        hours = int((end - start).total_seconds() // 3600)
+        bounds = np.array([(start + timedelta(hours=i)).timestamp() for i in range(hours + 1)])
+        with self._lock:
+            ts = self.ts[self.start:self.end]
+            lo, hi = np.searchsorted(ts, bounds[[0, -1]], side='left')
+            ts = ts[lo:hi]
+            temperature = self.temperature[self.start + lo:self.start + hi].astype(np.float64)
+            humidity = self.humidity[self.start + lo:self.start + hi].astype(np.float64)
+            if sensor_id is not None:
+                code = self.codes.get(sensor_id)
+                mask = self.sensor[self.start + lo:self.start + hi] == code
+                ts, temperature, humidity = ts[mask], temperature[mask], humidity[mask]
+            self.counters['hits'] += 1
+
+        index = np.searchsorted(bounds, ts, side='right') - 1
+        counts = np.bincount(index, minlength=hours)
+        temperature_sums = np.bincount(index, weights=temperature, minlength=hours)
+        humidity_sums = np.bincount(index, weights=humidity, minlength=hours)
+        return [
+            (start + timedelta(hours=int(i)), int(counts[i]),
+             float(temperature_sums[i] / counts[i]), float(humidity_sums[i] / counts[i]))
+            for i in np.flatnonzero(counts)
+        ]
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self.counters)
+            snapshot['rows'] = self.end - self.start
+            snapshot['sensors'] = sorted(self.latest_by_sensor)
+        snapshot['capacity'] = self.capacity
+        snapshot['ready'] = self.ready
+        snapshot['covered_from'] = (
+            datetime.fromtimestamp(self.covered_from).isoformat() if self.covered_from else None
+        )
+        return snapshot
+
+
+class HotWindowListener:
+    """Keeps a HotWindow current through LISTEN/NOTIFY on a dedicated connection."""
+
+    def __init__(self, db_config, window, reconnect_delay=5, poll_timeout=30):
+        self.db_config = db_config
+        self.window = window
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+        self.running = True
+        self.notifications = 0
+
+    def _load(self, cur):
+        since = datetime.now() - timedelta(hours=self.window.hours)
+        cur.execute(
+            "SELECT timestamp, temperature_c, humidity, sensor_id FROM sensor_readings "
+            "WHERE timestamp >= %s ORDER BY timestamp",
+            (since,),
+        )
+        # Same rounding as the notification payloads, so rows read and notified compare equal
+        rows = [(round(ts.timestamp(), 3), t, h, sensor_id) for ts, t, h, sensor_id in cur.fetchall()]
+        self.window.load(rows, since.timestamp())
+        logger.info(f"Hot window loaded with {len(rows)} readings since {since:%Y-%m-%d %H:%M}")
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            **self.db_config,
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+        )
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            # LISTEN before loading: rows committed in between arrive as notifications
+            cur.execute(f"LISTEN {SENSOR_READINGS_CHANNEL}")
+            self._load(cur)
+        self.window.ready = True
+        return conn
+
+    def _handle(self, conn, notify):
+        self.notifications += 1
+        try:
+            rows = [tuple(r) for r in json.loads(notify.payload)]
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Invalid reading notification: {e}")
+            return
+        if not self.window.extend(rows):
+            # Rows older than the readings the window holds (e.g. after an overflow)
+            with conn.cursor() as cur:
+                self._load(cur)
+
+    def run(self):
+        while self.running:
+            conn = None
+            try:
+                conn = self._connect()
+                while self.running:
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn, conn.notifies.pop(0))
+            except psycopg2.Error as e:
+                logger.error(f"Hot window LISTEN connection lost: {e}, retrying in {self.reconnect_delay}s")
+                time.sleep(self.reconnect_delay)
+            except Exception as e:
+                logger.error(f"Hot window listener failed: {e}, reloading in {self.reconnect_delay}s")
+                time.sleep(self.reconnect_delay)
+            finally:
+                self.window.ready = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+
+    def stop(self):
+        self.running = False
+
+
+_window = None
+_window_lock = threading.Lock()
+
+
+def get_hot_window(db_config):
+    """Process-wide HotWindow, started with its listener thread on first use; None if disabled."""
+    global _window
+    if not HOT_WINDOW_ENABLED:
+        return None
+    with _window_lock:
+        if _window is None:
+            _window = HotWindow()
+            listener = HotWindowListener(db_config, _window)
+            threading.Thread(target=listener.run, name="hot-window", daemon=True).start()
+        return _window
@@ -0,0 +1,121 @@
+import logging
+import math
+from datetime import datetime
+
+from client.PostgresClient import PostgresHandler
+from config.settings import DEFAULT_SENSOR_ID, INGEST_HTTP_MAX_POINTS, INGEST_HTTP_MAX_ERRORS
+from models.partitions import partition_horizon
+from utils.line_protocol import ParseError, iter_points
+
+logger = logging.getLogger(__name__)
+
+AIR_QUALITY_FIELDS = ('smoke', 'lpg', 'methane', 'hydrogen', 'air_quality_index', 'air_quality_description')
+
+
+class IngestService:
+    """Routes parsed points to their tables and writes a whole request in one transaction.
+
+    * ``sensor_readings`` points (fields ``temperature`` and ``humidity``,
+      tag ``sensor_id`` or ``device``) go to ``sensor_readings`` and its
+      hourly rollup;
+    * ``air_quality`` points (the fields of the MQ-2 payload) go to
+      ``air_quality``;
+    * every numeric field of any other measurement becomes one row of
+      ``device_metrics``, tagged with the ``device`` (or ``device_id``) tag.
+    """
+
+    def __init__(self, db_config, max_points=INGEST_HTTP_MAX_POINTS, max_errors=INGEST_HTTP_MAX_ERRORS):
+        self.db = PostgresHandler(db_config)
+        self.max_points = max_points
+        self.max_errors = max_errors
+
+    @staticmethod
+    def _device(tags, default='unknown'):
+        return tags.get('device') or tags.get('device_id') or default
+
+    def _route(self, point, readings, air_quality_rows, metric_rows, horizon):
+        """Append the rows of ``point`` to the right batch; raise ParseError if it cannot be stored."""
+        fields = point.fields
+        if point.timestamp >= horizon:
+            # Would land in the default partition and block its month's partition
+            raise ParseError(f"timestamp {point.timestamp.isoformat()} is beyond {horizon.date().isoformat()}")
+
+        if point.measurement == 'sensor_readings':
+            try:
+                temperature = float(fields['temperature'])
+                humidity = float(fields['humidity'])
+            except (KeyError, TypeError, ValueError):
+                raise ParseError("sensor_readings needs numeric temperature and humidity")
+            if not (math.isfinite(temperature) and math.isfinite(humidity)):
+                raise ParseError("sensor_readings temperature and humidity must be finite")
+            sensor_id = point.tags.get('sensor_id') or self._device(point.tags, DEFAULT_SENSOR_ID)
+            readings.append((temperature, humidity, point.timestamp, sensor_id))
+            return 1
+
+        if point.measurement == 'air_quality':
+            missing = [f for f in AIR_QUALITY_FIELDS if f not in fields]
+            if missing:
+                raise ParseError(f"air_quality is missing {', '.join(missing)}")
+            try:
+                values = [float(fields[f]) for f in AIR_QUALITY_FIELDS[:-1]]
+            except (TypeError, ValueError):
+                raise ParseError("air_quality values must be numeric")
+            if not all(math.isfinite(v) for v in values):
+                raise ParseError("air_quality values must be finite")
+            description = str(fields['air_quality_description']).strip()
+            if not description:
+                raise ParseError("air_quality_description is empty")
+            air_quality_rows.append((*values, description, point.timestamp))
+            return 1
+
+        device_id = self._device(point.tags)
+        added = 0
+        for field, value in fields.items():
+            if isinstance(value, str) or not math.isfinite(value):
+                continue
+            metric_rows.append((point.timestamp, device_id, point.measurement, field, value))
+            added += 1
+        if not added:
+            raise ParseError("no numeric fields")
+        return added
+
+    def ingest(self, stream, fmt='line', precision='ns'):
+        """Parse ``stream`` and store every valid point; returns a summary dict.
+
+        Invalid lines are skipped and reported (up to ``max_errors``); the
+        valid ones are written with one multi-row INSERT or COPY per table,
+        all in a single transaction.
+        """
+        readings, air_quality_rows, metric_rows = [], [], []
+        points = rejected = 0
+        errors = []
+        truncated = False
+        horizon = datetime.combine(partition_horizon(), datetime.min.time())
+
+        for line_number, parsed in iter_points(stream, fmt, precision):
+            if points >= self.max_points:
+                truncated = True
+                break
+            try:
+                if isinstance(parsed, ParseError):
+                    raise parsed
+                self._route(parsed, readings, air_quality_rows, metric_rows, horizon)
+                points += 1
+            except ParseError as e:
+                rejected += 1
+                if len(errors) < self.max_errors:
+                    errors.append(f"line {line_number}: {e}")
+
+        written = self.db.save_ingest_batch(readings, air_quality_rows, metric_rows) if points else 0
+        return {
+            'points': points,
+            'rejected': rejected,
+            'rows_written': written,
+            'tables': {
+                'sensor_readings': len(readings),
+                'air_quality': len(air_quality_rows),
+                'device_metrics': len(metric_rows),
+            },
+            'truncated': truncated,
+            'errors': errors or None,
+        }
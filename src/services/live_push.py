@@ -0,0 +1,247 @@
+"""
+Socket.IO push of new sensor and air quality data to the dashboards.
+
+The writers publish every committed row on ``SENSOR_READINGS_CHANNEL`` and
+``AIR_QUALITY_CHANNEL`` (see ``client.PostgresClient.notify_rows``). The
+push service listens on both channels and, for each burst of
+notifications, emits to the connected dashboards:
+
+* ``readings``: the new rows;
+* ``hourly``: the aggregates of the hours those rows fall in, read once
+  per burst (from ``sensor_readings_hourly`` for sensors, from
+  ``air_quality`` for air quality) and shared by every client.
+
+Namespaces are ``/sensors`` and ``/air-quality``. A ``/sensors`` client
+connecting with ``?sensor_id=`` only gets that sensor; otherwise it gets
+every reading and the hourly averages across sensors, like ``/api_sensors``.
+When no dashboard is connected, nothing is aggregated.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import psycopg2
+import psycopg2.extras
+from flask import request
+from flask_socketio import join_room
+
+from config.settings import SENSOR_READINGS_CHANNEL, AIR_QUALITY_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+SENSORS_NAMESPACE = '/sensors'
+AIR_QUALITY_NAMESPACE = '/air-quality'
+
+# Room of the /sensors clients without a sensor_id filter
+ALL_SENSORS_ROOM = 'all'
+
+AIR_QUALITY_FIELDS = ('smoke', 'lpg', 'methane', 'hydrogen', 'air_quality_index', 'air_quality_description')
+
+
+def _sensor_room(sensor_id):
+    return f"sensor:{sensor_id}" if sensor_id else ALL_SENSORS_ROOM
+
+
+def _hour(epoch):
+    return datetime.fromtimestamp(epoch).replace(minute=0, second=0, microsecond=0)
+
+
+def _average(total, count):
+    return round(float(total) / count, 2) if total is not None and count else None
+
+
+class LivePushService:
+    """Pushes committed readings and their hourly aggregates over Socket.IO."""
+
+    def __init__(self, db_config, socketio, reconnect_delay=5, poll_timeout=30):
+        self.db_config = db_config
+        self.socketio = socketio
+        self.reconnect_delay = reconnect_delay
+        self.poll_timeout = poll_timeout
+        self.running = True
+        self.clients = {SENSORS_NAMESPACE: 0, AIR_QUALITY_NAMESPACE: 0}
+        self._lock = threading.Lock()
+        self.setup_socketio_handlers()
+
+    def _count(self, namespace, delta):
+        with self._lock:
+            self.clients[namespace] = max(0, self.clients[namespace] + delta)
+
+    def setup_socketio_handlers(self):
+        """Setup WebSocket event handlers"""
+
+        @self.socketio.on('connect', namespace=SENSORS_NAMESPACE)
+        def handle_sensors_connect():
+            join_room(_sensor_room(request.args.get('sensor_id')))
+            self._count(SENSORS_NAMESPACE, 1)
+
+        @self.socketio.on('disconnect', namespace=SENSORS_NAMESPACE)
+        def handle_sensors_disconnect():
+            self._count(SENSORS_NAMESPACE, -1)
+
+        @self.socketio.on('connect', namespace=AIR_QUALITY_NAMESPACE)
+        def handle_air_quality_connect():
+            self._count(AIR_QUALITY_NAMESPACE, 1)
+
+        @self.socketio.on('disconnect', namespace=AIR_QUALITY_NAMESPACE)
+        def handle_air_quality_disconnect():
+            self._count(AIR_QUALITY_NAMESPACE, -1)
+
+    # ---- sensors -------------------------------------------------------
+
+    def _push_readings(self, conn, rows):
+        readings = [
+            {'sensor_id': sensor_id, 'temperature_c': temperature, 'humidity': humidity,
+             'timestamp': datetime.fromtimestamp(epoch).isoformat()}
+            for epoch, temperature, humidity, sensor_id in sorted(rows, key=lambda r: r[0])
+        ]
+        by_sensor = defaultdict(list)
+        for reading in readings:
+            by_sensor[reading['sensor_id']].append(reading)
+        self.socketio.emit('readings', {'readings': readings}, namespace=SENSORS_NAMESPACE, to=ALL_SENSORS_ROOM)
+        for sensor_id, sensor_readings in by_sensor.items():
+            self.socketio.emit('readings', {'readings': sensor_readings},
+                               namespace=SENSORS_NAMESPACE, to=_sensor_room(sensor_id))
+
+        hours = sorted({_hour(r[0]) for r in rows})
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute(
+                "SELECT sensor_id, hour, temperature_sum, humidity_sum, reading_count "
+                "FROM sensor_readings_hourly WHERE hour = ANY(%s) ORDER BY hour",
+                (hours,),
+            )
+            rollups = cur.fetchall()
+
+        totals = {}
+        per_sensor = defaultdict(list)
+        for r in rollups:
+            total = totals.setdefault(r['hour'], [0.0, 0.0, 0, 0])
+            total[0] += r['temperature_sum'] or 0
+            total[2] += r['reading_count']
+            if r['humidity_sum'] is not None:
+                total[1] += r['humidity_sum']
+                total[3] += r['reading_count']
+            if r['sensor_id'] in by_sensor:
+                per_sensor[r['sensor_id']].append(self._hourly_entry(
+                    r['hour'], r['sensor_id'], r['temperature_sum'], r['humidity_sum'], r['reading_count']))
+        hourly = [self._hourly_entry(hour, None, *total) for hour, total in totals.items()]
+        self.socketio.emit('hourly', {'hourly': hourly}, namespace=SENSORS_NAMESPACE, to=ALL_SENSORS_ROOM)
+        for sensor_id, entries in per_sensor.items():
+            self.socketio.emit('hourly', {'hourly': entries}, namespace=SENSORS_NAMESPACE, to=_sensor_room(sensor_id))
+
+    @staticmethod
+    def _hourly_entry(hour, sensor_id, temperature_sum, humidity_sum, count, humidity_count=None):
+        return {
+            'hour': hour.isoformat(),
+            'hour_of_day': hour.hour,
+            'sensor_id': sensor_id,
+            'avg_temperature': _average(temperature_sum, count),
+            'avg_humidity': _average(humidity_sum, count if humidity_count is None else humidity_count),
+            'count': int(count),
+        }
+
+    # ---- air quality ---------------------------------------------------
+
+    def _push_air_quality(self, conn, rows):
+        rows = sorted(rows, key=lambda r: r[0])
+        readings = [
+            dict(zip(AIR_QUALITY_FIELDS, row[1:]), timestamp=datetime.fromtimestamp(row[0]).isoformat())
+            for row in rows
+        ]
+        self.socketio.emit('readings', {'readings': readings}, namespace=AIR_QUALITY_NAMESPACE)
+
+        start = _hour(rows[0][0])
+        end = _hour(rows[-1][0]) + timedelta(hours=1)
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+            cur.execute("""
+                SELECT
+                    DATE_TRUNC('hour', timestamp) AS hour,
+                    ROUND(AVG(air_quality_index)::numeric, 2) AS avg_air_quality_index,
+                    COUNT(*) AS measurement_count,
+                    MIN(air_quality_index) AS min_aqi,
+                    MAX(air_quality_index) AS max_aqi,
+                    ROUND(AVG(smoke)::numeric, 2) AS avg_smoke,
+                    ROUND(AVG(lpg)::numeric, 2) AS avg_lpg,
+                    ROUND(AVG(methane)::numeric, 2) AS avg_methane,
+                    ROUND(AVG(hydrogen)::numeric, 2) AS avg_hydrogen
+                FROM air_quality
+                WHERE timestamp >= %s AND timestamp < %s
+                GROUP BY 1
+                ORDER BY 1;
+            """, (start, end))
+            aggregates = cur.fetchall()
+
+        hourly = []
+        for r in aggregates:
+            entry = {key: float(r[key]) for key in r.keys() if key not in ('hour', 'measurement_count')}
+            entry.update(hour=r['hour'].isoformat(), hour_of_day=r['hour'].hour,
+                         measurement_count=int(r['measurement_count']))
+            hourly.append(entry)
+        self.socketio.emit('hourly', {'hourly': hourly}, namespace=AIR_QUALITY_NAMESPACE)
+
+    # ---- listener ------------------------------------------------------
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            **self.db_config,
+            keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+        )
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {SENSOR_READINGS_CHANNEL}")
+            cur.execute(f"LISTEN {AIR_QUALITY_CHANNEL}")
+        return conn
+
+    def _dispatch(self, conn, notifies):
+        """Push a burst of notifications: one ``readings`` and one ``hourly`` event per channel."""
+        rows = defaultdict(list)
+        for notify in notifies:
+            try:
+                rows[notify.channel].extend(json.loads(notify.payload))
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Invalid notification on {notify.channel}: {e}")
+
+        with self._lock:
+            clients = dict(self.clients)
+        if rows[SENSOR_READINGS_CHANNEL] and clients[SENSORS_NAMESPACE]:
+            self._push_readings(conn, rows[SENSOR_READINGS_CHANNEL])
+        if rows[AIR_QUALITY_CHANNEL] and clients[AIR_QUALITY_NAMESPACE]:
+            self._push_air_quality(conn, rows[AIR_QUALITY_CHANNEL])
+
+    def run(self):
+        while self.running:
+            conn = None
+            try:
+                conn = self._connect()
+                while self.running:
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    notifies, conn.notifies[:] = list(conn.notifies), []
+                    if notifies:
+                        try:
+                            self._dispatch(conn, notifies)
+                        except psycopg2.Error:
+                            raise
+                        except Exception as e:
+                            logger.error(f"Live push failed: {e}")
+            except psycopg2.Error as e:
+                logger.error(f"Live push LISTEN connection lost: {e}, retrying in {self.reconnect_delay}s")
+                time.sleep(self.reconnect_delay)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+
+    def start(self):
+        threading.Thread(target=self.run, name="live-push", daemon=True).start()
+
+    def stop(self):
+        self.running = False
@@ -5,6 +5,7 @@ from flask_socketio import SocketIO, emit, disconnect
 from flask import request
 import psycopg2
 import psycopg2.extras
+from models.database import get_db_connection
 
 class PicoLogService:
     """Service to manage Raspberry Pi Pico W logs via WebSocket"""
@@ -98,28 +99,74 @@ class PicoLogService:
             self.logger.error(f"Error processing Pico log: {str(e)}")
             return None
 
+    def _log_row(self, log_entry):
+        """Convert a processed log entry into the tuple inserted into pico_logs."""
+        timestamp = datetime.fromisoformat(log_entry['timestamp'].replace('Z', '+00:00'))
+        created_at = datetime.fromisoformat(log_entry['created_at'].replace('Z', '+00:00'))
+        return (
+            timestamp,
+            log_entry['level'],
+            log_entry['message'],
+            json.dumps(log_entry['sensor_data']),
+            log_entry['device_id'],
+            created_at
+        )
+
+    def save_logs_batch(self, log_entries):
+        """Save many processed log entries with a single multi-row INSERT.
+
+        Entries whose timestamp cannot be parsed are skipped. Returns
+        ``(saved_entries, errors)``; saved entries get their database id.
+        """
+        rows, saved, errors = [], [], []
+        for i, log_entry in enumerate(log_entries):
+            try:
+                rows.append(self._log_row(log_entry))
+                saved.append(log_entry)
+            except (ValueError, TypeError, AttributeError) as e:
+                errors.append((i, f"Invalid timestamp: {e}"))
+        if not rows:
+            return saved, errors
+
+        conn = None
+        cur = None
+        try:
+            conn = get_db_connection(self.db_config)
+            cur = conn.cursor()
+            ids = psycopg2.extras.execute_values(
+                cur,
+                """
+                INSERT INTO pico_logs (timestamp, level, message, sensor_data, device_id, created_at)
+                VALUES %s
+                RETURNING id;
+                """,
+                rows,
+                page_size=len(rows),
+                fetch=True,
+            )
+            conn.commit()
+            for log_entry, (log_id,) in zip(saved, ids):
+                log_entry['id'] = log_id
+            return saved, errors
+        except Exception as e:
+            if conn:
+                conn.rollback()
+            self.logger.error(f"Error saving log batch to database: {str(e)}")
+            raise
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                conn.close()
+
     def save_log_to_db(self, log_entry):
         """Save log entry to database"""
         conn = None
         cur = None
         try:
-            conn = psycopg2.connect(**self.db_config)
+            conn = get_db_connection(self.db_config)
             cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             
-            # Create table if it doesn't exist
-            create_table_query = """
-                CREATE TABLE IF NOT EXISTS pico_logs (
-                    id SERIAL PRIMARY KEY,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    level VARCHAR(10) NOT NULL,
-                    message TEXT NOT NULL,
-                    sensor_data JSONB,
-                    device_id VARCHAR(50) NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                );
-            """
-            cur.execute(create_table_query)
-            
             # Insert log entry
             insert_query = """
                 INSERT INTO pico_logs (timestamp, level, message, sensor_data, device_id, created_at)
@@ -127,33 +174,12 @@ class PicoLogService:
                 RETURNING id;
             """
             
-            timestamp = datetime.fromisoformat(log_entry['timestamp'].replace('Z', '+00:00'))
-            created_at = datetime.fromisoformat(log_entry['created_at'].replace('Z', '+00:00'))
-            
-            cur.execute(insert_query, (
-                timestamp,
-                log_entry['level'],
-                log_entry['message'],
-                json.dumps(log_entry['sensor_data']),
-                log_entry['device_id'],
-                created_at
-            ))
+            cur.execute(insert_query, self._log_row(log_entry))
             
             log_id = cur.fetchone()[0]
             log_entry['id'] = log_id
             
-            conn.commit()
-            
-            # Clean up old logs (keep only last 1000 entries)
-            cleanup_query = """
-                DELETE FROM pico_logs
-                WHERE id NOT IN (
-                    SELECT id FROM pico_logs
-                    ORDER BY created_at DESC
-                    LIMIT 1000
-                );
-            """
-            cur.execute(cleanup_query)
+            # Old logs are removed by dropping monthly partitions (PICO_LOGS_RETENTION_DAYS)
             conn.commit()
             
         except Exception as e:
@@ -172,7 +198,7 @@ class PicoLogService:
         conn = None
         cur = None
         try:
-            conn = psycopg2.connect(**self.db_config)
+            conn = get_db_connection(self.db_config)
             cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             
             query = """
@@ -213,7 +239,7 @@ class PicoLogService:
         conn = None
         cur = None
         try:
-            conn = psycopg2.connect(**self.db_config)
+            conn = get_db_connection(self.db_config)
             cur = conn.cursor()
             
             cur.execute("DELETE FROM pico_logs;")
@@ -235,7 +261,7 @@ class PicoLogService:
         conn = None
         cur = None
         try:
-            conn = psycopg2.connect(**self.db_config)
+            conn = get_db_connection(self.db_config)
             cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             
             # Get log count by level
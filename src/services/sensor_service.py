@@ -1,10 +1,15 @@
 import psycopg2
 import psycopg2.extras
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from models.database import BaseService
 import logging
 from client.PostgresClient import PostgresHandler
-from config.settings import get_config
+from config.settings import get_config, THERMOSTAT_SENSOR_ID
+from utils.time_windows import day_window, month_window, year_window
+from utils.query_cache import cached_period
+from utils.downsample import lttb_rows
+from services.hot_window import get_hot_window
+from models.daily_summary import read_days, to_heatmap
 import requests
 
 config = get_config()  # senza argomenti
@@ -19,197 +24,258 @@ class SensorService(BaseService):
         self.db = PostgresHandler(db_config)
         self.SHELLY_IP = "192.168.178.165"
         self.TEMPERATURE_HYSTERESIS = 0.3  # Isteresi di 0.3°C per evitare oscillazioni
+        self.hot_window = get_hot_window(db_config)
+
+    @staticmethod
+    def _sensor_filter(sensor_id):
+        """SQL condition and parameters restricting a rollup query to one sensor (all if ``None``)."""
+        if sensor_id is None:
+            return "", ()
+        return " AND sensor_id = %s", (sensor_id,)
+
+    def get_sensor_ids(self):
+        """Lists the sensors that have stored readings"""
+        rows = self._execute_query("SELECT DISTINCT sensor_id FROM sensor_readings_hourly ORDER BY sensor_id;")
+        return [r['sensor_id'] for r in rows]
+
+    def _window_today(self, sensor_id):
+        """Today's hourly averages from the hot window, or None when it does not cover today."""
+        start, end = day_window()
+        if self.hot_window is None or not self.hot_window.covers(start):
+            return None
+        return self.hot_window.hourly(start, end, sensor_id)
 
-
-    def get_hourly_today(self):
+    def get_hourly_today(self, sensor_id=None):
         """Gets hourly data for today"""
-        query = """
+        hours = self._window_today(sensor_id)
+        if hours is not None:
+            return [
+                {'hour': hour.hour, 'avg_temperature': temperature, 'humidity': humidity}
+                for hour, _, temperature, humidity in hours
+            ]
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(HOUR FROM timestamp) AS hour,
-                AVG(temperature_c) AS avg_temperature,
-                AVG(humidity) AS humidity 
-            FROM sensor_readings
-            WHERE DATE(timestamp) = CURRENT_DATE
+                EXTRACT(HOUR FROM hour) AS hour,
+                SUM(temperature_sum) / SUM(reading_count) AS avg_temperature,
+                SUM(humidity_sum) / SUM(reading_count) AS humidity
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY hour
             ORDER BY hour ASC;
         """
-        return self._execute_query(query)
+        return self._execute_query(query, day_window() + params)
 
-    def get_latest(self):
+    def get_latest(self, sensor_id=None):
         """Gets the latest sensor reading"""
-        query = "SELECT temperature_c, humidity, timestamp FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
-        return self._execute_query(query, fetch_one=True, fetch_all=False)
+        if self.hot_window is not None and self.hot_window.ready:
+            row = self.hot_window.latest(sensor_id)
+            if row is not None:
+                return row
+        if sensor_id is None:
+            return self.db.fetchone_prepared('latest_reading', cursor_factory=psycopg2.extras.DictCursor)
+        return self.db.fetchone_prepared(
+            'latest_reading_by_sensor', (sensor_id,), cursor_factory=psycopg2.extras.DictCursor
+        )
+
+    def _year_heatmap(self, metric, year, sensor_id, stat):
+        """Month x day matrix of one daily statistic, read from the day-level summary"""
+        conn = self._connect()
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
+                rows = read_days(cur, metric, *year_window(year), source=sensor_id)
+        finally:
+            conn.close()
+        return to_heatmap(rows, stat)
 
-    def get_monthly_temperature_data(self, year=None):
-        """Gets monthly temperature data for a year"""
+    @cached_period('sensor', 'year')
+    def get_monthly_temperature_data(self, year=None, sensor_id=None, stat='avg'):
+        """Gets the daily temperature of a year as {month: {day: value}}"""
         if year is None:
             year = datetime.now().year
-        query = """
-            SELECT
-                EXTRACT(MONTH FROM timestamp) AS month,
-                EXTRACT(DAY FROM timestamp) AS day,
-                ROUND(AVG(temperature_c)::numeric, 2) AS avg_temperature
-            FROM sensor_readings
-            WHERE EXTRACT(YEAR FROM timestamp) = %s
-            GROUP BY month, day
-            ORDER BY month, day;
-        """
-        rows = self._execute_query(query, (year,))
-        monthly = {}
-        for row in rows:
-            m = int(row['month'])
-            d = int(row['day'])
-            t = float(row['avg_temperature'])
-            monthly.setdefault(m, {})[d] = t
-        return monthly
-
-    def get_monthly_average_temperature(self, year=None):
+        return self._year_heatmap('temperature', year, sensor_id, stat)
+
+    @cached_period('sensor', 'year')
+    def get_monthly_humidity_data(self, year=None, sensor_id=None, stat='avg'):
+        """Gets the daily humidity of a year as {month: {day: value}}"""
+        if year is None:
+            year = datetime.now().year
+        return self._year_heatmap('humidity', year, sensor_id, stat)
+
+    @cached_period('sensor', 'year')
+    def get_monthly_average_temperature(self, year=None, sensor_id=None):
         """Gets average monthly temperature for a year"""
         if year is None:
             year = datetime.now().year
-        query = """
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(MONTH FROM timestamp) AS month,
-                ROUND(AVG(temperature_c)::numeric, 2) AS avg_temperature
-            FROM sensor_readings
-            WHERE EXTRACT(YEAR FROM timestamp) = %s
+                EXTRACT(MONTH FROM hour) AS month,
+                ROUND((SUM(temperature_sum) / SUM(reading_count))::numeric, 2) AS avg_temperature
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY month
             ORDER BY month;
         """
-        rows = self._execute_query(query, (year,))
+        rows = self._execute_query(query, year_window(year) + params)
         return {int(r['month']): float(r['avg_temperature']) for r in rows}
 
-    def get_daily_for_month(self, month, year=None):
+    @cached_period('sensor', 'month')
+    def get_daily_for_month(self, month, year=None, sensor_id=None):
         """Gets daily data for a specific month"""
         if year is None:
             year = datetime.now().year
-        query = """
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(DAY FROM timestamp) AS day,
-                ROUND(AVG(temperature_c)::numeric, 2) AS avg_temperature
-            FROM sensor_readings
-            WHERE EXTRACT(MONTH FROM timestamp) = %s
-            AND EXTRACT(YEAR FROM timestamp) = %s
+                EXTRACT(DAY FROM hour) AS day,
+                ROUND((SUM(temperature_sum) / SUM(reading_count))::numeric, 2) AS avg_temperature
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY day
             ORDER BY day;
         """
-        rows = self._execute_query(query, (month, year))
+        rows = self._execute_query(query, month_window(year, month) + params)
         return {int(r['day']): float(r['avg_temperature']) for r in rows}
 
-    def get_today_hourly_temperature(self):
+    def get_today_hourly_temperature(self, sensor_id=None):
         """Gets hourly temperature data for today"""
-        query = """
+        hours = self._window_today(sensor_id)
+        if hours is not None:
+            return {hour.hour: round(temperature, 2) for hour, _, temperature, _ in hours}
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(HOUR FROM timestamp) AS hour,
-                ROUND(AVG(temperature_c)::numeric, 2) AS avg_temperature
-            FROM sensor_readings
-            WHERE DATE(timestamp) = CURRENT_DATE
+                EXTRACT(HOUR FROM hour) AS hour,
+                ROUND((SUM(temperature_sum) / SUM(reading_count))::numeric, 2) AS avg_temperature
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY hour
             ORDER BY hour;
         """
-        rows = self._execute_query(query)
+        rows = self._execute_query(query, day_window() + params)
         return {int(r['hour']): float(r['avg_temperature']) for r in rows}
 
-    def get_today_hourly_humidity(self):
+    def get_today_hourly_humidity(self, sensor_id=None):
         """Gets hourly humidity data for today"""
-        query = """
+        hours = self._window_today(sensor_id)
+        if hours is not None:
+            return {hour.hour: round(humidity, 2) for hour, _, _, humidity in hours if humidity is not None}
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(HOUR FROM timestamp) AS hour,
-                ROUND(AVG(humidity)::numeric, 2) AS avg_humidity
-            FROM sensor_readings
-            WHERE DATE(timestamp) = CURRENT_DATE
+                EXTRACT(HOUR FROM hour) AS hour,
+                ROUND((SUM(humidity_sum) / SUM(reading_count))::numeric, 2) AS avg_humidity
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY hour
             ORDER BY hour;
         """
-        rows = self._execute_query(query)
+        rows = self._execute_query(query, day_window() + params)
         return {int(r['hour']): float(r['avg_humidity']) for r in rows}
 
-    def get_average_temperatures(self, start_dt, end_dt):
-        """Gets average temperatures in a date range"""
-        query = """
-            SELECT DATE_TRUNC('hour', timestamp) AS hour, 
-                   ROUND(AVG(temperature_c)::numeric, 2) AS avg_temp
-            FROM sensor_readings
-            WHERE timestamp BETWEEN %s AND %s
+    def get_average_temperatures(self, start_dt, end_dt, sensor_id=None, max_points=None):
+        """Gets average temperatures in a date range, LTTB-downsampled to ``max_points`` if given"""
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
+            SELECT hour,
+                   ROUND((SUM(temperature_sum) / SUM(reading_count))::numeric, 2) AS avg_temp
+            FROM sensor_readings_hourly
+            WHERE hour BETWEEN DATE_TRUNC('hour', %s::timestamp) AND %s{condition}
             GROUP BY hour
             ORDER BY hour;
         """
-        rows = self._execute_query(query, (start_dt, end_dt))
+        rows = lttb_rows(self._execute_query(query, (start_dt, end_dt) + params), max_points, 'hour', 'avg_temp')
         return [{"hour": r['hour'].isoformat(), "avg_temperature": float(r['avg_temp'])} for r in rows]
 
-    def get_average_humidity(self, start_dt, end_dt):
-        """Gets average humidity in a date range"""
-        query = """
-            SELECT DATE_TRUNC('hour', timestamp) AS hour, 
-                   ROUND(AVG(humidity)::numeric, 2) AS avg_humidity
-            FROM sensor_readings
-            WHERE timestamp BETWEEN %s AND %s
+    def get_average_humidity(self, start_dt, end_dt, sensor_id=None, max_points=None):
+        """Gets average humidity in a date range, LTTB-downsampled to ``max_points`` if given"""
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
+            SELECT hour,
+                   ROUND((SUM(humidity_sum) / SUM(reading_count))::numeric, 2) AS avg_humidity
+            FROM sensor_readings_hourly
+            WHERE hour BETWEEN DATE_TRUNC('hour', %s::timestamp) AND %s{condition}
             GROUP BY hour
             ORDER BY hour;
         """
-        rows = self._execute_query(query, (start_dt, end_dt))
+        rows = lttb_rows(self._execute_query(query, (start_dt, end_dt) + params), max_points, 'hour', 'avg_humidity')
         return [{"hour": r['hour'].isoformat(), "avg_humidity": float(r['avg_humidity'])} for r in rows]
 
-    def get_last_temperature(self):
+    def get_last_temperature(self, sensor_id=None):
         """Gets the last recorded temperature"""
-        query = "SELECT temperature_c, humidity, timestamp FROM sensor_readings ORDER BY timestamp DESC LIMIT 1"
-        r = self._execute_query(query, fetch_one=True, fetch_all=False)
+        r = self.get_latest(sensor_id)
         if r:
             return {
                 'temperature_c': float(r['temperature_c']),
                 'humidity': float(r['humidity']) if r['humidity'] else None,
-                'timestamp': r['timestamp'].isoformat()
+                'timestamp': r['timestamp'].isoformat(),
+                'sensor_id': r['sensor_id'],
             }
         return None
 
-    def get_daily_humidity_for_month(self, month, year=None):
+    def readings_version(self, sensor_id=None):
+        """Version of today's readings (date and newest timestamp), for conditional GETs"""
+        latest = self.get_latest(sensor_id)
+        return date.today(), latest['timestamp'] if latest else None
+
+    def thermostat_version(self):
+        """Version of the full thermostat status: last change of each setting and of the current temperature"""
+        row = self._execute_query("""
+            SELECT
+                (SELECT MAX(updated_at) FROM target_temperature) AS target,
+                (SELECT MAX(updated_at) FROM thermostat_status) AS enabled,
+                (SELECT MAX(updated_at) FROM boiler_status) AS boiler;
+        """, fetch_one=True)
+        latest = self.get_latest(THERMOSTAT_SENSOR_ID)
+        return row['target'], row['enabled'], row['boiler'], latest['timestamp'] if latest else None
+
+    def last_temp(self, sensor_id=None):
+        """Last temperature and its timestamp as ``{"last_entry": (temperature, timestamp)}``"""
+        r = self.get_latest(sensor_id)
+        return {"last_entry": (r['temperature_c'], r['timestamp']) if r else None}
+
+    def get_current_temperature(self):
+        """Current temperature of the thermostat sensor (``THERMOSTAT_SENSOR_ID``)"""
+        if self.hot_window is not None and self.hot_window.ready:
+            row = self.hot_window.latest(THERMOSTAT_SENSOR_ID)
+            if row is not None:
+                return float(row['temperature_c'])
+        return self.db.get_current_temperature()
+
+    @cached_period('sensor', 'month')
+    def get_daily_humidity_for_month(self, month, year=None, sensor_id=None):
         """Gets daily humidity data for a specific month"""
         if year is None:
             year = datetime.now().year
-        query = """
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(DAY FROM timestamp) AS day,
-                ROUND(AVG(humidity)::numeric, 2) AS avg_humidity
-            FROM sensor_readings
-            WHERE EXTRACT(MONTH FROM timestamp) = %s
-            AND EXTRACT(YEAR FROM timestamp) = %s
+                EXTRACT(DAY FROM hour) AS day,
+                ROUND((SUM(humidity_sum) / SUM(reading_count))::numeric, 2) AS avg_humidity
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY day
             ORDER BY day;
         """
-        conn = None
-        cur = None
-        try:
-            conn = self._connect()
-            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cur.execute(query, (month, year))
-            rows = cur.fetchall()
-            return {int(r['day']): float(r['avg_humidity']) for r in rows}
-        finally:
-            if cur: cur.close()
-            if conn: conn.close()
+        rows = self._execute_query(query, month_window(year, month) + params)
+        return {int(r['day']): float(r['avg_humidity']) for r in rows}
 
-    def get_monthly_average_humidity(self, year):
+    @cached_period('sensor', 'year')
+    def get_monthly_average_humidity(self, year, sensor_id=None):
         """Gets average monthly humidity for a year"""
-        query = """
+        condition, params = self._sensor_filter(sensor_id)
+        query = f"""
             SELECT
-                EXTRACT(MONTH FROM timestamp) AS month,
-                ROUND(AVG(humidity)::numeric, 2) AS avg_humidity
-            FROM sensor_readings
-            WHERE EXTRACT(YEAR FROM timestamp) = %s
+                EXTRACT(MONTH FROM hour) AS month,
+                ROUND((SUM(humidity_sum) / SUM(reading_count))::numeric, 2) AS avg_humidity
+            FROM sensor_readings_hourly
+            WHERE hour >= %s AND hour < %s{condition}
             GROUP BY month
             ORDER BY month;
         """
-        conn = None
-        cur = None
-        try:
-            conn = self._connect()
-            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-            cur.execute(query, (year,))
-            rows = cur.fetchall()
-            return {int(r['month']): float(r['avg_humidity']) for r in rows}
-        finally:
-            if cur: cur.close()
-            if conn: conn.close()
+        rows = self._execute_query(query, year_window(year) + params)
+        return {int(r['month']): float(r['avg_humidity']) for r in rows}
 
 
     def set_target_temperature(self, value):
@@ -385,7 +451,7 @@ class SensorService(BaseService):
                 }
             
             # Ottieni temperatura corrente e target
-            current_temp = self.db.get_current_temperature()
+            current_temp = self.get_current_temperature()
             target_temp = self.get_target_temperature()
             
             if current_temp is None:
@@ -522,7 +588,7 @@ class SensorService(BaseService):
     def get_thermostat_status_full(self):
         """Ottiene lo stato completo del termostato per il frontend."""
         try:
-            current_temp = self.db.get_current_temperature()
+            current_temp = self.get_current_temperature()
             target_temp = self.get_target_temperature()
             thermostat_enabled = self.get_thermostat_enabled()
             boiler_on = self.get_boiler_status()
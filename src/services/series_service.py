@@ -0,0 +1,238 @@
+import logging
+import math
+import re
+from datetime import datetime, timedelta
+
+from models.database import BaseService
+from utils.downsample import lttb_rows
+from config.settings import SERIES_MAX_POINTS, SERIES_MIN_POINTS, SERIES_MAX_BUCKETS, SERIES_RAW_LIMIT
+
+logger = logging.getLogger(__name__)
+
+BUCKET_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Candidate bucket widths for bucket=auto, smallest first
+AUTO_BUCKETS = [60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400]
+
+AGGREGATES = ('avg', 'min', 'max', 'count')
+
+# metric -> where its samples live. ``raw`` is (table, time column, value
+# column); ``rollups`` lists the pre-aggregated tables, with their resolution in
+# seconds and the SQL merging their rows into each aggregate; ``key`` is the
+# column filtered by ``?sensor_id=``.
+_SENSOR_ROLLUP = {
+    'table': 'sensor_readings_hourly',
+    'time': 'hour',
+    'resolution': 3600,
+}
+
+SERIES = {
+    'temperature': {
+        'raw': ('sensor_readings', 'timestamp', 'temperature_c'),
+        'rollups': [dict(_SENSOR_ROLLUP, aggregates={
+            'avg': 'SUM(temperature_sum) / NULLIF(SUM(reading_count), 0)',
+            'min': 'MIN(temperature_min)',
+            'max': 'MAX(temperature_max)',
+            'count': 'SUM(reading_count)',
+        })],
+        'key': 'sensor_id',
+    },
+    'humidity': {
+        'raw': ('sensor_readings', 'timestamp', 'humidity'),
+        'rollups': [dict(_SENSOR_ROLLUP, aggregates={
+            'avg': 'SUM(humidity_sum) / NULLIF(SUM(reading_count), 0)',
+            'min': 'MIN(humidity_min)',
+            'max': 'MAX(humidity_max)',
+            'count': 'SUM(reading_count)',
+        })],
+        'key': 'sensor_id',
+    },
+}
+for _column in ('smoke', 'lpg', 'methane', 'hydrogen', 'air_quality_index'):
+    SERIES[_column] = {'raw': ('air_quality', 'timestamp', _column), 'rollups': []}
+
+RAW_AGGREGATES = {
+    'avg': 'AVG({column})',
+    'min': 'MIN({column})',
+    'max': 'MAX({column})',
+    'count': 'COUNT({column})',
+}
+
+
+EPOCH = datetime(1970, 1, 1)
+
+# Epoch numbers are real epochs of the (naive, local) stored timestamps, as
+# ``from``/``to`` epochs are read (utils.time_windows.parse_time)
+TIME_FORMATS = {
+    'iso': lambda t: t.isoformat(),
+    's': lambda t: int(t.timestamp()),
+    'ms': lambda t: int(t.timestamp() * 1000),
+}
+
+
+def parse_bucket(text):
+    """``'15m'`` -> 900 seconds; ``None``/``'auto'`` -> None, ``'raw'`` -> 0."""
+    if text in (None, '', 'auto'):
+        return None
+    if text == 'raw':
+        return 0
+    match = re.fullmatch(r'(\d+)([smhdw])', text)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid bucket {text!r}. Use e.g. 30s, 15m, 1h, 1d, 1w, raw or auto.")
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def format_bucket(seconds):
+    for unit, size in sorted(BUCKET_UNITS.items(), key=lambda item: -item[1]):
+        if seconds % size == 0:
+            return f"{seconds // size}{unit}"
+    return f"{seconds}s"
+
+
+def _floor(moment, seconds):
+    epoch = (moment - EPOCH).total_seconds()
+    return EPOCH + timedelta(seconds=math.floor(epoch / seconds) * seconds)
+
+
+def _ceil(moment, seconds):
+    floored = _floor(moment, seconds)
+    return floored if floored == moment else floored + timedelta(seconds=seconds)
+
+
+class SeriesService(BaseService):
+    """Bucketed time series of any stored metric, read from the cheapest table that can answer.
+
+    A request names a metric, a ``[start, end)`` window, a bucket width and an
+    aggregate. When the bucket is a whole multiple of a rollup's resolution
+    and the rollup can produce the aggregate, the rollup is read (the window
+    is widened to whole rollup periods, which the bucket grid would cover
+    anyway); otherwise the raw table is bucketed in SQL. Buckets are aligned
+    on the epoch, so ``1d`` buckets start at local midnight like every stored
+    timestamp.
+    """
+
+    @staticmethod
+    def metrics():
+        return sorted(SERIES) + ['<measurement>.<field> (device_metrics)']
+
+    @staticmethod
+    def _spec(metric):
+        spec = SERIES.get(metric)
+        if spec is not None:
+            return spec
+        measurement, dot, field = metric.partition('.')
+        if dot and measurement and field:
+            # Generic series written through /api/ingest
+            return {
+                'raw': ('device_metrics', 'timestamp', 'value'),
+                'rollups': [],
+                'key': 'device_id',
+                'where': ("measurement = %s AND field = %s", (measurement, field)),
+            }
+        raise ValueError(f"Unknown metric {metric!r}.")
+
+    @staticmethod
+    def choose_bucket(start, end, bucket=None, spec=None, agg='avg'):
+        """Bucket width in seconds: the requested one, or an automatic one.
+
+        The automatic width is the smallest that keeps the series under
+        ``SERIES_MAX_POINTS``; it is widened to a rollup's resolution when the
+        rollup alone still yields ``SERIES_MIN_POINTS``, so that long windows
+        never scan the raw table.
+        """
+        span = (end - start).total_seconds()
+        if bucket is not None:
+            if bucket and span / bucket > SERIES_MAX_BUCKETS:
+                raise ValueError(f"Too many buckets ({int(span / bucket)}); use a wider bucket.")
+            return bucket
+        bucket = next((c for c in AUTO_BUCKETS if span / c <= SERIES_MAX_POINTS), AUTO_BUCKETS[-1])
+        for rollup in (spec or {}).get('rollups', []):
+            resolution = rollup['resolution']
+            if bucket < resolution and agg in rollup['aggregates'] and span / resolution >= SERIES_MIN_POINTS:
+                bucket = resolution
+        return bucket
+
+    @staticmethod
+    def choose_source(spec, bucket, agg):
+        """The coarsest rollup whose resolution divides ``bucket`` and that supports ``agg``; None for raw."""
+        if not bucket:
+            return None
+        usable = [r for r in spec['rollups'] if bucket % r['resolution'] == 0 and agg in r['aggregates']]
+        return max(usable, key=lambda r: r['resolution']) if usable else None
+
+    def get_series(self, metric, start, end, bucket=None, agg='avg', key=None, time_format='iso', max_points=None):
+        """Columnar series ``{'t': [...], 'v': [...]}`` plus a description of how it was computed.
+
+        ``time_format`` is ``'iso'``, or ``'s'``/``'ms'`` for epoch numbers
+        (the naive stored timestamps are read as local time, like epoch bounds).
+        ``max_points`` LTTB-downsamples the buckets (or raw rows) afterwards.
+        """
+        if time_format not in TIME_FORMATS:
+            raise ValueError(f"Invalid time format {time_format!r}. Use one of {', '.join(TIME_FORMATS)}.")
+        if agg not in AGGREGATES:
+            raise ValueError(f"Invalid agg {agg!r}. Use one of {', '.join(AGGREGATES)}.")
+        if end <= start:
+            raise ValueError("'from' must be before 'to'.")
+
+        spec = self._spec(metric)
+        bucket = self.choose_bucket(start, end, bucket, spec, agg)
+        rollup = self.choose_source(spec, bucket, agg)
+
+        conditions, params = [], []
+        if 'where' in spec:
+            conditions.append(spec['where'][0])
+            params.extend(spec['where'][1])
+        if key is not None:
+            if 'key' not in spec:
+                raise ValueError(f"Metric {metric!r} has no sensor/device filter.")
+            conditions.append(f"{spec['key']} = %s")
+            params.append(key)
+        extra = "".join(f" AND {c}" for c in conditions)
+
+        if rollup is not None:
+            table, time_column = rollup['table'], rollup['time']
+            start = _floor(start, rollup['resolution'])
+            end = _ceil(end, rollup['resolution'])
+            value_sql = rollup['aggregates'][agg]
+        else:
+            table, time_column, column = spec['raw']
+            value_sql = RAW_AGGREGATES[agg].format(column=column)
+
+        if bucket == 0:
+            query = f"""
+                SELECT {time_column} AS t, {column} AS v
+                FROM {table}
+                WHERE {time_column} >= %s AND {time_column} < %s{extra}
+                ORDER BY {time_column}
+                LIMIT %s;
+            """
+            rows = self._execute_query(query, (start, end, *params, SERIES_RAW_LIMIT + 1))
+        else:
+            query = f"""
+                SELECT
+                    TIMESTAMP 'epoch' + FLOOR(EXTRACT(EPOCH FROM {time_column}) / %s) * %s * INTERVAL '1 second' AS t,
+                    {value_sql} AS v
+                FROM {table}
+                WHERE {time_column} >= %s AND {time_column} < %s{extra}
+                GROUP BY 1
+                ORDER BY 1;
+            """
+            rows = self._execute_query(query, (bucket, bucket, start, end, *params))
+
+        truncated = bucket == 0 and len(rows) > SERIES_RAW_LIMIT
+        rows = rows[:SERIES_RAW_LIMIT] if truncated else rows
+        downsampled = max_points is not None and len(rows) > max_points
+        rows = lttb_rows(rows, max_points, 't', 'v')
+        return {
+            'metric': metric,
+            'agg': None if bucket == 0 else agg,
+            'bucket': 'raw' if bucket == 0 else format_bucket(bucket),
+            'bucket_seconds': bucket,
+            'source': table,
+            'from': start.isoformat(),
+            'to': end.isoformat(),
+            'truncated': truncated,
+            'downsampled': downsampled,
+            't': [TIME_FORMATS[time_format](r['t']) for r in rows],
+            'v': [None if r['v'] is None else float(r['v']) for r in rows],
+        }
@@ -0,0 +1,97 @@
+"""
+Background sampler of the Raspberry Pi system stats.
+
+``/api_raspberry_pi_stats`` used to measure CPU usage with
+``psutil.cpu_percent(interval=1)``, blocking a worker for a second on every
+poll. The sampler measures everything every ``RASPI_STATS_INTERVAL``
+seconds in a daemon thread (CPU usage over the interval, non-blocking) and
+numbers each sample, so the endpoint answers instantly and polls between
+two samples get a 304 (see ``utils.conditional``).
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+import psutil
+
+from config.settings import RASPI_STATS_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+THERMAL_ZONE = '/sys/class/thermal/thermal_zone0/temp'
+
+
+def read_system_stats():
+    """One sample of CPU temperature/usage, memory and disk, formatted as the endpoint returns it."""
+    try:
+        with open(THERMAL_ZONE, 'r') as f:
+            temperature = float(f.read().strip()) / 1000.0
+    except FileNotFoundError:
+        temperature = None
+
+    memory = psutil.virtual_memory()
+    disk = psutil.disk_usage('/')
+    return {
+        'temperature': temperature,
+        # Usage since the previous call, i.e. over the last sampling interval
+        'cpuUsage': psutil.cpu_percent(interval=None),
+        'memoryUsed': f'{memory.used / (1024**3):.2f} GB',
+        'memoryTotal': f'{memory.total / (1024**3):.2f} GB',
+        'diskUsed': f'{disk.used / (1024**3):.2f} GB',
+        'diskTotal': f'{disk.total / (1024**3):.2f} GB',
+        'diskFree': f'{disk.free / (1024**3):.2f} GB'
+    }
+
+
+class SystemStatsSampler:
+    """Keeps the latest system stats sample and its generation number."""
+
+    def __init__(self, interval=RASPI_STATS_INTERVAL):
+        self.interval = interval
+        self.generation = 0
+        self.sampled_at = None
+        self._stats = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def sample(self):
+        stats = read_system_stats()
+        with self._lock:
+            self._stats = stats
+            self.generation += 1
+            self.sampled_at = datetime.now()
+
+    def run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"System stats sampling failed: {e}")
+
+    def latest(self):
+        """``(generation, sampled_at, stats)`` of the newest sample."""
+        with self._lock:
+            return self.generation, self.sampled_at, self._stats
+
+    def stop(self):
+        self._stop.set()
+
+
+_sampler = None
+_sampler_lock = threading.Lock()
+
+
+def get_system_stats_sampler():
+    """Process-wide sampler, started (with a first sample taken) on first use."""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = SystemStatsSampler()
+            # Start the CPU usage measurement, then take the first sample over a short interval
+            psutil.cpu_percent(interval=None)
+            time.sleep(0.1)
+            _sampler.sample()
+            threading.Thread(target=_sampler.run, name="system-stats", daemon=True).start()
+        return _sampler
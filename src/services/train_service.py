@@ -2,6 +2,7 @@ import psycopg2
 import psycopg2.extras
 from datetime import datetime
 from scraper import TrainScraper
+from models.database import get_db_connection
 
 # ── Station URLs ───────────────────────────────────────────
 # placeId=2416 → Roma Termini departures
@@ -40,7 +41,7 @@ class TrainService:
         conn = None
         cur  = None
         try:
-            conn = psycopg2.connect(**self.db_config)
+            conn = get_db_connection(self.db_config)
             cur  = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
             now  = datetime.now()
 
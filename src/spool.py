@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from config.settings import (
+    SPOOL_REPLAY_BATCH,
+    SPOOL_REPLAY_PAUSE,
+    SPOOL_REPLAY_MAX_QUEUE_RATIO,
+)
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__dt__': value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and '__dt__' in value:
+        return datetime.fromisoformat(value['__dt__'])
+    if isinstance(value, list):
+        return tuple(_decode(v) for v in value)
+    return value
+
+
+class Spool:
+    """Spool locale append-only (SQLite) per le righe non scrivibili su PostgreSQL.
+
+    Quando il database è irraggiungibile la pipeline di ingest scrive qui i
+    batch falliti invece di tenerli in memoria o perderli; ``SpoolReplayer`` li
+    reinserisce quando il database torna disponibile. Le righe sono tuple
+    serializzate in JSON (i datetime sono preservati) e vengono cancellate solo
+    dopo il commit su PostgreSQL: la consegna è almeno-una-volta.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Il Raspberry può perdere l'alimentazione: fsync a ogni commit
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS spool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                payload TEXT NOT NULL,
+                spooled_at REAL NOT NULL
+            )
+        """)
+
+        self.counters = {
+            'spooled': 0,
+            'replayed': 0,
+            'replay_batches': 0,
+            'replay_errors': 0,
+            'backpressure_waits': 0,
+        }
+
+    def bump(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] += amount
+
+    def append(self, rows):
+        """Aggiunge le righe allo spool in un'unica transazione."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO spool (payload, spooled_at) VALUES (?, ?)",
+                    [(json.dumps(_encode(row)), now) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.counters['spooled'] += len(rows)
+
+    def peek(self, limit):
+        """Restituisce ``(ultimo_id, righe)`` per le ``limit`` righe più vecchie."""
+        with self._lock:
+            records = self._conn.execute(
+                "SELECT id, payload FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        if not records:
+            return None, []
+        return records[-1][0], [_decode(json.loads(payload)) for _, payload in records]
+
+    def remove_through(self, last_id):
+        """Cancella le righe fino a ``last_id`` compreso (dopo il commit su PostgreSQL)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
+
+    def depth(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self.counters)
+            oldest = self._conn.execute("SELECT MIN(spooled_at) FROM spool").fetchone()[0]
+        snapshot['depth'] = self.depth()
+        snapshot['oldest_age_seconds'] = round(time.time() - oldest, 1) if oldest else None
+        return snapshot
+
+
+class SpoolReplayer:
+    """Svuota lo spool su PostgreSQL con insert a blocchi, senza affamare le scritture live.
+
+    Un blocco viene reinserito solo se la pipeline live non sta fallendo e la
+    sua coda è sotto ``max_queue_ratio`` della capacità; tra un blocco e
+    l'altro il replayer attende ``pause`` secondi, lasciando connessioni e
+    tempo di database alle scritture correnti.
+    """
+
+    def __init__(self, spool, write_batch, pipeline=None, batch_size=SPOOL_REPLAY_BATCH,
+                 pause=SPOOL_REPLAY_PAUSE, max_queue_ratio=SPOOL_REPLAY_MAX_QUEUE_RATIO,
+                 idle_interval=5, retry_delay=10):
+        self.spool = spool
+        self.write_batch = write_batch
+        self.pipeline = pipeline
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_queue_ratio = max_queue_ratio
+        self.idle_interval = idle_interval
+        self.retry_delay = retry_delay
+        self.running = True
+        self.logger = logging.getLogger("spool_replayer")
+
+    def live_is_busy(self):
+        if self.pipeline is None:
+            return False
+        if self.pipeline.failing:
+            return True
+        return self.pipeline.queue.qsize() > self.pipeline.max_queue * self.max_queue_ratio
+
+    def replay_once(self):
+        """Reinserisce un blocco; restituisce il numero di righe scritte."""
+        last_id, rows = self.spool.peek(self.batch_size)
+        if not rows:
+            return 0
+        self.write_batch(rows)
+        self.spool.remove_through(last_id)
+        self.spool.bump('replayed', len(rows))
+        self.spool.bump('replay_batches')
+        return len(rows)
+
+    def run(self):
+        """Loop del replayer."""
+        self.logger.info(f"♻️ Replayer spool avviato ({self.spool.path})")
+
+        while self.running:
+            if self.spool.depth() == 0:
+                time.sleep(self.idle_interval)
+                continue
+
+            if self.live_is_busy():
+                self.spool.bump('backpressure_waits')
+                time.sleep(self.pause)
+                continue
+
+            try:
+                replayed = self.replay_once()
+                if replayed:
+                    self.logger.info(f"Reinserite {replayed} righe dallo spool ({self.spool.depth()} rimaste)")
+                time.sleep(self.pause)
+            except Exception as e:
+                self.spool.bump('replay_errors')
+                self.logger.error(f"Replay dello spool fallito: {e}")
+                time.sleep(self.retry_delay)
+
+    def stop(self):
+        self.running = False
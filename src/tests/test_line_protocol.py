@@ -0,0 +1,34 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.line_protocol import parse_json_point
+
+
+@pytest.fixture(params=['UTC', 'Europe/Rome', 'America/New_York'])
+def local_timezone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_offset_iso_and_epoch_points_give_the_same_timestamp(local_timezone):
+    instant = datetime(2025, 1, 1, 10, 0, tzinfo=timezone.utc)
+    fields = {'temperature': 21.5, 'humidity': 40}
+
+    iso = parse_json_point(
+        f'{{"measurement": "sensor_readings", "fields": {{"temperature": 21.5, "humidity": 40}}, '
+        f'"timestamp": "{instant.isoformat()}"}}'
+    )
+    epoch = parse_json_point(
+        f'{{"measurement": "sensor_readings", "fields": {{"temperature": 21.5, "humidity": 40}}, '
+        f'"timestamp": {int(instant.timestamp())}}}',
+        precision='s',
+    )
+
+    assert iso == epoch
+    assert iso.timestamp.tzinfo is None
+    assert iso.fields == fields
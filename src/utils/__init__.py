@@ -1,4 +1,5 @@
 # utils/__init__.py
 from .json_encoder import CustomJSONEncoder
+from .time_windows import day_window, month_window, year_window, iso_week_window
 
-__all__ = ['CustomJSONEncoder']
\ No newline at end of file
+__all__ = ['CustomJSONEncoder', 'day_window', 'month_window', 'year_window', 'iso_week_window']
@@ -0,0 +1,127 @@
+"""
+Conditional GET (ETag / Last-Modified) for polled endpoints.
+
+The dashboard polls a few endpoints every few seconds, and most polls find
+nothing new, yet each one recomputed and re-serialized the whole payload.
+``conditional(version)`` runs a cheap *version* function before the view
+(the newest timestamp behind the data, or a generation counter) and, when
+the client already holds that version, answers ``304 Not Modified``
+without calling the view at all.
+
+Responses carry ``ETag``, ``Last-Modified`` (when the version contains
+timestamps) and ``Cache-Control: no-cache``, so browsers revalidate every
+poll on their own: ``fetch()`` sends ``If-None-Match`` and turns a 304
+back into the cached body, with no client changes.
+"""
+
+import functools
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+
+from flask import make_response, request
+
+logger = logging.getLogger(__name__)
+
+
+class ConditionalStats:
+    """Per-endpoint counters of conditional responses."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def bump(self, endpoint, counter):
+        with self._lock:
+            counters = self._endpoints.setdefault(
+                endpoint, {'responses': 0, 'not_modified': 0, 'version_errors': 0}
+            )
+            counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._endpoints.items()}
+        responses = sum(c['responses'] for c in endpoints.values())
+        not_modified = sum(c['not_modified'] for c in endpoints.values())
+        for counters in endpoints.values():
+            counters['not_modified_rate'] = (
+                round(counters['not_modified'] / counters['responses'], 4) if counters['responses'] else None
+            )
+        return {
+            'responses': responses,
+            'not_modified': not_modified,
+            'not_modified_rate': round(not_modified / responses, 4) if responses else None,
+            'endpoints': endpoints,
+        }
+
+
+conditional_stats = ConditionalStats()
+
+
+def _parts(version):
+    return version if isinstance(version, (list, tuple)) else (version,)
+
+
+def _last_modified(version):
+    """Newest datetime in the version (naive ones are local time), in UTC, or None."""
+    moments = [v for v in _parts(version) if isinstance(v, datetime)]
+    if not moments:
+        return None
+    newest = max(m.astimezone(timezone.utc) for m in moments)
+    return newest.replace(microsecond=0)
+
+
+def _etag(version):
+    text = f"{request.path}?{request.query_string.decode()}|{_parts(version)!r}"
+    return hashlib.sha1(text.encode()).hexdigest()[:24]
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 7232)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return last_modified is not None and since is not None and last_modified <= since
+
+
+def conditional(version):
+    """Answer conditional GETs of the decorated view from ``version(*args, **kwargs)``.
+
+    ``version`` receives the view arguments (and can read ``request``) and
+    returns a value, or a tuple of values, that changes whenever the
+    response would. Datetimes in it set ``Last-Modified``. When it returns
+    None or fails, the view runs as a plain GET.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+            endpoint = request.endpoint
+            try:
+                current = version(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Version of {endpoint} unavailable: {e}")
+                conditional_stats.bump(endpoint, 'version_errors')
+                current = None
+            if current is None:
+                return view(*args, **kwargs)
+
+            etag = _etag(current)
+            last_modified = _last_modified(current)
+            conditional_stats.bump(endpoint, 'responses')
+            if _not_modified(etag, last_modified):
+                conditional_stats.bump(endpoint, 'not_modified')
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
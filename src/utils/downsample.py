@@ -0,0 +1,113 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for chart payloads.
+
+A chart a few hundred pixels wide cannot show more points than it has
+pixels, yet a one-year range of hourly averages is ~8,760 points. LTTB keeps
+the first and last point and, for every bucket in between, the point forming
+the largest triangle with the point kept in the previous bucket and the
+average of the next bucket. Peaks and dips survive, which plain striding or
+averaging would flatten.
+
+The functions return *indices*, so callers can pick whole rows (all columns
+of a reading) and build response objects only for the points they keep.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+# Accepted range for ?max_points=
+MIN_POINTS = 3
+MAX_POINTS = 20000
+
+# Below this many points per bucket a Python loop beats one NumPy call per bucket
+SMALL_BUCKET = 32
+
+
+def parse_max_points(value):
+    """``?max_points=`` as an int (None when absent); raises ValueError when out of range."""
+    if value in (None, ''):
+        return None
+    try:
+        points = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("max_points must be an integer")
+    if not MIN_POINTS <= points <= MAX_POINTS:
+        raise ValueError(f"max_points must be between {MIN_POINTS} and {MAX_POINTS}")
+    return points
+
+
+def _as_float(values):
+    values = list(values)
+    if values and isinstance(values[0], datetime):
+        return np.fromiter((v.timestamp() for v in values), dtype=float, count=len(values))
+    return np.asarray(values, dtype=float)
+
+
+def lttb_indices(x, y, threshold):
+    """Indices (ascending) of the ``threshold`` points of ``(x, y)`` kept by LTTB.
+
+    ``x`` must be sorted; it may hold numbers or datetimes. Every index is
+    returned when the series is already short enough.
+    """
+    n = len(x)
+    if threshold is None or threshold >= n or threshold < MIN_POINTS:
+        return np.arange(n)
+
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+
+    # threshold - 2 buckets over the points between the first and the last
+    every = (n - 2) / (threshold - 2)
+    edges = (np.floor(np.arange(threshold - 1) * every) + 1).astype(np.intp)
+    edges[-1] = n - 1
+    sizes = np.diff(edges)
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / sizes
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / sizes
+    # The "next bucket" of the last bucket is the last point
+    avg_x = np.append(avg_x[1:], x[-1])
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    if every < SMALL_BUCKET:
+        _select_small(x.tolist(), y.tolist(), edges.tolist(), avg_x.tolist(), avg_y.tolist(), selected)
+        return selected
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (avg_y[i] - ay))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def _select_small(x, y, edges, avg_x, avg_y, selected):
+    """Same selection as the NumPy loop, on plain lists (cheaper when buckets hold a few points)."""
+    a = 0
+    for i in range(len(edges) - 1):
+        ax, ay = x[a], y[a]
+        dx, dy = ax - avg_x[i], avg_y[i] - ay
+        best, best_area = edges[i], -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs(dx * (y[j] - ay) - (ax - x[j]) * dy)
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        selected[i + 1] = a
+
+
+def lttb_rows(rows, threshold, x_key, y_key):
+    """Downsample a list of rows (dicts or DictCursor rows) sorted by ``x_key``.
+
+    Rows whose ``y_key`` is NULL are never kept when downsampling.
+    """
+    if threshold is None or len(rows) <= threshold:
+        return rows
+    rows = [r for r in rows if r[y_key] is not None]
+    keep = lttb_indices([r[x_key] for r in rows], [r[y_key] for r in rows], threshold)
+    return [rows[i] for i in keep]
@@ -0,0 +1,209 @@
+"""
+Streaming parsers for the batched ingest endpoint.
+
+Two formats are accepted, one point per line:
+
+* Influx line protocol::
+
+      measurement,tag=value,tag2=value2 field=1.5,count=3i,label="text" 1700000000000000000
+
+  Commas, spaces and ``=`` in names are escaped with a backslash; string
+  field values are double-quoted. The timestamp is optional (the time of
+  the request is used) and its unit is given by ``precision``.
+
+* NDJSON::
+
+      {"measurement": "...", "tags": {...}, "fields": {...}, "timestamp": 1700000000}
+
+  where ``timestamp`` is either an epoch number in ``precision`` units or an
+  ISO 8601 string.
+
+Both parsers read the body line by line and yield ``(line_number, point or
+error)`` pairs, so a large request is never held in memory as text and one
+bad line does not reject the whole batch. Timestamps are returned as naive
+local datetimes, like every other timestamp stored by the application.
+"""
+
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from utils.time_windows import as_local
+
+Point = namedtuple('Point', ['measurement', 'tags', 'fields', 'timestamp'])
+
+# Divisor turning an epoch in the given unit into seconds
+PRECISIONS = {'ns': 1e9, 'us': 1e6, 'ms': 1e3, 's': 1}
+
+
+class ParseError(ValueError):
+    """A line that cannot be turned into a point."""
+
+
+def epoch_to_datetime(value, precision='ns'):
+    try:
+        divisor = PRECISIONS[precision]
+    except KeyError:
+        raise ParseError(f"unknown precision {precision!r}")
+    try:
+        return datetime.fromtimestamp(float(value) / divisor)
+    except (OverflowError, OSError, ValueError):
+        raise ParseError(f"timestamp out of range: {value!r}")
+
+
+def _split(text, separator, quotes=False):
+    """Split on ``separator`` outside backslash escapes (and double quotes if ``quotes``)."""
+    if '\\' not in text and not (quotes and '"' in text):
+        return text.split(separator)   # fast path: nothing escaped or quoted
+    parts, current = [], []
+    escaped = in_quotes = False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == '\\':
+            current.append(char)
+            escaped = True
+        elif quotes and char == '"':
+            current.append(char)
+            in_quotes = not in_quotes
+        elif char == separator and not in_quotes:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(char)
+    if in_quotes:
+        raise ParseError("unterminated string")
+    parts.append(''.join(current))
+    return parts
+
+
+def _unescape(text):
+    return text.replace('\\,', ',').replace('\\ ', ' ').replace('\\=', '=').replace('\\"', '"').replace('\\\\', '\\')
+
+
+def _pair(text):
+    key, sep, value = text.partition('=')
+    # The separator is the first unescaped '='
+    while key.endswith('\\') and sep:
+        more_key, sep, value = value.partition('=')
+        key = f"{key}={more_key}"
+    if not sep or not key:
+        raise ParseError(f"expected key=value, got {text!r}")
+    return _unescape(key), value
+
+
+def _field_value(raw):
+    if raw.startswith('"'):
+        if len(raw) < 2 or not raw.endswith('"'):
+            raise ParseError(f"bad string value {raw!r}")
+        return _unescape(raw[1:-1])
+    if raw in ('t', 'T', 'true', 'True', 'TRUE'):
+        return 1.0
+    if raw in ('f', 'F', 'false', 'False', 'FALSE'):
+        return 0.0
+    if raw.endswith('i') or raw.endswith('u'):
+        raw = raw[:-1]
+    try:
+        return float(raw)
+    except ValueError:
+        raise ParseError(f"bad field value {raw!r}")
+
+
+def parse_line(line, precision='ns', now=None):
+    """Parse one line of line protocol into a Point."""
+    sections = [s for s in _split(line, ' ', quotes=True) if s]
+    if len(sections) not in (2, 3):
+        raise ParseError("expected 'measurement[,tags] fields [timestamp]'")
+
+    key_parts = _split(sections[0], ',')
+    measurement = _unescape(key_parts[0])
+    if not measurement:
+        raise ParseError("empty measurement")
+    tags = dict(_pair(part) for part in key_parts[1:])
+    tags = {key: _unescape(value) for key, value in tags.items()}
+
+    fields = {}
+    for part in _split(sections[1], ',', quotes=True):
+        key, value = _pair(part)
+        fields[key] = _field_value(value)
+    if not fields:
+        raise ParseError("no fields")
+
+    if len(sections) == 3:
+        try:
+            timestamp = epoch_to_datetime(int(sections[2]), precision)
+        except ValueError:
+            raise ParseError(f"bad timestamp {sections[2]!r}")
+    else:
+        timestamp = now or datetime.now()
+    return Point(measurement, tags, fields, timestamp)
+
+
+def parse_json_point(line, precision='ns', now=None):
+    """Parse one NDJSON object into a Point."""
+    try:
+        obj = json.loads(line)
+    except ValueError as e:
+        raise ParseError(f"invalid JSON: {e}")
+    if not isinstance(obj, dict):
+        raise ParseError("expected a JSON object")
+
+    measurement = obj.get('measurement')
+    fields = obj.get('fields')
+    tags = obj.get('tags') or {}
+    if not measurement or not isinstance(measurement, str):
+        raise ParseError("missing measurement")
+    if not isinstance(fields, dict) or not fields:
+        raise ParseError("missing fields")
+    if not isinstance(tags, dict):
+        raise ParseError("tags must be an object")
+
+    parsed = {}
+    for key, value in fields.items():
+        if isinstance(value, bool):
+            parsed[key] = 1.0 if value else 0.0
+        elif isinstance(value, (int, float)):
+            parsed[key] = float(value)
+        elif isinstance(value, str):
+            parsed[key] = value
+        else:
+            raise ParseError(f"bad field value for {key!r}")
+
+    raw_ts = obj.get('timestamp')
+    if raw_ts is None:
+        timestamp = now or datetime.now()
+    elif isinstance(raw_ts, str):
+        try:
+            # An offset (e.g. +00:00) is converted, so the same instant is stored the same way as an epoch
+            timestamp = as_local(datetime.fromisoformat(raw_ts))
+        except ValueError:
+            raise ParseError(f"bad timestamp {raw_ts!r}")
+    elif isinstance(raw_ts, (int, float)) and not isinstance(raw_ts, bool):
+        timestamp = epoch_to_datetime(raw_ts, precision)
+    else:
+        raise ParseError(f"bad timestamp {raw_ts!r}")
+
+    return Point(measurement, {str(k): str(v) for k, v in tags.items()}, parsed, timestamp)
+
+
+def iter_points(stream, fmt='line', precision='ns'):
+    """Yield ``(line_number, Point)`` or ``(line_number, ParseError)`` for every non-empty line of ``stream``.
+
+    ``stream`` is a binary file-like object (e.g. the request body); it is
+    consumed line by line. Lines starting with ``#`` are comments.
+    """
+    parse = parse_json_point if fmt == 'ndjson' else parse_line
+    now = datetime.now()
+    for number, raw in enumerate(stream, start=1):
+        try:
+            line = raw.decode('utf-8').strip()
+        except UnicodeDecodeError:
+            yield number, ParseError("invalid UTF-8")
+            continue
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield number, parse(line, precision, now)
+        except ParseError as e:
+            yield number, e
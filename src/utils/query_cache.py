@@ -0,0 +1,307 @@
+"""
+Two-level read-through cache for historical aggregates.
+
+Monthly and yearly aggregates of past periods never change, yet every page
+load recomputed them. Results are cached in two levels:
+
+* an in-process LRU (level 1), which answers repeated requests without
+  leaving the process;
+* Redis (level 2), shared by every worker and surviving restarts.
+
+Every entry belongs to one period *tag* (``sensor:y2025``,
+``air_quality:m2025-03``...). Entries of closed periods live for
+``QUERY_CACHE_HISTORY_TTL``; entries of the period still in progress only
+for ``QUERY_CACHE_CURRENT_TTL``. Writers call ``invalidate_timestamp`` with
+the time of the row they wrote, which drops only the year, month and day
+tags containing it.
+
+Level 1 entries never live longer than ``QUERY_CACHE_LOCAL_MAX_TTL``, which
+bounds how long a process can miss an invalidation made by another process
+(the sensor reader writes, the web app reads). If Redis is unreachable the
+cache keeps working with level 1 only and retries Redis later.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import redis
+
+from config.settings import (
+    REDIS_HOST,
+    REDIS_PORT,
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_SIZE,
+    QUERY_CACHE_CURRENT_TTL,
+    QUERY_CACHE_HISTORY_TTL,
+    QUERY_CACHE_LOCAL_MAX_TTL,
+)
+from utils.time_windows import day_window, month_window, year_window
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'smarthouse:qc'
+
+# Seconds to skip Redis after a failure
+REDIS_RETRY_AFTER = 30
+
+
+def period_tag(series, year, month=None, day=None):
+    """Return ``(tag, window_end)`` for a year, a month or a single day of ``series``."""
+    if day is not None:
+        start, end = day_window(datetime(int(year), int(month), int(day)))
+        return f"{series}:d{start:%Y-%m-%d}", end
+    if month is not None:
+        start, end = month_window(year, month)
+        return f"{series}:m{start:%Y-%m}", end
+    start, end = year_window(year)
+    return f"{series}:y{start:%Y}", end
+
+
+def _encode(value):
+    # JSON turns int dict keys into strings: keep the key/value pairs instead
+    if isinstance(value, dict):
+        return {'__items__': [[_encode(k), _encode(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [_encode(v) for v in value]
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict) and '__items__' in value:
+        return {_decode(k): _decode(v) for k, v in value['__items__']}
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    return value
+
+
+class QueryCache:
+    """In-process LRU in front of Redis, with invalidation by period tag."""
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, redis_host=REDIS_HOST, redis_port=REDIS_PORT,
+                 current_ttl=QUERY_CACHE_CURRENT_TTL, history_ttl=QUERY_CACHE_HISTORY_TTL,
+                 local_max_ttl=QUERY_CACHE_LOCAL_MAX_TTL, enabled=QUERY_CACHE_ENABLED):
+        self.maxsize = maxsize
+        self.current_ttl = current_ttl
+        self.history_ttl = history_ttl
+        self.local_max_ttl = local_max_ttl
+        self.enabled = enabled
+
+        self._local = OrderedDict()     # key -> (expires_at, tag, value)
+        self._tags = {}                 # tag -> {keys} in the local LRU
+        self._lock = threading.Lock()
+
+        self._redis = redis.Redis(
+            host=redis_host, port=redis_port,
+            socket_timeout=0.5, socket_connect_timeout=0.5,
+        )
+        self._redis_down_until = 0
+
+        self._stats = {
+            'local_hits': 0,
+            'redis_hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'keys_invalidated': 0,
+            'redis_errors': 0,
+        }
+
+    def _bump(self, counter, amount=1):
+        with self._lock:
+            self._stats[counter] += amount
+
+    # ---- level 2 -------------------------------------------------------
+
+    def _redis_available(self):
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, e):
+        self._bump('redis_errors')
+        if self._redis_available():
+            logger.warning(f"Query cache: Redis unavailable ({e}), using the local cache only")
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+
+    def _redis_get(self, key):
+        if not self._redis_available():
+            return None
+        try:
+            return self._redis.get(key)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return None
+
+    def _redis_set(self, key, tag, payload, ttl):
+        if not self._redis_available():
+            return
+        try:
+            tag_key = f"{KEY_PREFIX}:tag:{tag}"
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.set(key, payload, ex=int(ttl))
+            pipe.sadd(tag_key, key)
+            pipe.expire(tag_key, int(self.history_ttl))
+            pipe.execute()
+        except redis.RedisError as e:
+            self._redis_failed(e)
+
+    def _redis_invalidate(self, tags):
+        if not self._redis_available():
+            return 0
+        try:
+            tag_keys = [f"{KEY_PREFIX}:tag:{tag}" for tag in tags]
+            pipe = self._redis.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = set().union(*pipe.execute())
+            self._redis.delete(*members, *tag_keys)
+            return len(members)
+        except redis.RedisError as e:
+            self._redis_failed(e)
+            return 0
+
+    # ---- level 1 -------------------------------------------------------
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                self._local_drop(key)
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _local_drop(self, key):
+        expires_at, tag, _ = self._local.pop(key)
+        keys = self._tags.get(tag)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
+
+    def _local_set(self, key, tag, value, ttl):
+        with self._lock:
+            if key in self._local:
+                self._local_drop(key)
+            self._local[key] = (time.monotonic() + min(ttl, self.local_max_ttl), tag, value)
+            self._tags.setdefault(tag, set()).add(key)
+            while len(self._local) > self.maxsize:
+                self._local_drop(next(iter(self._local)))
+
+    # ---- public API ----------------------------------------------------
+
+    def get_or_compute(self, tag, window_end, name, params, compute):
+        """Return the cached result of ``name(params)`` or compute and store it.
+
+        ``window_end`` is the end of the period the result covers: results of
+        periods already closed are kept for the long history TTL.
+        """
+        if not self.enabled:
+            return compute()
+
+        digest = hashlib.sha1(json.dumps(params, default=str).encode()).hexdigest()[:16]
+        key = f"{KEY_PREFIX}:{tag}:{name}:{digest}"
+
+        entry = self._local_get(key)
+        if entry is not None:
+            self._bump('local_hits')
+            return entry[2]
+
+        closed = window_end <= datetime.now()
+        ttl = self.history_ttl if closed else self.current_ttl
+
+        payload = self._redis_get(key)
+        if payload is not None:
+            self._bump('redis_hits')
+            value = _decode(json.loads(payload))
+            self._local_set(key, tag, value, ttl)
+            return value
+
+        self._bump('misses')
+        value = compute()
+        self._local_set(key, tag, value, ttl)
+        self._redis_set(key, tag, json.dumps(_encode(value)), ttl)
+        return value
+
+    def invalidate_tags(self, tags):
+        """Drop every entry cached under ``tags``, locally and in Redis."""
+        if not self.enabled:
+            return
+        with self._lock:
+            local_keys = set()
+            for tag in tags:
+                local_keys |= self._tags.get(tag, set())
+            for key in local_keys:
+                self._local_drop(key)
+        removed = self._redis_invalidate(tags)
+        self._bump('invalidations')
+        self._bump('keys_invalidated', max(removed, len(local_keys)))
+
+    def invalidate_timestamp(self, series, ts):
+        """Invalidate the year, month and day of ``series`` that contain ``ts``."""
+        self.invalidate_tags([
+            period_tag(series, ts.year)[0],
+            period_tag(series, ts.year, ts.month)[0],
+            period_tag(series, ts.year, ts.month, ts.day)[0],
+        ])
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot['local_entries'] = len(self._local)
+        lookups = snapshot['local_hits'] + snapshot['redis_hits'] + snapshot['misses']
+        snapshot['hit_rate'] = round((lookups - snapshot['misses']) / lookups, 4) if lookups else None
+        snapshot['redis_available'] = self._redis_available()
+        return snapshot
+
+
+query_cache = QueryCache()
+
+
+def cached_period(series, granularity):
+    """Cache a method whose result covers one year or one month of ``series``.
+
+    The decorated method must take ``year`` (and ``month`` for monthly
+    granularity) arguments; ``None`` means the current year, as in the
+    existing service methods. Any other argument (e.g. ``sensor_id``) is part
+    of the cache key but not of the tag, so a write invalidates the period for
+    every value of it.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            year = bound.arguments.get('year') or datetime.now().year
+            month = bound.arguments.get('month') if granularity == 'month' else None
+            try:
+                tag, window_end = period_tag(series, year, month)
+            except ValueError:
+                return func(*args, **kwargs)
+
+            params = [int(year)] + ([int(month)] if month is not None else [])
+            params += [
+                [arg, value] for arg, value in bound.arguments.items()
+                if arg not in ('self', 'year', 'month')
+            ]
+            return query_cache.get_or_compute(tag, window_end, name, params, lambda: func(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def invalidate_timestamp(series, ts):
+    """Invalidate the cached aggregates of ``series`` affected by a row written at ``ts``."""
+    try:
+        query_cache.invalidate_timestamp(series, ts)
+    except Exception as e:
+        logger.warning(f"Query cache invalidation failed for {series} at {ts}: {e}")
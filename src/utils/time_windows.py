@@ -0,0 +1,74 @@
+"""
+Half-open time windows for analytics queries.
+
+Filtering with ``EXTRACT(YEAR FROM ts) = %s`` or ``DATE(ts) = CURRENT_DATE``
+wraps the column in a function, so PostgreSQL can neither use the index on
+the timestamp nor prune monthly partitions. These helpers turn calendar
+requests into ``[start, end)`` bounds to be used as::
+
+    WHERE ts >= %s AND ts < %s
+
+which works for both ``timestamp`` and ``date`` columns.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+
+def _as_date(day):
+    if day is None:
+        return date.today()
+    if isinstance(day, datetime):
+        return day.date()
+    return day
+
+
+def parse_time(value):
+    """ISO 8601 or epoch seconds, as a naive local datetime like the stored timestamps.
+
+    Epoch seconds and ISO strings with an offset are converted to local
+    time, so bounds can be compared with any stored or ``datetime.now()``
+    value. Raises ValueError when the value is not a valid time.
+    """
+    try:
+        return datetime.fromtimestamp(float(value))
+    except (OverflowError, OSError):
+        raise ValueError(f"time out of range: {value!r}")
+    except ValueError:
+        pass
+    return as_local(datetime.fromisoformat(value))
+
+
+def as_local(moment):
+    """``moment`` as a naive local datetime; aware values are converted from their offset."""
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment
+
+
+def day_window(day=None):
+    """Window covering a single day (today by default)."""
+    start = datetime.combine(_as_date(day), time.min)
+    return start, start + timedelta(days=1)
+
+
+def month_window(year, month):
+    """Window covering a calendar month."""
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"invalid month: {month}")
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+
+def year_window(year):
+    """Window covering a calendar year."""
+    year = int(year)
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+
+
+def iso_week_window(year, week):
+    """Window covering an ISO week (Monday to Sunday), as ``EXTRACT(WEEK ...)`` numbers it."""
+    start = datetime.combine(date.fromisocalendar(int(year), int(week), 1), time.min)
+    return start, start + timedelta(days=7)
+
@@ -13,11 +13,12 @@ DEVICE_ID = "pico-w-001"
 BASE_URL = "http://192.168.178.101:8888"
 AIR_QUALITY_URL = BASE_URL + "/api/air_quality"
 PICO_LOGS_URL   = BASE_URL + "/api/pico-logs"
+PICO_LOGS_BATCH_URL = PICO_LOGS_URL + "/batch"
 
 HEADERS = {"Content-Type": "application/json"}
 
 SENSOR_READ_INTERVAL = 30
-LOG_BATCH_SIZE       = 3
+LOG_BATCH_SIZE       = 50   # log per POST (= dimensione massima della coda)
 LOG_SEND_INTERVAL    = 60
 
 # ===== LED =====
@@ -70,20 +71,19 @@ def log(level, message, data=None):
         print("    ", data)
 
 def send_logs():
+    """Invia la coda dei log con un solo POST (una connessione TCP) a /api/pico-logs/batch."""
     global log_queue
     if not log_queue:
         return
     batch = log_queue[:LOG_BATCH_SIZE]
-    sent  = 0
-    for entry in batch:
-        code = post(PICO_LOGS_URL, entry)
-        if code in (200, 201):
-            sent += 1
-        else:
-            print("[LOG] send failed, code =", code)
-            break
-    log_queue = log_queue[sent:]
-    print("[LOG] sent {}/{} logs, {} remaining".format(sent, len(batch), len(log_queue)))
+    code = post(PICO_LOGS_BATCH_URL, {"logs": batch})
+    gc.collect()
+    if code in (200, 201):
+        # I log scartati dal server perché non validi non vanno reinviati
+        log_queue = log_queue[len(batch):]
+        print("[LOG] sent {} logs, {} remaining".format(len(batch), len(log_queue)))
+    else:
+        print("[LOG] batch send failed, code =", code)
 
 # ===== WiFi =====
 class WiFiManager:
@@ -251,7 +251,7 @@ def main():
             payload["send_reason"] = "change"
             payload["timestamp"]   = time.time()
             code = post(AIR_QUALITY_URL, payload)
-            if code in (200, 201):
+            if code in (200, 201, 202):   # 202 = accodato dal server, scritto a batch
                 log("success", "Air quality sent")
                 last_sent = data.copy()
                 blink(1, 0.05)